@@ -1,6 +1,7 @@
 const pool = require('../config/database');
 const jwt = require('jsonwebtoken');
 const bcrypt = require('bcryptjs'); // Assuming bcryptjs is installed or will be
+const { markCatalogStale, upsertToCatalog } = require('../services/catalogService');
 
 // Helper to generate JWT
 const generateToken = (id, email, role) => {
@@ -137,6 +138,7 @@ module.exports = {
             );
 
             await client.query('COMMIT');
+            await upsertToCatalog(updateRes.rows);
             res.json({ success: true, data: updateRes.rows[0] });
 
         } catch (error) {
@@ -171,6 +173,7 @@ module.exports = {
             }
 
             await client.query('COMMIT');
+            markCatalogStale();
             res.json({ success: true, message: `Successfully processed ${ids.length} internships.` });
 
         } catch (error) {
@@ -5,6 +5,7 @@ const { analyzeResume } = require('../services/resumeService');
 const { generateCoverLetter } = require('../services/writerService');
 const { generateInterviewResponse } = require('../services/interviewService');
 const pythonClient = require('../utils/pythonClient');
+const { matchCatalog } = require('../services/catalogService');
 const pdf = require('pdf-parse');
 const { GoogleGenerativeAI } = require("@google/generative-ai");
 
@@ -167,7 +168,8 @@ const getAIRecommendations = async (req, res) => {
 
         try {
             console.log("📡 Calling Python service for advanced matching...");
-            const pyMatch = await pythonClient.match(student, allInternships, 'both');
+            // Whole catalog: the engine already holds every internship (see catalogService)
+            const pyMatch = await matchCatalog(student, undefined, 'both');
             if (pyMatch.success) {
                 const results = pyMatch.data.results || [];
                 const locationFallback = pyMatch.data.location_fallback || false;
@@ -1,6 +1,7 @@
 const pool = require('../config/database');
 const { normalizeInternshipData, checkDuplicate } = require('../services/internshipService');
 const { getInternships, filterInternships, getAllLocations, getAllSkills } = require('../services/csvDataService');
+const { markCatalogStale, upsertToCatalog, removeFromCatalog } = require('../services/catalogService');
 
 // Get all internships with filtering
 // Get all internships with filtering (simulated via CSV service)
@@ -35,6 +36,7 @@ const createInternship = async (req, res) => {
             RETURNING *`,
       [company, role, location, sector, duration, stipend, requirements, skills, description, deadline, verification_status, source_type, external_link]
     );
+    await upsertToCatalog(result.rows);
 
     res.status(201).json({ success: true, data: result.rows[0] });
   } catch (error) {
@@ -74,6 +76,7 @@ const ingestFromAPI = async (req, res) => {
       addedCount++;
     }
 
+    if (addedCount > 0) markCatalogStale();
     res.json({ success: true, message: `Ingestion complete. Added: ${addedCount}, Skipped: ${skippedCount}` });
 
   } catch (error) {
@@ -110,6 +113,7 @@ const uploadFromGovPortal = async (req, res) => {
       }
     }
 
+    if (addedCount > 0) markCatalogStale();
     res.json({ success: true, message: `Gov Portal upload processed. Added: ${addedCount}` });
 
   } catch (error) {
@@ -139,6 +143,7 @@ const updateInternship = async (req, res) => {
             WHERE id = $11 RETURNING *`,
       [company, role, location, sector, duration, stipend, requirements, skills, description, deadline, id]
     );
+    await upsertToCatalog(result.rows);
 
     res.json({ success: true, data: result.rows[0] });
 
@@ -157,6 +162,7 @@ const deleteInternship = async (req, res) => {
     if (result.rows.length === 0) {
       return res.status(404).json({ success: false, error: 'Internship not found' });
     }
+    await removeFromCatalog([result.rows[0].id]);
 
     res.json({ success: true, message: 'Internship removed' });
 
@@ -184,6 +190,7 @@ const setVerificationStatus = async (req, res) => {
     if (result.rows.length === 0) {
       return res.status(404).json({ success: false, error: 'Internship not found' });
     }
+    await upsertToCatalog(result.rows);
 
     res.json({ success: true, data: result.rows[0] });
 
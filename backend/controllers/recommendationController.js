@@ -146,17 +146,19 @@ const getRecommendations = async (req, res) => {
 
     console.log(`🚀 ACCELERATED MATCHING: Processing ${candidateInternships.length} candidates for ${name}...`);
 
-    const pythonClient = require('../utils/pythonClient');
+    const { matchCatalog } = require('../services/catalogService');
 
     try {
       // 1. Try calling the Python FastAPI service (Higher Reliability & Speed)
+      // The engine holds the internships already (see catalogService): send only the candidate IDs
       console.log('📡 Calling Python FastAPI service...');
-      const result = await pythonClient.match(studentProfile, candidateInternships, workPreference);
+      const result = await matchCatalog(studentProfile, candidateInternships.map(i => i.id), workPreference);
 
       if (result.success) {
-        console.log(`✅ Success (API): Generated ${result.data.length} semantic matches.`);
+        const matches = result.data.results || [];
+        console.log(`✅ Success (API): Generated ${matches.length} semantic matches.`);
 
-        const formattedRecommendations = result.data.map((rec, index) => {
+        const formattedRecommendations = matches.map((rec, index) => {
           const score = rec.match_score > 1 ? rec.match_score : (rec.match_score * 100);
           return {
             ...rec,
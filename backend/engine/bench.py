@@ -0,0 +1,456 @@
+"""
+Benchmark suite for the matching pipeline.
+
+Generates a synthetic catalog in the `internship_data.csv` schema (rows go
+through the same CSV mapping as the real export) plus synthetic students,
+then times every pipeline stage per student at each catalog size:
+
+    parse_resume, bucketization, similarity_index (catalog TokenIndex),
+    tfidf_similarity (catalog TfidfIndex), compute_similarities (reference
+    implementation), skill_scoring, pruned_scoring (bounded top-k, text
+    similarity included), gap_analysis, fallback_explain, and
+    process_matching end to end.
+
+Catalog-level stages (generate, cleaning, catalog build) are timed once per
+size. Gemini is replaced by an instant canned reply and the resume cache is
+disabled, so numbers measure the engine alone.
+
+    python bench.py --sizes 100,1000,10000,100000 --students 30 --out bench.json
+    python bench.py --sizes 1000 --compare bench.json   # exit 1 on p50 regressions
+
+Output is JSON: latency percentiles (ms), throughput (calls/s) and memory
+(peak RSS, plus tracemalloc peaks for catalog build and one match).
+
+`--html N` times bulk description cleaning (htmlclean.py) on N synthetic
+scraped descriptions (plain text, simple markup and a few malformed ones)
+against running the full HTML parser on every item.
+
+    python bench.py --sizes 1000 --html 100000
+
+`--lsh` adds a recall benchmark for the MinHash/LSH candidate index: for
+each (bands x rows, top-N) setting, the share of the exact top-k jobs by
+`compute_similarities` that LSH returns, next to both query latencies.
+
+    python bench.py --sizes 100000 --students 20 --lsh 32x4,64x2,96x2 --lsh-top-n 500,2000
+"""
+import argparse
+import copy
+import gc
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import htmlclean
+import matcher
+from catalog import InternshipCatalog
+from gazetteer import STATE_CITIES
+from ingest import csv_row_to_record, normalize_record
+from llm import ResponseCache
+from scoring import is_available as scoring_available
+from similarity import LSH_TOP_N, MinHashIndex, is_available as similarity_available
+
+DEFAULT_SIZES = (100, 1000, 10000, 100000)
+# Stages below this p50 delta (ms) are never reported as regressions (timer noise)
+NOISE_FLOOR_MS = 0.05
+
+# ─── Synthetic data ───────────────────────────────────────────────────────────
+ROLES = [
+    "Business Development (Sales)", "Social Media Marketing", "Human Resources (HR)", "Digital Marketing",
+    "Graphic Design", "Content Writing", "Video Editing/Making", "Web Development", "Python Development",
+    "Data Science", "Data Analytics", "Machine Learning", "Android App Development", "Finance",
+    "Accounts", "Operations", "Customer Service", "UI/UX Design", "Full Stack Development", "Law/Legal",
+]
+ROLE_SUFFIXES = ["", "", "", " (Remote)", " (Part time/Remote)"]
+SKILLS = [
+    "Python", "SQL", "Java", "JavaScript", "React", "Node.js", "HTML", "CSS", "Django", "Machine Learning",
+    "Data Analytics", "MS-Excel", "MS-Office", "Canva", "Adobe Photoshop", "Video Editing", "Figma",
+    "Digital Marketing", "Social Media Marketing", "Search Engine Optimization (SEO)", "Email Marketing",
+    "Content Writing", "English Proficiency (Spoken)", "English Proficiency (Written)", "Recruitment",
+    "Accounting", "Tally", "Communication", "Sales", "Negotiation", "Android", "Flutter", "Power BI",
+]
+PERKS = ["Certificate", "Letter of recommendation", "Flexible work hours", "Informal dress code",
+         "5 days a week", "Free snacks & beverages", "Job offer"]
+INTERN_TYPES = ["Internship", "Internship with job offer"]
+COMPANY_WORDS = ["Tech", "Global", "Bright", "Nova", "Pixel", "Green", "Blue", "Prime", "Smart", "Urban"]
+COMPANY_SUFFIXES = ["Solutions", "Labs", "Technologies LLP", "Consulting Services", "Media", "Private Limited"]
+MONTHS = ["January", "March", "May", "July", "September", "November"]
+CITIES = sorted({city.title() for cities in STATE_CITIES.values() for city in cities[:4]})
+QUALIFICATIONS = ["B.Tech", "BCA", "BCom", "BBA", "MBA", "B.Sc", "BA", "Diploma"]
+SECTORS = ["Technology", "Marketing", "Finance", "Design", "Management", "Human Resources", None]
+
+
+def _literal(values: list, kind: str = "list") -> str:
+    """Python-literal list/tuple text, as the CSV export stores it."""
+    if kind == "tuple":
+        return repr(tuple(values))
+    return repr(list(values))
+
+
+def synthetic_internships(n: int, seed: int = 0) -> list:
+    """`n` raw records in the internship_data.csv schema."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        company = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}"
+        if rng.random() < 0.4:
+            location = _literal(["Work from home"] * rng.choice([1, 4]), "tuple")
+        else:
+            location = _literal([", ".join(rng.sample(CITIES, rng.randint(1, 3)))], "tuple")
+        low = rng.randrange(2, 20) * 1000
+        rows.append(csv_row_to_record({
+            'Internship Id': str(2400000 + i),
+            'Role': f"{rng.choice(ROLES)} Internship{rng.choice(ROLE_SUFFIXES)}",
+            'Company Name': company,
+            'Location': location,
+            'Duration': f"{rng.choice([1, 2, 3, 4, 6])} Months",
+            'Stipend': rng.choice([f"₹ {low:,} /month", f"₹ {low:,}-{low + 5000:,} /month", "Unpaid"]),
+            'Intern Type': _literal(rng.sample(INTERN_TYPES, rng.randint(1, 2))),
+            'Skills': _literal(rng.sample(SKILLS, rng.randint(1, 8))),
+            'Perks': _literal(rng.sample(PERKS, rng.randint(1, 5))),
+            'Hiring Since': f"Hiring since {rng.choice(MONTHS)} {rng.randint(2018, 2024)}",
+            'Opportunity Date': f"{rng.randint(1, 60)} opportunities posted",
+            'Opening': str(rng.randint(1, 10)),
+            'Website Link': f"https://{company.split()[0].lower()}{i % 997}.example.com",
+        }))
+    return rows
+
+
+def synthetic_students(n: int, seed: int = 0) -> list:
+    """`n` student profiles with distinct resume texts."""
+    rng = random.Random(seed + 1)
+    known = matcher.KNOWN_SKILLS
+    students = []
+    for i in range(n):
+        resume_skills = rng.sample(known, rng.randint(2, 10))
+        students.append({
+            "id": f"bench-{i}",
+            "name": f"Student {i}",
+            "skills": rng.sample(SKILLS, rng.randint(0, 5)),
+            "preferred_state": ", ".join(rng.sample(CITIES + ["Remote", "any"], rng.randint(0, 2))),
+            "preferredSector": rng.choice(SECTORS),
+            "qualification": rng.choice(QUALIFICATIONS),
+            "resume_text": (f"Student {i}\n{rng.choice(QUALIFICATIONS)} graduate with {rng.randint(0, 4)} years "
+                            f"experience.\nSkills: {', '.join(resume_skills)}.\n" * rng.randint(1, 6)),
+        })
+    return students
+
+
+# ─── Harness ──────────────────────────────────────────────────────────────────
+class _StubLLM:
+    """Instant canned Gemini replies, so the LLM stage costs only prompt building and parsing."""
+    model_name = "bench-stub"
+    available = True
+    model = object()
+
+    def generate_sync(self, prompt: str, **kwargs) -> str:
+        return json.dumps([
+            {"index": i, "explanation": "Strong overlap with your skills.",
+             "roadmap": {"title": "2-day plan", "days": []}}
+            for i in range(3)
+        ])
+
+
+@contextmanager
+def benchmark_environment():
+    """Stubs the LLM and disables the resume cache for the duration of a run."""
+    saved = matcher.LLM, matcher.RESUME_CACHE
+    matcher.LLM = _StubLLM()
+    matcher.RESUME_CACHE = ResponseCache(max_size=0, ttl=0, db_path="")
+    try:
+        yield
+    finally:
+        matcher.LLM, matcher.RESUME_CACHE = saved
+
+
+def _percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def summarize(samples: list) -> dict:
+    """Latency stats (ms) and throughput for one stage's per-call durations (seconds)."""
+    ordered = sorted(samples)
+    total = sum(ordered)
+    ms = lambda s: round(1000 * s, 4)
+    return {
+        "calls": len(ordered),
+        "mean_ms": ms(total / len(ordered)) if ordered else 0.0,
+        "p50_ms": ms(_percentile(ordered, 0.50)),
+        "p90_ms": ms(_percentile(ordered, 0.90)),
+        "p99_ms": ms(_percentile(ordered, 0.99)),
+        "max_ms": ms(ordered[-1]) if ordered else 0.0,
+        "throughput_per_s": round(len(ordered) / total, 2) if total else None,
+    }
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _timed(samples: dict, stage: str, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    samples.setdefault(stage, []).append(time.perf_counter() - start)
+    return result
+
+
+def bench_size(n_jobs: int, students: list, seed: int = 0, work_preference: str = "office",
+               memory: bool = True) -> dict:
+    """Times every stage against a synthetic catalog of `n_jobs` internships."""
+    catalog_ms = {}
+    start = time.perf_counter()
+    raw = synthetic_internships(n_jobs, seed)
+    catalog_ms["generate_ms"] = round(1000 * (time.perf_counter() - start), 2)
+
+    start = time.perf_counter()
+    for rec in raw:
+        normalize_record(rec)
+    catalog_ms["cleaning_ms"] = round(1000 * (time.perf_counter() - start), 2)
+
+    start = time.perf_counter()
+    catalog = InternshipCatalog(raw, source="bench")
+    catalog_ms["build_ms"] = round(1000 * (time.perf_counter() - start), 2)
+    catalog_ms["records_per_s"] = round(n_jobs / (catalog_ms["build_ms"] / 1000), 1) if n_jobs else None
+    if similarity_available():
+        start = time.perf_counter()
+        catalog.tfidf()
+        catalog_ms["tfidf_fit_ms"] = round(1000 * (time.perf_counter() - start), 2)
+
+    vectorized = matcher.SCORING_MODE == 'vectorized' and scoring_available()
+    samples = {}
+    with benchmark_environment():
+        for profile in students:
+            student = copy.deepcopy(profile)
+            parsed, skills = _timed(samples, "parse_resume", matcher._merge_student_skills, student)
+            pool, pool_sector_match, _ = _timed(
+                samples, "bucketization", lambda: matcher._build_pool(
+                    student, catalog.select(), work_preference, locations=catalog.locations,
+                    sector_matches=catalog.sector_matches(matcher._pref_sector(student))))
+            scores = _timed(samples, "similarity_index", matcher._pool_similarities, student, parsed, pool, catalog,
+                            "jaccard")
+            if similarity_available():
+                _timed(samples, "tfidf_similarity", matcher._pool_similarities, student, parsed, pool, catalog, "tfidf")
+            _timed(samples, "compute_similarities", lambda: matcher.compute_similarities(
+                matcher.build_student_text(student, parsed), [matcher.build_job_text(j) for j in pool]))
+            if vectorized:
+                top = _timed(samples, "skill_scoring", matcher._score_vectorized, pool, scores,
+                             pool_sector_match, student, skills, 15, catalog=catalog)
+                _timed(samples, "pruned_scoring", matcher._score_pruned, pool, student, parsed,
+                       pool_sector_match, skills, 15, catalog=catalog, engine="jaccard")
+            else:
+                pref_sector = matcher._pref_sector(student)
+                top = _timed(samples, "skill_scoring", matcher._score_loop, pool, scores,
+                             lambda j: matcher.is_preferred_sector_match(j, pref_sector), student, skills, 15)
+            _timed(samples, "gap_analysis", lambda: [matcher.compute_gap_analysis(skills, r) for r in top])
+            _timed(samples, "fallback_explain", matcher._fallback_explain, student, top[:10])
+            _timed(samples, "process_matching", matcher.process_matching,
+                   {"student": copy.deepcopy(profile), "workPreference": work_preference}, catalog=catalog)
+
+        result = {
+            "jobs": n_jobs,
+            "catalog": catalog_ms,
+            "stages": {stage: summarize(durations) for stage, durations in samples.items()},
+        }
+
+        mem = {"peak_rss_mb": _peak_rss_mb()}
+        if memory:
+            del catalog
+            gc.collect()
+            tracemalloc.start()
+            catalog = InternshipCatalog(raw, source="bench")
+            mem["catalog_mb"] = round(tracemalloc.get_traced_memory()[0] / 2**20, 2)
+            mem["catalog_build_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            matcher.process_matching({"student": copy.deepcopy(students[0]), "workPreference": work_preference},
+                                     catalog=catalog)
+            # Extra memory one request needs on top of the loaded catalog
+            mem["match_peak_mb"] = round((tracemalloc.get_traced_memory()[1] - before) / 2**20, 2)
+            tracemalloc.stop()
+        result["memory"] = mem
+    return result
+
+
+def _recall_at(exact: list, keys: list, found: set, k: int) -> float:
+    """Share of the exact top-k found; jobs tied with the k-th score all count as top-k."""
+    k = min(k, len(exact))
+    if not k:
+        return 1.0
+    kth = sorted(exact, reverse=True)[k - 1]
+    relevant = [key for key, score in zip(keys, exact) if score >= kth]
+    return min(k, sum(key in found for key in relevant)) / k
+
+
+def bench_lsh_recall(n_jobs: int, students: list, configs=((64, 2),), top_ns=(LSH_TOP_N,), k: int = 50,
+                     seed: int = 0) -> dict:
+    """Recall@k and latency of MinHash/LSH retrieval against exact compute_similarities."""
+    catalog = InternshipCatalog(synthetic_internships(n_jobs, seed), source="bench")
+    keys = list(catalog.texts)
+    texts = [catalog.texts[key] for key in keys]
+    queries, exact_samples = [], {}
+    for profile in students:
+        student = copy.deepcopy(profile)
+        parsed, _ = matcher._merge_student_skills(student)
+        text = matcher.build_student_text(student, parsed)
+        exact = _timed(exact_samples, "compute_similarities", matcher.compute_similarities, text, texts)
+        _timed(exact_samples, "similarity_index", catalog.token_index.scores, text)
+        queries.append((text, exact))
+
+    settings = []
+    for bands, rows in configs:
+        start = time.perf_counter()
+        index = MinHashIndex.build(catalog.texts, bands, rows)
+        build_ms = round(1000 * (time.perf_counter() - start), 2)
+        for top_n in top_ns:
+            samples, recalls, returned = {}, [], []
+            for text, exact in queries:
+                found = _timed(samples, "lsh_query", index.query, text, top_n)
+                returned.append(len(found))
+                recalls.append(_recall_at(exact, keys, set(found), k))
+            settings.append({
+                "bands": bands, "rows": rows, "top_n": top_n, "build_ms": build_ms,
+                f"recall_at_{k}": round(sum(recalls) / len(recalls), 4) if recalls else None,
+                "min_recall": round(min(recalls), 4) if recalls else None,
+                "mean_candidates": round(sum(returned) / len(returned), 1) if returned else 0,
+                "query": summarize(samples.get("lsh_query", [])),
+            })
+    return {
+        "jobs": n_jobs,
+        "k": k,
+        "exact": {stage: summarize(durations) for stage, durations in exact_samples.items()},
+        "settings": settings,
+    }
+
+
+def synthetic_descriptions(n: int, seed: int = 0) -> list:
+    """Scraped-description mix: 60% plain text, 37% simple markup with entities, 3% malformed markup."""
+    rnd = random.Random(seed)
+    body = "Work with {0} and {1} on live projects; you will report to the {2} lead."
+    texts = []
+    for i in range(n):
+        skills = rnd.sample(list(matcher.KNOWN_SKILLS), 3)
+        text = body.format(*skills)
+        kind = rnd.random()
+        if kind < 0.6:
+            texts.append(f"{text}\n  {text}")
+        elif kind < 0.97:
+            texts.append(f"<div class='jd'><p>{text}</p><ul><li>{skills[0]} &amp; {skills[1]}</li>"
+                         f"<li>Stipend: &#8377;{rnd.randint(5, 30)},000</li></ul>"
+                         f"<p>Apply <a href=\"/apply?id={i}&src=bench\">here</a></p></div>")
+        else:
+            texts.append(f"<p>{text} <b>unclosed <div class='x")
+    return texts
+
+
+def bench_html_cleaning(n: int, seed: int = 0) -> dict:
+    """clean_html against the full parser per item, on the same descriptions."""
+    texts = synthetic_descriptions(n, seed)
+    timings = {}
+
+    def timed(name, fn, *args):
+        start = time.perf_counter()
+        out = fn(*args)
+        timings[name] = round(1000 * (time.perf_counter() - start), 2)
+        return out
+
+    fast = timed("bulk_ms", lambda: [htmlclean.clean_html(t) for t in texts])
+    full = timed("full_parser_ms", lambda: [htmlclean.parse_text(t) for t in texts])
+    return {
+        "descriptions": n,
+        **timings,
+        "plain_share": round(sum("<" not in t for t in texts) / max(n, 1), 4),
+        "agrees_with_full_parser": fast == full,
+    }
+
+
+def run(sizes=DEFAULT_SIZES, n_students: int = 30, seed: int = 0, memory: bool = True,
+        lsh_configs=None, lsh_top_ns=(LSH_TOP_N,), html: int = 0) -> dict:
+    students = synthetic_students(n_students, seed)
+    results = []
+    for n_jobs in sizes:
+        results.append(bench_size(n_jobs, students, seed=seed, memory=memory))
+        gc.collect()
+    lsh = []
+    if lsh_configs and similarity_available():
+        for n_jobs in sizes:
+            lsh.append(bench_lsh_recall(n_jobs, students, lsh_configs, lsh_top_ns, seed=seed))
+            gc.collect()
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {
+        "meta": {
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": numpy_version,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scoring_mode": matcher.SCORING_MODE,
+            "students": n_students,
+            "seed": seed,
+            "llm": "stub",
+            "resume_cache": "disabled",
+        },
+        "results": results,
+        **({"lsh": lsh} if lsh else {}),
+        **({"html_cleaning": bench_html_cleaning(html, seed)} if html else {}),
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.2) -> list:
+    """Stages whose p50 grew by more than `tolerance` (fraction) against `baseline`."""
+    base = {r["jobs"]: r["stages"] for r in baseline.get("results", [])}
+    regressions = []
+    for r in current["results"]:
+        for stage, stats in r["stages"].items():
+            before = base.get(r["jobs"], {}).get(stage)
+            if before is None:
+                continue
+            delta = stats["p50_ms"] - before["p50_ms"]
+            if delta > NOISE_FLOOR_MS and stats["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+                regressions.append({"jobs": r["jobs"], "stage": stage,
+                                    "baseline_p50_ms": before["p50_ms"], "p50_ms": stats["p50_ms"]})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the matching pipeline on synthetic catalogs.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated catalog sizes")
+    parser.add_argument("--students", type=int, default=30, help="students timed per catalog size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON report; exit 1 if any stage's p50 regressed")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p50 growth for --compare")
+    parser.add_argument("--lsh", help="LSH settings to measure recall for, e.g. 32x4,64x2 (bands x rows)")
+    parser.add_argument("--lsh-top-n", default=str(LSH_TOP_N), help="comma-separated candidate counts for --lsh")
+    parser.add_argument("--html", type=int, default=0, help="also time cleaning this many scraped descriptions")
+    args = parser.parse_args(argv)
+
+    lsh_configs = [tuple(int(x) for x in c.split("x")) for c in args.lsh.split(",") if c] if args.lsh else None
+    report = run([int(s) for s in args.sizes.split(",") if s], args.students, args.seed, not args.no_memory,
+                 lsh_configs, [int(n) for n in args.lsh_top_n.split(",") if n], args.html)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["regressions"] = compare(json.load(f), report, args.tolerance)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,559 @@
+"""
+Engine-owned internship catalog.
+
+Node used to ship the whole internship list with every /match call. The
+catalog is loaded once (from the bundled data files or a POSTed list) and
+versioned; /match then references it by `catalog_version` and only sends
+the student plus optional job IDs / filters.
+
+Records are normalized once on the way in (see ingest.py) and every derived
+structure is built from the prepared records, so a request never re-cleans
+job fields.
+
+Bundled sources can also be loaded from a memory-mapped columnar file
+(columnar.py), built next to the data on first use and shared by every
+engine process that maps it; jobs are then read-only views, and the job
+texts, requirements and sectors are read from the file's derived columns.
+
+/catalog/upsert and /catalog/delete change single postings in place: each
+touches only the changed jobs' postings, features and location IDs, and
+bumps the revision part of the version ("<digest>.<revision>").
+
+Text indexes over the job texts (the TF-IDF engine and the MinHash/LSH
+candidate index) are built on first use, or at load when TF-IDF is the
+default engine. They follow upserts/deletes without a rebuild; once
+TEXT_INDEX_REFIT_RATIO of the catalog has changed, an index is rebuilt in a
+background thread and swapped in.
+
+After a build the derived structures of a bundled source are saved as a
+snapshot (snapshot.py) keyed by the data, so a restarted process loads them
+instead of recomputing. POSTed catalogs are only snapshotted with
+CATALOG_INLINE_SNAPSHOTS.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from columnar import ColumnarStore, write_columnar
+from gazetteer import GAZETTEER
+from ingest import as_text, normalize_record, read_catalog_file
+from matcher import SKILL_REGISTRY, build_job_text
+from scoring import JobFeatures, parse_job_skills
+from snapshot import code_key, read_snapshot, snapshot_path, write_snapshot
+from similarity import SIMILARITY_ENGINE, MinHashIndex, TfidfIndex, TokenIndex, is_available as similarity_available
+
+logger = logging.getLogger("Catalog")
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+CATALOG_SOURCES = {
+    "csv": os.path.join(DATA_DIR, 'internship_data.csv'),
+    "json": os.path.join(DATA_DIR, 'internships.json'),
+}
+# Load bundled sources through the columnar file by default
+CATALOG_COLUMNAR = os.getenv('CATALOG_COLUMNAR', '0') == '1'
+COLUMNAR_DIR = os.getenv('CATALOG_COLUMNAR_DIR', os.path.join(DATA_DIR, 'columnar'))
+# Preferred sectors whose per-job sector matches are kept between requests
+SECTOR_CACHE_SIZE = int(os.getenv('SECTOR_CACHE_SIZE', '64'))
+# Conflicting duplicate job IDs listed in catalog info()
+DUPLICATE_IDS_REPORTED = int(os.getenv('CATALOG_DUPLICATE_IDS_REPORTED', '20'))
+# Upserts/deletes remembered for consumers that catch up incrementally (sharded scorer)
+CHANGE_LOG_SIZE = int(os.getenv('CATALOG_CHANGE_LOG_SIZE', '1024'))
+# Share of jobs changed since a text index was built that triggers a background rebuild
+TEXT_INDEX_REFIT_RATIO = float(os.getenv('TEXT_INDEX_REFIT_RATIO', '0.1'))
+
+# Derived structures of bundled sources are saved here after a build and loaded by the next start
+CATALOG_SNAPSHOTS = os.getenv('CATALOG_SNAPSHOTS', '1') == '1'
+# Also snapshot POSTed (inline) catalogs; off by default, since each new payload writes a file
+CATALOG_INLINE_SNAPSHOTS = os.getenv('CATALOG_INLINE_SNAPSHOTS', '0') == '1'
+SNAPSHOT_DIR = os.getenv('CATALOG_SNAPSHOT_DIR', os.path.join(DATA_DIR, 'snapshots'))
+
+# Text index name -> builder taking {job key: job text}
+TEXT_INDEXES = {
+    "tfidf": TfidfIndex.fit,
+    "minhash": MinHashIndex.build,
+}
+
+# Filter name -> job fields it is matched against (case-insensitive substring)
+FILTER_FIELDS = {
+    "role": ("role",),
+    "company": ("company",),
+    "location": ("location",),
+    "sector": ("sector", "internType"),
+}
+
+
+def validate_filters(filters: dict):
+    unknown = [name for name in (filters or {}) if name not in FILTER_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown filter '{unknown[0]}'. Use one of: {', '.join(FILTER_FIELDS)}")
+
+
+def prepare_records(records: list) -> list:
+    """Normalized copies of `records`; rows without an ID get their position."""
+    jobs = []
+    for i, rec in enumerate(records):
+        job = normalize_record(rec)
+        if job.get('id') in (None, ''):
+            job['id'] = i
+        jobs.append(job)
+    return jobs
+
+
+def duplicate_ids(records: list) -> list:
+    """Job keys carried by more than one of the raw `records`, in first-seen order."""
+    seen, duplicates = set(), {}
+    for i, rec in enumerate(records):
+        key = rec.get('id')
+        key = str(i if key in (None, '') else key)
+        if key in seen:
+            duplicates[key] = None
+        seen.add(key)
+    return list(duplicates)
+
+
+def file_digest(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def catalog_digest(records: list) -> str:
+    return hashlib.sha1(
+        json.dumps(records, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()[:12]
+
+
+class StaleCatalogVersion(Exception):
+    """An update named a catalog_version that is no longer current."""
+
+
+class _ReadWriteLock:
+    """Any number of readers (match requests) or one writer (a catalog update)."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writing = False
+
+    @contextmanager
+    def reading(self):
+        with self._cond:
+            while self._writing:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def writing(self):
+        with self._cond:
+            while self._writing:
+                self._cond.wait()
+            self._writing = True  # new readers wait from here on
+            while self._readers:
+                self._cond.wait()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+
+class InternshipCatalog:
+    """
+    Internship records keyed by job ID, plus the indexes derived from them.
+    upsert() / delete() change single jobs in place and bump the revision in
+    the version ("<digest>.<revision>"); requests hold reading() meanwhile.
+    """
+
+    def __init__(self, records: list, source: str = "inline", store: ColumnarStore = None, digest: str = None,
+                 registry=None):
+        """
+        `records` are raw rows, or the store's JobViews when `store` is given.
+        `registry` interns requirement names (default SKILL_REGISTRY; a transient
+        catalog passes a request-local SKILL_REGISTRY.scope()).
+        """
+        self._setup(source, store, registry)
+        if store is not None:
+            self._keep(records)
+            self.digest = store.version.rsplit('.', 1)[0]
+            self._index_store(store)
+        else:
+            self._keep(prepare_records(records))
+            self.digest = digest or catalog_digest(records)
+            for key, job in self.records.items():
+                self._index(key, job)
+        if SIMILARITY_ENGINE == 'tfidf' and similarity_available():
+            self.tfidf()
+
+    def _setup(self, source: str, store: ColumnarStore, registry=None):
+        self.source = source
+        self.store = store
+        self.revision = 0
+        self.loaded_at = time.time()
+        self.changes = deque(maxlen=CHANGE_LOG_SIZE)  # (revision, changed job keys)
+
+        # Derived structures, built once per load and kept current by upsert/delete
+        self.token_index = TokenIndex()
+        self.features = JobFeatures(registry or SKILL_REGISTRY)
+        self.locations = {}
+        self.texts = {}
+        self._text_indexes = {}  # name -> index, built on first use
+        self._positions = None  # job key -> catalog position, rebuilt after a change
+        self.duplicates = {"identical": 0, "conflicting": 0, "conflicting_ids": []}
+        self._sector_matches = OrderedDict()
+        self._lock = threading.Lock()
+        self._rw = _ReadWriteLock()
+        self._text_index_lock = threading.Lock()
+        self._rebuilds = {}  # name -> background rebuild thread
+
+    def _keep(self, jobs: list):
+        """
+        Keys prepared `jobs` by ID. A repeated ID keeps its first position and
+        its last row; repeats are counted in `duplicates` (identical rows vs
+        conflicting ones) and logged.
+        """
+        self.records = {}
+        for job in jobs:
+            key = str(job['id'])
+            kept = self.records.get(key)
+            if kept is not None:
+                if kept == job:
+                    self.duplicates["identical"] += 1
+                else:
+                    self.duplicates["conflicting"] += 1
+                    if len(self.duplicates["conflicting_ids"]) < DUPLICATE_IDS_REPORTED:
+                        self.duplicates["conflicting_ids"].append(key)
+            self.records[key] = job
+        if self.duplicates["identical"] or self.duplicates["conflicting"]:
+            logger.warning(f"Catalog ({self.source}) repeats job IDs: {self.duplicates['identical']} identical and "
+                           f"{self.duplicates['conflicting']} conflicting rows; the last row of each ID is kept.")
+
+    # ── Snapshots ────────────────────────────────────────────────────────────
+    def save_snapshot(self, path: str):
+        """Writes the derived structures at the current revision (see snapshot.py)."""
+        with self._rw.reading(), self._text_index_lock:
+            write_snapshot(path, {
+                "digest": self.digest,
+                "duplicates": self.duplicates,
+                "records": self.records if self.store is None else None,
+                "texts": self.texts,
+                "locations": self.locations,
+                "postings": self.token_index.postings,
+                "sizes": self.token_index.sizes,
+                "skill_names": list(SKILL_REGISTRY.names),
+                "skill_rows": self.features.rows,
+                "sectors": self.features.sectors,
+                "text_indexes": dict(self._text_indexes),
+            })
+
+    @classmethod
+    def from_snapshot(cls, state: dict, source: str, store: ColumnarStore = None) -> "InternshipCatalog":
+        """A catalog from save_snapshot() state; with `store`, jobs are its views again."""
+        catalog = cls.__new__(cls)
+        catalog._setup(source, store)
+        catalog.digest = state["digest"]
+        catalog.duplicates = state["duplicates"]
+        if store is not None:
+            catalog.records = {str(job['id']): job for job in store.views()}
+        else:
+            catalog.records = state["records"]
+        catalog.texts = state["texts"]
+        catalog.locations = state["locations"]
+        catalog.token_index.postings = state["postings"]
+        catalog.token_index.sizes = state["sizes"]
+        # Skill IDs are per process: map the writer's IDs onto this registry's
+        names, rows = state["skill_names"], state["skill_rows"]
+        remap = {sid: SKILL_REGISTRY.intern(names[sid]) for sid in sorted({t for row in rows.values() for t in row})}
+        catalog.features.rows = {key: [remap[t] for t in row] for key, row in rows.items()}
+        catalog.features.sectors = state["sectors"]
+        catalog._text_indexes = state["text_indexes"]
+        if SIMILARITY_ENGINE == 'tfidf' and similarity_available():
+            catalog.tfidf()
+        return catalog
+
+    @property
+    def version(self) -> str:
+        return f"{self.digest}.{self.revision}"
+
+    def _index(self, key: str, job):
+        self.locations[key] = GAZETTEER.resolve(str(job.get('location', '')))
+        self.texts[key] = build_job_text(job)
+        self.token_index.add(key, self.texts[key])
+        self.features.add(key, job)
+        for index in self._text_indexes.values():
+            index.add(key, self.texts[key])
+
+    def _index_store(self, store: ColumnarStore):
+        """_index() for every job of `store`, from its derived columns instead of the fields."""
+        rows = {str(job_id): i for i, job_id in enumerate(store.values("id"))}  # a repeated ID keeps its last row
+        locations, texts = store.values("location", ""), store.values("text")
+        requirements, sectors = store.values("requirements"), store.values("sector")
+        for key in self.records:
+            i = rows[key]
+            self.locations[key] = GAZETTEER.resolve(str(locations[i]))
+            self.texts[key] = texts[i]
+            self.token_index.add(key, texts[i])
+            self.features.add_requirements(key, requirements[i], sectors[i])
+
+    def _unindex(self, key: str):
+        self.token_index.remove(key, self.texts.pop(key))
+        self.features.remove(key)
+        for index in self._text_indexes.values():
+            index.remove(key)
+        del self.locations[key]
+        with self._lock:
+            for matches in self._sector_matches.values():
+                matches.pop(key, None)
+
+    def reading(self):
+        """Held by a request while it reads jobs and indexes; updates wait for it."""
+        return self._rw.reading()
+
+    def _check_version(self, expected_version: str):
+        if expected_version and expected_version != self.version:
+            raise StaleCatalogVersion(f"Stale catalog_version '{expected_version}', current is '{self.version}'")
+
+    def _commit(self, keys: list):
+        self.revision += 1
+        self._positions = None
+        self.changes.append((self.revision, tuple(keys)))
+        for name, index in self._text_indexes.items():
+            if len(index.stale) > TEXT_INDEX_REFIT_RATIO * len(self.records) and name not in self._rebuilds:
+                thread = self._rebuilds[name] = threading.Thread(
+                    target=self._rebuild_text_index, args=(name, dict(self.texts), self.revision),
+                    name=f"{name}-rebuild", daemon=True)
+                thread.start()
+
+    def text_index(self, name: str):
+        """The named text index (see TEXT_INDEXES), built here on first use."""
+        with self._text_index_lock:
+            index = self._text_indexes.get(name)
+            if index is None:
+                start = time.perf_counter()
+                index = self._text_indexes[name] = TEXT_INDEXES[name](self.texts)
+                logger.info(f"Built {name} index over {len(self.texts)} jobs "
+                            f"in {1000 * (time.perf_counter() - start):.0f}ms.")
+            return index
+
+    def tfidf(self) -> TfidfIndex:
+        return self.text_index("tfidf")
+
+    def minhash(self) -> MinHashIndex:
+        return self.text_index("minhash")
+
+    def _rebuild_text_index(self, name: str, texts: dict, revision: int):
+        """Builds on a snapshot, then replays the changes made meanwhile and swaps it in."""
+        try:
+            index = TEXT_INDEXES[name](texts)
+            with self._rw.writing():
+                changed = self.changed_since(revision)
+                if changed is None:  # too many changes meanwhile; build from the current texts
+                    index = TEXT_INDEXES[name](self.texts)
+                    changed = []
+                for key in changed:
+                    index.remove(key)
+                    if key in self.texts:
+                        index.add(key, self.texts[key])
+                self._text_indexes[name] = index
+            logger.info(f"Rebuilt {name} index at catalog {self.version}.")
+        except Exception as e:
+            logger.error(f"Rebuilding the {name} index failed: {e}")
+        finally:
+            self._rebuilds.pop(name, None)
+
+    def upsert(self, records: list, expected_version: str = None) -> list:
+        """Adds or replaces jobs by ID; returns the changed keys. New jobs go last."""
+        jobs = [normalize_record(rec) for rec in records]
+        if any(job.get('id') in (None, '') for job in jobs):
+            raise ValueError("Every upserted internship needs an 'id'")
+        with self._rw.writing():
+            self._check_version(expected_version)
+            for job in jobs:
+                key = str(job['id'])
+                if key in self.records:
+                    self._unindex(key)
+                self.records[key] = job
+                self._index(key, job)
+            keys = list(dict.fromkeys(str(job['id']) for job in jobs))
+            if keys:
+                self._commit(keys)
+        return keys
+
+    def delete(self, job_ids: list, expected_version: str = None) -> list:
+        """Removes jobs by ID; returns the keys that were present."""
+        with self._rw.writing():
+            self._check_version(expected_version)
+            keys = [k for k in dict.fromkeys(str(j) for j in job_ids) if k in self.records]
+            for key in keys:
+                self._unindex(key)
+                del self.records[key]
+            if keys:
+                self._commit(keys)
+        return keys
+
+    def changed_since(self, revision: int):
+        """Keys changed after `revision`, or None when the change log no longer reaches back."""
+        if revision == self.revision:
+            return []
+        if not self.changes or self.changes[0][0] > revision + 1:
+            return None
+        return list(dict.fromkeys(k for rev, keys in self.changes if rev > revision for k in keys))
+
+    def __len__(self):
+        return len(self.records)
+
+    def jobs(self) -> list:
+        return list(self.records.values())
+
+    def select(self, job_ids: list = None, filters: dict = None) -> list:
+        """Returns the jobs to match against, in catalog order (also for `job_ids`)."""
+        if job_ids:
+            positions = self._positions
+            if positions is None:
+                positions = self._positions = {k: i for i, k in enumerate(self.records)}
+            keys = sorted((k for k in {str(j) for j in job_ids} if k in positions), key=positions.__getitem__)
+            jobs = [self.records[k] for k in keys]
+        else:
+            jobs = self.jobs()
+
+        validate_filters(filters)
+        for name, wanted in (filters or {}).items():
+            if not wanted:
+                continue
+            values = [wanted] if isinstance(wanted, str) else list(wanted)
+            values = [str(v).lower().strip() for v in values if str(v).strip()]
+            fields = FILTER_FIELDS[name]
+            jobs = [
+                j for j in jobs
+                if any(v in as_text(j.get(f)).lower() for f in fields for v in values)
+            ]
+        return jobs
+
+    def sector_matches(self, pref_sector: str) -> dict:
+        """Job id -> sector match for one preferred sector; the matcher fills it in as it goes."""
+        with self._lock:
+            matches = self._sector_matches.get(pref_sector)
+            if matches is None:
+                matches = self._sector_matches[pref_sector] = {}
+                if len(self._sector_matches) > SECTOR_CACHE_SIZE:
+                    self._sector_matches.popitem(last=False)
+            else:
+                self._sector_matches.move_to_end(pref_sector)
+            return matches
+
+    def info(self) -> dict:
+        return {
+            "catalog_version": self.version,
+            "count": len(self),
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "revision": self.revision,
+            "format": "columnar" if self.store is not None else "memory",
+            "duplicate_ids": self.duplicates,
+            "text_indexes": sorted(self._text_indexes),
+        }
+
+
+def derived_columns(jobs: list) -> dict:
+    """The per-job columns InternshipCatalog._index_store() reads, for prepared `jobs`."""
+    return {
+        "text": [build_job_text(job) for job in jobs],
+        "requirements": [parse_job_skills(job) for job in jobs],
+        "sector": [as_text(job.get('sector')) for job in jobs],
+    }
+
+
+def write_catalog_file(path: str, records: list):
+    """Writes raw `records` as a columnar catalog file with its derived columns."""
+    jobs = prepare_records(records)
+    write_columnar(path, jobs, f"{catalog_digest(records)}.0", derived_columns(jobs), code_key())
+
+
+def open_columnar(source: str) -> ColumnarStore:
+    """
+    Maps the columnar file for a bundled source, (re)building it when the data
+    file is newer or the derived columns came from different code.
+    """
+    data_path = CATALOG_SOURCES[source]
+    path = os.path.join(COLUMNAR_DIR, f"{source}.icat")
+    store = None
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(data_path):
+        store = ColumnarStore(path)
+        if store.code != code_key():
+            store = None
+    if store is None:
+        os.makedirs(COLUMNAR_DIR, exist_ok=True)
+        write_catalog_file(path, read_catalog_file(data_path))
+        logger.info(f"Built columnar catalog {path} ({os.path.getsize(path)} bytes).")
+        store = ColumnarStore(path)
+    return store
+
+
+# ─── Process-wide catalog ─────────────────────────────────────────────────────
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Returns the loaded catalog, or None if nothing has been loaded yet."""
+    return _catalog
+
+
+def load_catalog(records: list = None, source: str = None, columnar: bool = None,
+                 snapshot: bool = None) -> InternshipCatalog:
+    """
+    Replaces the process-wide catalog with `records` or a bundled data source.
+    With `snapshot` the derived structures are loaded from SNAPSHOT_DIR when
+    this data was built before, and saved there otherwise. It defaults to
+    CATALOG_SNAPSHOTS for bundled sources and CATALOG_INLINE_SNAPSHOTS for
+    `records`.
+    """
+    global _catalog
+    store = digest = None
+    if snapshot is None:
+        snapshot = CATALOG_SNAPSHOTS if records is None else CATALOG_INLINE_SNAPSHOTS
+    if records is None:
+        if source not in CATALOG_SOURCES:
+            raise ValueError(f"Unknown catalog source '{source}'. Use one of: {', '.join(CATALOG_SOURCES)}")
+        if CATALOG_COLUMNAR if columnar is None else columnar:
+            store = open_columnar(source)
+            key = f"{source}.columnar.{store.version.rsplit('.', 1)[0]}"
+            build = lambda: InternshipCatalog(store.views(), source=source, store=store)
+        else:
+            data_path = CATALOG_SOURCES[source]
+            key = f"{source}.{file_digest(data_path)}"
+            build = lambda: InternshipCatalog(read_catalog_file(data_path), source=source)
+    else:
+        source = source or "inline"
+        digest = catalog_digest(records)
+        key = f"inline.{digest}"
+        build = lambda: InternshipCatalog(records, source=source, digest=digest)
+
+    path = snapshot_path(SNAPSHOT_DIR, key) if snapshot else None
+    start = time.perf_counter()
+    state = read_snapshot(path) if path else None
+    if state is not None:
+        catalog = InternshipCatalog.from_snapshot(state, source, store)
+        logger.info(f"Restored catalog from snapshot {path} in {1000 * (time.perf_counter() - start):.0f}ms.")
+    else:
+        catalog = build()
+        if path:
+            try:
+                catalog.save_snapshot(path)
+            except OSError as e:
+                logger.warning(f"Could not write catalog snapshot {path}: {e}")
+    with _catalog_lock:
+        _catalog = catalog
+    logger.info(f"Catalog {catalog.version} loaded with {len(catalog)} internships ({catalog.source}).")
+    return catalog
@@ -0,0 +1,118 @@
+"""
+Request and response bodies for the heavy endpoints (/match, /match/batch,
+/catalog/load, /catalog/upsert, /catalog/delete).
+
+A legacy /match call carries the whole internship list, so decoding and
+encoding used to cost more than matching small pools:
+
+  • JSON requests are parsed and validated in one pass by pydantic-core
+    (`Model.model_validate_json`) instead of json.loads → validation →
+    `request.dict()` (a deep copy of the payload).
+  • Responses are encoded with orjson when it is installed (numpy scalars
+    included), else with the standard json module, skipping FastAPI's generic
+    jsonable_encoder walk.
+  • With msgpack installed, MessagePack is negotiated both ways:
+    `Content-Type: application/msgpack` for the request body and
+    `Accept: application/msgpack` for the response. JSON stays the default.
+    The Node client (utils/pythonClient.js) only speaks JSON so far.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+
+
+class UnsupportedMediaType(ValueError):
+    """The request body is in a format this process cannot decode."""
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+def _media_type(header: str) -> str:
+    return (header or "").split(";", 1)[0].strip().lower()
+
+
+def _default(obj):
+    """Values the encoders do not know: numpy scalars/arrays, sets, anything else as str."""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+# ─── Encoding ─────────────────────────────────────────────────────────────────
+def dumps_json(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_msgpack(obj) -> bytes:
+    return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+
+def negotiate(accept: str) -> str:
+    """The response media type for an Accept header: MessagePack only when asked for and available."""
+    if msgpack is None or not accept:
+        return JSON
+    best, best_q = JSON, 0.0
+    for part in accept.split(","):
+        media, _, params = part.partition(";")
+        media = media.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media in MSGPACK_TYPES and q > best_q:
+            best, best_q = MSGPACK, q
+        elif media in (JSON, "*/*", "application/*") and q > best_q:
+            best, best_q = JSON, q
+    return best
+
+
+def encode(obj, media_type: str = JSON) -> bytes:
+    return dumps_msgpack(obj) if media_type == MSGPACK else dumps_json(obj)
+
+
+# ─── Decoding ─────────────────────────────────────────────────────────────────
+def decode_model(model, body: bytes, content_type: str = JSON):
+    """Validates `body` into `model`; raises pydantic.ValidationError, UnsupportedMediaType or ValueError."""
+    media = _media_type(content_type) or JSON
+    if media in MSGPACK_TYPES:
+        if msgpack is None:
+            raise UnsupportedMediaType("MessagePack bodies need the msgpack package")
+        try:
+            data = msgpack.unpackb(body, raw=False, strict_map_key=False)
+        except Exception as e:
+            raise ValueError(f"Invalid MessagePack body: {e}") from e
+        return model.model_validate(data)
+    if media != JSON and not media.endswith("+json"):
+        raise UnsupportedMediaType(f"Unsupported Content-Type '{media}'. Use {JSON} or {MSGPACK}")
+    return model.model_validate_json(body)
+
+
+def request_body_schema(model) -> dict:
+    """OpenAPI requestBody for a route whose (flat) body model is decoded here rather than by FastAPI."""
+    schema = model.model_json_schema()
+    content = {JSON: {"schema": schema}}
+    if msgpack is not None:
+        content[MSGPACK] = {"schema": schema}
+    return {"requestBody": {"required": True, "content": content}}
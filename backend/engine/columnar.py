@@ -0,0 +1,282 @@
+"""
+Compact, memory-mapped columnar catalog files.
+
+Loading the bundled CSV means parsing and normalizing ~6.6k rows in every
+engine process, and each process then keeps its own dict per job. A
+columnar file stores the prepared records once:
+
+- numeric columns as packed int64 / float64 arrays,
+- string columns as uint32 IDs into one de-duplicated string pool
+  (company, location, sector and friends repeat a lot),
+- list columns as start offsets into a flat array of string IDs,
+- the pool itself as one UTF-8 blob plus byte offsets.
+
+Derived columns (the catalog's job texts, requirement lists and sectors)
+are stored next to the fields, so loading a catalog does not decode every
+field of every job again; `code` in the header names the code that derived
+them.
+
+The file is opened with `mmap`, so every worker process that loads it
+shares the same page-cache pages. Jobs are exposed as read-only `JobView`
+mappings that decode a field only when it is read (the ID, which every
+request reads, is kept decoded); `dict(view)` builds a real dict, which the
+matcher only does for jobs that make the final pool.
+
+Layout: MAGIC | uint64 header length | JSON header | 8-byte aligned arrays.
+"""
+import json
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+
+import numpy as np
+
+MAGIC = b"ICATCOL1"
+_ALIGN = 8
+
+# Column kind -> (array typecode for memoryview.cast, numpy dtype)
+_NUMERIC = {"int": ("q", np.int64), "float": ("d", np.float64)}
+_MISSING = object()
+
+
+def _column_kind(values: list) -> str:
+    """Storage kind for the present values of one field."""
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return "int"
+    if all(isinstance(v, float) for v in values):
+        return "float"
+    if all(isinstance(v, str) for v in values):
+        return "str"
+    if all(isinstance(v, list) and all(isinstance(x, str) for x in v) for v in values):
+        return "list"
+    return "json"
+
+
+class _Writer:
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def add(self, data: bytes) -> int:
+        """Appends `data` at the next aligned offset (relative to the data section)."""
+        pad = -self.size % _ALIGN
+        if pad:
+            self.chunks.append(b"\0" * pad)
+            self.size += pad
+        offset = self.size
+        self.chunks.append(data)
+        self.size += len(data)
+        return offset
+
+
+def write_columnar(path: str, records: list, version: str, derived: dict = None, code: str = ""):
+    """
+    Writes prepared (already normalized) `records` to `path` atomically.
+    `derived` maps a column name to one value per record (see ColumnarStore.values).
+    """
+    fields = list(dict.fromkeys(k for rec in records for k in rec))
+    derived = derived or {}
+    n = len(records)
+    pool, pool_ids = [], {}
+
+    def intern(s: str) -> int:
+        sid = pool_ids.get(s)
+        if sid is None:
+            sid = pool_ids[s] = len(pool)
+            pool.append(s.encode("utf-8"))
+        return sid
+
+    writer = _Writer()
+    columns = {}
+    rows = {field: [rec.get(field, _MISSING) for rec in records] for field in fields}
+    rows.update(derived)
+    for field, column in rows.items():
+        present = [v is not _MISSING for v in column]
+        values = [v for v in column if v is not _MISSING]
+        kind = _column_kind(values)
+        col = {"kind": kind}
+        if not all(present):
+            col["present"] = writer.add(np.array(present, dtype=np.uint8).tobytes())
+        if kind in _NUMERIC:
+            dtype = _NUMERIC[kind][1]
+            data = [0 if v is _MISSING else v for v in column]
+            col["data"] = writer.add(np.array(data, dtype=dtype).tobytes())
+        elif kind == "list":
+            starts, items = [0], []
+            for v in column:
+                items.extend(intern(s) for s in (() if v is _MISSING else v))
+                starts.append(len(items))
+            col["starts"] = writer.add(np.array(starts, dtype=np.uint32).tobytes())
+            col["items"] = writer.add(np.array(items, dtype=np.uint32).tobytes())
+        else:
+            encode = (lambda v: v) if kind == "str" else (lambda v: json.dumps(v, default=str))
+            ids = [0 if v is _MISSING else intern(encode(v)) for v in column]
+            col["data"] = writer.add(np.array(ids, dtype=np.uint32).tobytes())
+        columns[field] = col
+
+    offsets = np.zeros(len(pool) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(b) for b in pool], dtype=np.uint64)
+    pool_offsets = writer.add(offsets.tobytes())
+    pool_blob = writer.add(b"".join(pool))
+
+    header = json.dumps({
+        "version": version, "count": n, "fields": fields, "derived": list(derived), "code": code,
+        "columns": columns,
+        "pool": {"count": len(pool), "offsets": pool_offsets, "blob": pool_blob},
+    }).encode("utf-8")
+    prefix = MAGIC + struct.pack("<Q", len(header)) + header
+    prefix += b"\0" * (-len(prefix) % _ALIGN)
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(prefix)
+        f.writelines(writer.chunks)
+    os.replace(tmp, path)  # readers never see a half-written file
+
+
+class ColumnarStore:
+    """Read-only view of a columnar catalog file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a columnar catalog file")
+        (header_len,) = struct.unpack_from("<Q", self._mm, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(self._mm[start:start + header_len])
+        base = start + header_len + (-(start + header_len) % _ALIGN)
+
+        self.version = header["version"]
+        self.count = header["count"]
+        self.fields = header["fields"]
+        self.derived = header.get("derived", [])
+        self.code = header.get("code", "")
+        self._field_set = frozenset(self.fields)
+        view = memoryview(self._mm)
+        n = self.count
+
+        def array(offset: int, typecode: str, length: int):
+            size = struct.calcsize(typecode)
+            return view[base + offset:base + offset + size * length].cast(typecode)
+
+        pool = header["pool"]
+        self._pool_offsets = array(pool["offsets"], "Q", pool["count"] + 1)
+        self._blob = base + pool["blob"]
+        # field -> (kind, presence or None, data, list items or None)
+        self._columns = {}
+        for field, col in header["columns"].items():
+            kind = col["kind"]
+            present = array(col["present"], "B", n) if "present" in col else None
+            if kind in _NUMERIC:
+                data, items = array(col["data"], _NUMERIC[kind][0], n), None
+            elif kind == "list":
+                data = array(col["starts"], "I", n + 1)
+                items = array(col["items"], "I", data[n])
+            else:
+                data, items = array(col["data"], "I", n), None
+            self._columns[field] = (kind, present, data, items)
+
+    def __len__(self):
+        return self.count
+
+    def string(self, sid: int) -> str:
+        offsets = self._pool_offsets
+        return self._mm[self._blob + offsets[sid]:self._blob + offsets[sid + 1]].decode("utf-8")
+
+    def has(self, row: int, field: str) -> bool:
+        if field not in self._field_set:
+            return False
+        present = self._columns[field][1]
+        return present is None or present[row] == 1
+
+    def value(self, row: int, field: str):
+        """Decoded value of one field; KeyError when the row does not have it."""
+        if not self.has(row, field):
+            raise KeyError(field)
+        kind, _, data, items = self._columns[field]
+        if kind in _NUMERIC:
+            return data[row]
+        if kind == "list":
+            return [self.string(sid) for sid in items[data[row]:data[row + 1]]]
+        if kind == "str":
+            return self.string(data[row])
+        return json.loads(self.string(data[row]))
+
+    def values(self, name: str, default=None) -> list:
+        """Every row's value of a field or derived column (`default` where absent)."""
+        kind, present, data, items = self._columns[name]
+        if kind in _NUMERIC:
+            out = data.tolist()
+        else:
+            strings = {}
+
+            def string(sid):
+                s = strings.get(sid)
+                if s is None:
+                    s = strings[sid] = self.string(sid)
+                return s
+
+            if kind == "list":
+                out = [[string(sid) for sid in items[data[i]:data[i + 1]]] for i in range(self.count)]
+            elif kind == "str":
+                out = [string(sid) for sid in data]
+            else:
+                out = [json.loads(string(sid)) for sid in data]
+        if present is not None:
+            out = [v if p else default for v, p in zip(out, present)]
+        return out
+
+    def row(self, row: int) -> dict:
+        """Materializes one record as a plain dict."""
+        return {f: self.value(row, f) for f in self.fields if self.has(row, f)}
+
+    def column(self, field: str):
+        """A numeric column as a zero-copy NumPy array (None for other kinds)."""
+        kind, _, data, _ = self._columns.get(field, (None, None, None, None))
+        if kind not in _NUMERIC:
+            return None
+        return np.frombuffer(data, dtype=_NUMERIC[kind][1])
+
+    def views(self) -> list:
+        return [JobView(self, i, job_id) for i, job_id in enumerate(self.values("id"))]
+
+    def info(self) -> dict:
+        return {
+            "path": self.path,
+            "bytes": len(self._mm),
+            "strings": len(self._pool_offsets) - 1,
+            "columns": {f: c[0] for f, c in self._columns.items()},
+        }
+
+
+class JobView(Mapping):
+    """One catalog job, decoded field by field from a ColumnarStore (the ID up front)."""
+    __slots__ = ("_store", "_row", "_id")
+
+    def __init__(self, store: ColumnarStore, row: int, job_id=None):
+        self._store = store
+        self._row = row
+        self._id = job_id
+
+    def __getitem__(self, field: str):
+        if field == "id" and self._id is not None:
+            return self._id
+        return self._store.value(self._row, field)
+
+    def __contains__(self, field) -> bool:
+        return self._store.has(self._row, field)
+
+    def __iter__(self):
+        return (f for f in self._store.fields if self._store.has(self._row, f))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def get(self, field: str, default=None):
+        return self._store.value(self._row, field) if self._store.has(self._row, field) else default
+
+    def __repr__(self):
+        return f"JobView({self._store.row(self._row)!r})"
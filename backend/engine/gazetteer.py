@@ -0,0 +1,135 @@
+"""
+Location gazetteer for tiering jobs as local / regional / remote.
+
+City and state names (plus common aliases) are interned as integer IDs and
+matched as whole words, so "New Delhi" resolves to Delhi and a city name no
+longer matches inside an unrelated longer word. A location resolves to
+bitmasks of city and state IDs, which makes per-request tiering a couple of
+mask intersections.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from skills import SkillExtractor
+
+# India-wide Tech Hub Map for automatic regional expansion
+STATE_CITIES = {
+    "tamil nadu": ["chennai", "coimbatore", "madurai", "trichy", "tiruchirappalli", "salem", "tiruppur", "erode", "vellore", "thoothukudi", "tirunelveli", "thanjavur", "dindigul", "karur", "hosur", "namakkal", "tenkasi", "pudukkottai", "kanyakumari", "nagercoil", "virudhunagar", "sivakasi", "ramanathapuram", "ariyalur", "perambalur", "nagapattinam", "tiruvarur", "mayiladuthurai", "cuddalore", "villupuram", "kallakurichi", "tiruvannamalai", "ranipet", "tirupattur", "dharmapuri", "krishnagiri"],
+    "karnataka": ["bangalore", "bengaluru", "mysore", "mysuru", "mangalore", "mangaluru", "hubli", "dharwad", "belgaum", "gulbarga", "davangere", "bellary", "shimoga", "tumkur", "udupi", "bidar"],
+    "maharashtra": ["mumbai", "pune", "nagpur", "nashik", "aurangabad", "thane", "navi mumbai", "vashi", "solapur", "kolhapur", "amravati", "akola", "nanded", "sangli", "jalgaon"],
+    "telangana": ["hyderabad", "warangal", "secunderabad", "nizamabad", "karimnagar", "khammam", "ramagundam", "mahbubnagar"],
+    "andhra pradesh": ["visakhapatnam", "vizag", "vijayawada", "guntur", "nellore", "tirupati", "kakinada", "rajahmundry", "kurnool", "kadapa", "anantapur", "vizianagaram", "eluru"],
+    "delhi ncr": ["delhi", "new delhi", "gurgaon", "gurugram", "noida", "greater noida", "ghaziabad", "faridabad", "gurugram"],
+    "kerala": ["kochi", "trivandrum", "thiruvananthapuram", "kozhikode", "thrissur", "kollam", "palakkad", "alappuzha", "kottayam", "malappuram"],
+    "gujarat": ["ahmedabad", "surat", "vadodara", "baroda", "rajkot", "gandhinagar", "bhavnagar", "jamnagar", "junagadh", "anand", "navsari"],
+    "west bengal": ["kolkata", "howrah", "durgapur", "siliguri", "asansol", "kharagpur", "haldia", "bardhaman"],
+    "rajasthan": ["jaipur", "jodhpur", "udaipur", "kota", "ajmer", "bikaner", "alwar", "bhilwara", "sikar"],
+    "uttar pradesh": ["lucknow", "kanpur", "agra", "varanasi", "meerut", "prayagraj", "allahabad", "bareilly", "aligarh", "moradabad", "saharanpur", "gorakhpur", "jhansi"],
+    "madhya pradesh": ["indore", "bhopal", "jabalpur", "gwalior", "ujjain", "sagar", "ratlam", "rewa"],
+    "punjab": ["ludhiana", "amritsar", "jalandhar", "patiala", "bathinda", "mohali", "ajitgarh"],
+    "haryana": ["faridabad", "gurugram", "panipat", "ambala", "yamunanagar", "rohtak", "hissar", "karnal"],
+    "bihar": ["patna", "gaya", "bhagalpur", "muzaffarpur", "purnia", "darbhanga"],
+    "odisha": ["bhubaneswar", "cuttack", "rourkela", "berhampur", "sambalpur", "puri"],
+    "chhattisgarh": ["raipur", "bhilai", "bilaspur", "korba", "durg"],
+    "assam": ["guwahati", "silchar", "dibrugarh", "jorhat", "nagaon"],
+    "jharkhand": ["jamshedpur", "ranchi", "dhanbad", "bokaro", "hazaribagh"]
+}
+
+# Alternate spelling -> canonical city (both resolve to the same city ID)
+CITY_ALIASES = {
+    "bengaluru": "bangalore", "blr": "bangalore", "gurugram": "gurgaon", "mysuru": "mysore",
+    "mangaluru": "mangalore", "vizag": "visakhapatnam", "baroda": "vadodara", "trichy": "tiruchirappalli",
+    "allahabad": "prayagraj", "trivandrum": "thiruvananthapuram", "bombay": "mumbai", "madras": "chennai",
+    "calcutta": "kolkata", "cochin": "kochi", "ajitgarh": "mohali", "new delhi": "delhi",
+}
+
+STATE_ALIASES = {"tamilnadu": "tamil nadu", "orissa": "odisha", "ncr": "delhi ncr", "delhi-ncr": "delhi ncr"}
+
+REMOTE_KEYWORDS = ('remote', 'work from home', 'wfh')
+
+# cities / states: ID bitmasks; mentioned_states: states named in the text itself
+GeoLocation = namedtuple("GeoLocation", ["cities", "states", "mentioned_states", "is_remote", "text"])
+
+
+class Gazetteer:
+    def __init__(self, state_cities: dict, city_aliases: dict, state_aliases: dict):
+        self.state_ids = {}
+        self.city_ids = {}
+        self.city_states = []  # city id -> mask of states it belongs to
+
+        for state, cities in state_cities.items():
+            sid = self.state_ids.setdefault(state, len(self.state_ids))
+            for city in cities:
+                city = city_aliases.get(city, city)
+                cid = self.city_ids.get(city)
+                if cid is None:
+                    cid = self.city_ids[city] = len(self.city_states)
+                    self.city_states.append(0)
+                self.city_states[cid] |= 1 << sid
+
+        # name -> ("city" | "state", id)
+        self.names = {city: ("city", cid) for city, cid in self.city_ids.items()}
+        self.names.update({alias: ("city", self.city_ids[city]) for alias, city in city_aliases.items()
+                           if city in self.city_ids})
+        self.names.update({state: ("state", sid) for state, sid in self.state_ids.items()})
+        self.names.update({alias: ("state", self.state_ids[state]) for alias, state in state_aliases.items()})
+        self._extractor = SkillExtractor(list(self.names))
+
+    @lru_cache(maxsize=8192)
+    def resolve(self, text: str) -> GeoLocation:
+        """Resolves free location text (any case, tuple punctuation allowed)."""
+        text = re.sub(r"[\(\)\[\]\'\",]", " ", str(text or "")).lower()
+        text = " ".join(text.split())
+        cities = states = mentioned = 0
+        for name in self._extractor.find_terms(text):
+            kind, gid = self.names[name]
+            if kind == "city":
+                cities |= 1 << gid
+                states |= self.city_states[gid]
+            else:
+                mentioned |= 1 << gid
+        is_remote = any(kw in text for kw in REMOTE_KEYWORDS)
+        return GeoLocation(cities, states | mentioned, mentioned, is_remote, text)
+
+
+GAZETTEER = Gazetteer(STATE_CITIES, CITY_ALIASES, STATE_ALIASES)
+
+
+class StudentLocations:
+    """
+    A student's preferred locations, resolved once per request. A named state
+    makes its whole state local only when the student named no city ("Karnataka");
+    next to a city ("Bangalore, Karnataka") it only qualifies the city, and the
+    rest of the state is regional.
+    """
+
+    def __init__(self, pref_locs: list, gazetteer: Gazetteer = GAZETTEER):
+        self.cities = 0
+        self.pref_states = 0    # states that count as local (see above)
+        self.active_states = 0  # states of every preferred city or state
+        named_states = 0
+        hints = []
+        for item in pref_locs:
+            geo = gazetteer.resolve(item)
+            if geo.cities or geo.mentioned_states:
+                self.cities |= geo.cities
+                named_states |= geo.mentioned_states
+                self.active_states |= geo.states
+            elif item != 'any':
+                hints.append(geo.text)
+        # Places outside the gazetteer still match, as whole words
+        hints = [h for h in hints if h]
+        if not self.cities and all(h in REMOTE_KEYWORDS for h in hints):
+            self.pref_states = named_states
+        self.hint_re = re.compile(r'\b(?:' + '|'.join(map(re.escape, hints)) + r')\b') if hints else None
+
+    def is_local(self, geo: GeoLocation) -> bool:
+        return bool(
+            geo.cities & self.cities
+            or geo.states & self.pref_states
+            or (self.hint_re is not None and self.hint_re.search(geo.text))
+        )
+
+    def is_regional(self, geo: GeoLocation) -> bool:
+        return bool(geo.states & self.active_states)
@@ -0,0 +1,103 @@
+"""
+Bulk HTML-to-text cleaning for scraped descriptions.
+
+clean_html(text) replaces DataProcessor.clean_text's
+BeautifulSoup(text, "html.parser").get_text() (markup dropped, entities
+decoded, whitespace collapsed) without building a parse tree per item. The
+output differs on purpose in one way: block-level tags separate words, so
+"<li>Python</li><li>SQL</li>" gives "Python SQL" where get_text() gave
+"PythonSQL". Inline tags still join ("<b>Py</b>thon" gives "Python").
+
+Per item:
+
+  1. Text without '<' or '&' only has its whitespace collapsed.
+  2. Otherwise one compiled tokenizer pass drops comments, CDATA,
+     script/style blocks, declarations and tags (quoted attribute values may
+     contain '>'), turning block-level tags into a space, and html.unescape
+     decodes entities.
+  3. Text that still holds the start of a tag after that (an unclosed
+     '<div ...' or '<!--') is malformed; only then is the original run
+     through the full html.parser, the parser behind BeautifulSoup's
+     "html.parser" builder, so BeautifulSoup is no longer needed.
+
+Bulk cleaning is spread across cores at the job level: the chunks of a
+/clean-data job run concurrently on workers.JOB_POOL, a long-lived process pool.
+"""
+import html
+import re
+from html.parser import HTMLParser
+
+# Tags whose boundaries separate words ("<li>Python</li><li>SQL</li>" -> "Python SQL")
+BLOCK_TAGS = frozenset((
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "fieldset", "figcaption",
+    "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav",
+    "ol", "p", "pre", "section", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul",
+))
+# Attributes up to the closing '>', which may appear inside quoted values (unrolled: no backtracking blowup)
+_ATTRS = r"""[^<>"']*(?:(?:"[^"]*"|'[^']*')[^<>"']*)*"""
+
+# One left-to-right pass, so removing a construct never joins stray '<' text into a new tag.
+# Group 2 is set for block-level tags.
+_MARKUP = re.compile(
+    rf"<(?:!--.*?-->|!\[CDATA\[.*?\]\]>|(script|style)\b{_ATTRS}>.*?</\1\s*>|[!?](?!--)[^<>]*>"
+    rf"|/?({'|'.join(sorted(BLOCK_TAGS))})(?![\w-]){_ATTRS}>|/?[A-Za-z][^\s/<>]*{_ATTRS}>)", re.S | re.I)
+_LEFTOVER = re.compile(r"<[A-Za-z/!?]")
+
+
+class _TextExtractor(HTMLParser):
+    """Full-parser fallback: text outside script/style, block tags as spaces."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skipping += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append(" ")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append(" ")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def _replace(match) -> str:
+    return " " if match.group(2) else ""
+
+
+def parse_text(text: str) -> str:
+    """Text of `text` via the full parser (tolerates any malformed markup)."""
+    parser = _TextExtractor()
+    parser.feed(text)
+    parser.close()
+    return " ".join("".join(parser.parts).split())
+
+
+def clean_html(text: str) -> str:
+    if not text:
+        return ""
+    if not isinstance(text, str):
+        text = str(text)
+    if "<" not in text:
+        if "&" in text:
+            text = html.unescape(text)
+        return " ".join(text.split())
+    stripped = _MARKUP.sub(_replace, text)
+    if _LEFTOVER.search(stripped):
+        return parse_text(text)
+    if "&" in stripped:
+        stripped = html.unescape(stripped)
+    return " ".join(stripped.split())
+
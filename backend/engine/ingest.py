@@ -0,0 +1,136 @@
+"""
+One-time normalization of internship records.
+
+The bundled CSV export stores list columns as Python literals
+("['Python', 'SQL']", "('Chandigarh, Mohali',)"). They used to be cleaned up
+with regexes on every /match request. Records are now normalized once, when
+they enter the engine: literal list columns become real lists, the location
+becomes a de-duplicated list plus a readable display string, and the text
+fields get the matcher's tuple cleanup. `normalize_record` is idempotent, so
+already-prepared records pass through unchanged.
+"""
+import ast
+import csv
+import json
+import re
+
+# CSV header -> engine field (mirrors services/csvDataService.js)
+CSV_FIELD_MAP = {
+    'Internship Id': 'id',
+    'Role': 'role',
+    'Company Name': 'company',
+    'Location': 'location',
+    'Duration': 'duration',
+    'Stipend': 'stipend',
+    'Intern Type': 'internType',
+    'Skills': 'skills',
+    'Perks': 'perks',
+    'Hiring Since': 'hiringInfo',
+    'Opportunity Date': 'opportunities',
+    'Opening': 'openings',
+    'Website Link': 'websiteLink',
+}
+
+# Columns that may hold a Python-literal list / tuple
+LIST_FIELDS = ('skills', 'skills_required', 'perks', 'internType')
+# Free-text columns that get the tuple cleanup
+TEXT_FIELDS = ('role', 'company', 'sector')
+
+
+def csv_row_to_record(row: dict) -> dict:
+    """One CSV export row (original headers) -> raw engine record."""
+    job = {field: row.get(col) or '' for col, field in CSV_FIELD_MAP.items()}
+    job['description'] = f"{job['role']} at {job['company']}. {job['hiringInfo']}".strip()
+    return job
+
+
+def read_catalog_file(path: str) -> list:
+    """Reads internship rows from a CSV export or a JSON file."""
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            return [csv_row_to_record(row) for row in csv.DictReader(f)]
+
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get('internships', []) if isinstance(data, dict) else data
+
+
+def clean_tuple_text(val: str) -> str:
+    """("Delhi, Chennai", 'Delhi') style strings -> "Delhi Chennai"."""
+    # Remove tuple punctuation
+    cleaned_val = re.sub(r"[\(\)\'\",]", " ", val)
+    # Deduplicate tokens (e.g., "Delhi Chennai Delhi" -> "Delhi Chennai")
+    words = cleaned_val.split()
+    seen = set()
+    deduped = []
+    for w in words:
+        if w.lower() not in seen:
+            deduped.append(w)
+            seen.add(w.lower())
+    return " ".join(deduped).strip()
+
+
+def cleaned_field(job: dict, key: str):
+    """Value of job[key] after the matcher's tuple cleanup."""
+    val = str(job.get(key, ""))
+    # Handle ALL types of tuple formats: ('...',), ("...",), (...), etc
+    if "(" in val or "'" in val or '"' in val:
+        return clean_tuple_text(val)
+    return job.get(key, "")
+
+
+def as_text(value) -> str:
+    """A field as plain text; list fields are joined with ", "."""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    return "" if value is None else str(value)
+
+
+def parse_literal_list(value):
+    """"['A', 'B']" / "('A',)" -> ['A', 'B']. Anything else is returned unchanged."""
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    if not isinstance(value, str):
+        return value
+    s = value.strip()
+    if not s or s[0] not in '[(' or s[-1] not in '])':
+        return value
+    try:
+        parsed = ast.literal_eval(s)
+    except (ValueError, SyntaxError):
+        return value
+    if isinstance(parsed, str):
+        parsed = [parsed]
+    if not isinstance(parsed, (list, tuple)):
+        return value
+    return [str(v).strip() for v in parsed if str(v).strip()]
+
+
+def parse_locations(value) -> list:
+    """Location column -> distinct place names in listed order."""
+    items = parse_literal_list(value)
+    if not isinstance(items, list):
+        items = [as_text(items)]
+    places, seen = [], set()
+    for item in items:
+        for place in item.split(','):
+            place = place.strip(" '\"")
+            if place and place.lower() not in seen:
+                seen.add(place.lower())
+                places.append(place)
+    return places
+
+
+def normalize_record(raw: dict) -> dict:
+    """A cleaned copy of one internship record, ready for matching."""
+    job = dict(raw)
+    for key in LIST_FIELDS:
+        if key in job:
+            job[key] = parse_literal_list(job[key])
+    if 'location' in job:
+        job['locations'] = parse_locations(job['location'])
+        job['location'] = ", ".join(job['locations'])
+    for key in TEXT_FIELDS:
+        if key in job:
+            job[key] = cleaned_field(job, key)
+    return job
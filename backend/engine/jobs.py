@@ -0,0 +1,268 @@
+"""
+Background jobs with IDs, progress and persisted output.
+
+A large /clean-data request becomes a job. Its items are split into chunks
+of JOBS_CHUNK_SIZE and stored in SQLite (JOBS_DB) next to the job row. A
+private event loop thread then runs the chunks on the job process pool
+(workers.JOB_POOL), up to one per pool process at a time, so a single large
+job uses every core. Each finished chunk's output replaces its input in
+the store and advances the job's progress, so:
+
+  • GET /jobs/{id} shows status and progress while the job runs,
+  • GET /jobs/{id}/result returns the output once it is done,
+  • a job interrupted by a restart resumes from its first unfinished chunk
+    (JOBS.resume() at startup).
+
+At most JOBS_CONCURRENCY jobs run at once. Jobs never use the /match worker
+pool. Finished jobs are deleted JOBS_TTL seconds after they end.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from codec import dumps_json
+from metrics import REGISTRY
+from processor import DataProcessor
+from workers import JOB_POOL, PoolSaturated
+
+logger = logging.getLogger("Jobs")
+
+JOBS_DB = os.getenv('JOBS_DB', os.path.join(os.path.dirname(__file__), '..', 'data', 'jobs.sqlite3'))
+JOBS_CHUNK_SIZE = int(os.getenv('JOBS_CHUNK_SIZE', '200'))
+JOBS_CONCURRENCY = int(os.getenv('JOBS_CONCURRENCY', '2'))
+JOBS_TTL = float(os.getenv('JOBS_TTL', '86400'))
+# Seconds before a chunk the worker pool turned away is offered again
+JOBS_RETRY_DELAY = 0.5
+
+# Job kind -> function run on each chunk (a list of items; returns the output items).
+# Must be picklable: chunks run on a process pool.
+TASKS = {
+    "clean-data": DataProcessor.clean_items,
+}
+
+STATUSES = ("queued", "running", "done", "failed")
+
+
+class JobStore:
+    """Jobs and their chunks in SQLite; safe to use from any thread."""
+
+    def __init__(self, path: str = JOBS_DB, clock=time.time):
+        self.path = path
+        self.clock = clock
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT, status TEXT, total INTEGER, "
+            "processed INTEGER, chunks INTEGER, error TEXT, created_at REAL, updated_at REAL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS job_chunks (job_id TEXT, chunk INTEGER, input BLOB, output BLOB, "
+            "PRIMARY KEY (job_id, chunk))")
+        self._db.commit()
+
+    def create(self, kind: str, items: list, chunk_size: int) -> str:
+        job_id = uuid.uuid4().hex
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        now = self.clock()
+        with self._lock, self._db:
+            self._db.execute("INSERT INTO jobs VALUES (?, ?, 'queued', ?, 0, ?, NULL, ?, ?)",
+                             (job_id, kind, len(items), len(chunks), now, now))
+            self._db.executemany("INSERT INTO job_chunks VALUES (?, ?, ?, NULL)",
+                                 [(job_id, i, dumps_json(chunk)) for i, chunk in enumerate(chunks)])
+        return job_id
+
+    def get(self, job_id: str):
+        """The job's status row as a dict, or None for an unknown ID."""
+        with self._lock:
+            row = self._db.execute("SELECT id, kind, status, total, processed, chunks, error, created_at, updated_at "
+                                   "FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(("id", "kind", "status", "total", "processed", "chunks", "error",
+                        "created_at", "updated_at"), row))
+        job["progress"] = round(job["processed"] / job["total"], 4) if job["total"] else 1.0
+        return job
+
+    def pending_chunks(self, job_id: str) -> list:
+        """Numbers of the chunks without output, in order."""
+        with self._lock:
+            rows = self._db.execute("SELECT chunk FROM job_chunks WHERE job_id = ? AND output IS NULL "
+                                    "ORDER BY chunk", (job_id,)).fetchall()
+        return [chunk for (chunk,) in rows]
+
+    def chunk_input(self, job_id: str, chunk: int) -> list:
+        with self._lock:
+            (data,) = self._db.execute("SELECT input FROM job_chunks WHERE job_id = ? AND chunk = ?",
+                                       (job_id, chunk)).fetchone()
+        return json.loads(data)
+
+    def finish_chunk(self, job_id: str, chunk: int, output: list, processed: int):
+        with self._lock, self._db:
+            self._db.execute("UPDATE job_chunks SET output = ?, input = NULL WHERE job_id = ? AND chunk = ?",
+                             (dumps_json(output), job_id, chunk))
+            self._db.execute("UPDATE jobs SET processed = processed + ?, updated_at = ? WHERE id = ?",
+                             (processed, self.clock(), job_id))
+
+    def set_status(self, job_id: str, status: str, error: str = None):
+        with self._lock, self._db:
+            self._db.execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                             (status, error, self.clock(), job_id))
+
+    def result(self, job_id: str) -> list:
+        """The output items of every finished chunk, in input order."""
+        with self._lock:
+            rows = self._db.execute("SELECT output FROM job_chunks WHERE job_id = ? AND output IS NOT NULL "
+                                    "ORDER BY chunk", (job_id,)).fetchall()
+        return [item for (output,) in rows for item in json.loads(output)]
+
+    def unfinished(self) -> list:
+        """(id, kind) of jobs that were queued or running, oldest first."""
+        with self._lock:
+            return self._db.execute("SELECT id, kind FROM jobs WHERE status IN ('queued', 'running') "
+                                    "ORDER BY created_at").fetchall()
+
+    def purge(self, ended_before: float) -> int:
+        """Deletes jobs that finished before `ended_before`; returns how many."""
+        with self._lock, self._db:
+            ids = [r[0] for r in self._db.execute(
+                "SELECT id FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (ended_before,))]
+            self._db.executemany("DELETE FROM job_chunks WHERE job_id = ?", [(i,) for i in ids])
+            self._db.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in ids])
+        return len(ids)
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in STATUSES} | dict(rows)
+
+
+class JobRunner:
+    def __init__(self, store: JobStore = None, pool=JOB_POOL, concurrency: int = JOBS_CONCURRENCY,
+                 chunk_size: int = JOBS_CHUNK_SIZE, ttl: float = JOBS_TTL):
+        self._store = store
+        self.pool = pool
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loop = None
+        self._semaphore = None
+        self._running = {}  # job id -> concurrent.futures.Future of its run
+
+    @property
+    def store(self) -> JobStore:
+        """Opened on first use, so importing the engine never creates the database."""
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = JobStore()
+        return self._store
+
+    def _runner_loop(self):
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="job-runner", daemon=True).start()
+                    self._semaphore = asyncio.Semaphore(self.concurrency)
+                    self._loop = loop
+        return self._loop
+
+    def submit(self, kind: str, items: list) -> str:
+        """Stores a new job and starts it; returns its ID."""
+        if kind not in TASKS:
+            raise ValueError(f"Unknown job kind '{kind}'. Use one of: {', '.join(TASKS)}")
+        store = self.store
+        store.purge(store.clock() - self.ttl)
+        job_id = store.create(kind, items, self.chunk_size)
+        self._start(job_id, kind)
+        logger.info(f"Job {job_id} ({kind}) queued with {len(items)} items.")
+        return job_id
+
+    def resume(self) -> list:
+        """Restarts jobs a previous process left unfinished; returns their IDs."""
+        jobs = [(job_id, kind) for job_id, kind in self.store.unfinished() if job_id not in self._running]
+        for job_id, kind in jobs:
+            self._start(job_id, kind)
+        if jobs:
+            logger.info(f"Resumed {len(jobs)} unfinished job(s).")
+        return [job_id for job_id, _ in jobs]
+
+    def _start(self, job_id: str, kind: str):
+        loop = self._runner_loop()
+        with self._lock:
+            future = self._running[job_id] = asyncio.run_coroutine_threadsafe(self._run(job_id, kind), loop)
+        future.add_done_callback(lambda _: self._forget(job_id, future))
+
+    def _forget(self, job_id: str, future):
+        with self._lock:
+            if self._running.get(job_id) is future:
+                del self._running[job_id]
+
+    async def _run(self, job_id: str, kind: str):
+        store = self.store
+        async with self._semaphore:
+            store.set_status(job_id, "running")
+            # One chunk per pool process at a time; inputs are read as chunks start
+            slots = asyncio.Semaphore(self.pool.size)
+            task = TASKS[kind]
+
+            async def run_chunk(chunk: int):
+                async with slots:
+                    items = store.chunk_input(job_id, chunk)
+                    output = await self._run_chunk(task, items)
+                    store.finish_chunk(job_id, chunk, output, len(items))
+
+            chunks = [asyncio.ensure_future(run_chunk(c)) for c in store.pending_chunks(job_id)]
+            try:
+                await asyncio.gather(*chunks)
+            except Exception as e:
+                for pending in chunks:
+                    pending.cancel()
+                logger.error(f"Job {job_id} failed: {e}")
+                store.set_status(job_id, "failed", str(e))
+                return
+            store.set_status(job_id, "done")
+            logger.info(f"Job {job_id} done.")
+
+    async def _run_chunk(self, task, items: list) -> list:
+        while True:
+            try:
+                return await self.pool.run(task, items)
+            except PoolSaturated:
+                await asyncio.sleep(JOBS_RETRY_DELAY)
+
+    def status(self, job_id: str):
+        return self.store.get(job_id)
+
+    def result(self, job_id: str) -> list:
+        return self.store.result(job_id)
+
+    def wait(self, job_id: str, timeout: float = None):
+        """Blocks until the job's current run ends (no-op when it is not running here)."""
+        future = self._running.get(job_id)
+        if future is not None:
+            future.result(timeout)
+
+    def info(self) -> dict:
+        counts = self._store.counts() if self._store is not None else {}
+        return {"running": len(self._running), "concurrency": self.concurrency, **counts,
+                "pool": self.pool.info()}
+
+
+JOBS = JobRunner()
+
+
+@REGISTRY.register_collector
+def _collect_jobs() -> list:
+    if JOBS._store is None:
+        return []
+    return [("engine_jobs", "gauge", "Background jobs by status.",
+             [({"status": status}, n) for status, n in JOBS.store.counts().items()])]
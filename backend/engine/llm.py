@@ -0,0 +1,365 @@
+"""
+Shared async Gemini client.
+
+Every LLM call in the engine goes through `LLM`. Calls run on one private
+event loop thread, behind a global semaphore (LLM_CONCURRENCY) with a bounded
+wait queue (LLM_QUEUE_LIMIT). Each call has a deadline that covers both the
+queue wait and the request itself; when it passes the request is cancelled
+rather than left running in an abandoned thread.
+
+Async handlers `await LLM.generate(...)` and check `await LLM.available_async()`
+(the first model load runs off the event loop); sync code (matcher stages
+running in a worker thread) uses `LLM.generate_sync(...)` and `LLM.available`. Both raise LLMUnavailable
+when there is no model, the queue is full, the deadline passes or the call
+fails, so callers keep their existing rule-based fallbacks.
+
+Every call's duration is recorded in engine_llm_call_seconds{outcome}.
+
+Responses are cached by a hash of (model, prompt, generation config) in a
+size-bounded LRU with a TTL, optionally backed by SQLite (LLM_CACHE_DB) so
+popular prompts survive restarts; the file keeps at most LLM_CACHE_DB_ROWS
+rows. A hit never takes a concurrency slot.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import LLM_CALL_SECONDS, REGISTRY, register_cache
+
+logger = logging.getLogger("LLM")
+
+GEMINI_MODEL = 'gemini-1.5-flash'
+LLM_CONCURRENCY = int(os.getenv('LLM_CONCURRENCY', '4'))
+LLM_QUEUE_LIMIT = int(os.getenv('LLM_QUEUE_LIMIT', '32'))
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '20'))
+LLM_CACHE_SIZE = int(os.getenv('LLM_CACHE_SIZE', '512'))
+LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', '86400'))
+LLM_CACHE_DB = os.getenv('LLM_CACHE_DB', '')  # e.g. ./llm_cache.sqlite3; empty = memory only
+LLM_CACHE_DB_ROWS = int(os.getenv('LLM_CACHE_DB_ROWS', '50000'))  # newest rows kept on disk
+
+
+class LLMUnavailable(Exception):
+    """No LLM answer: not configured, overloaded, timed out or failed."""
+
+    def __init__(self, message: str, reason: str = "unavailable"):
+        super().__init__(message)
+        self.reason = reason  # "unavailable", "rejected", "timeout" or "error"
+
+
+def cache_key(model_name: str, prompt: str, generation_config: dict = None) -> str:
+    payload = json.dumps([model_name, prompt, generation_config or {}], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    LRU of response texts with a TTL, optionally mirrored to a SQLite file.
+    Disk writes go through one writer thread, which also keeps the table under
+    `max_rows`; disk reads on a memory miss run outside the lock.
+    """
+
+    def __init__(self, max_size: int = LLM_CACHE_SIZE, ttl: float = LLM_CACHE_TTL,
+                 db_path: str = LLM_CACHE_DB, clock=time.time, max_rows: int = LLM_CACHE_DB_ROWS,
+                 table: str = "llm_cache"):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.max_rows = max_rows
+        self.db_path = db_path
+        self.table = table
+        self._entries = OrderedDict()  # key -> (expires_at, text)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "disk_hits": 0, "evictions": 0, "expired": 0}
+        self._readers = threading.local()
+        self._writes = None
+        if db_path:
+            db = sqlite3.connect(db_path)
+            db.execute("PRAGMA journal_mode=WAL")  # readers never wait for the writer
+            db.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, expires_at REAL, text TEXT)")
+            db.execute(f"DELETE FROM {table} WHERE expires_at <= ?", (clock(),))
+            db.commit()
+            db.close()
+            self._writes = queue.SimpleQueue()
+            threading.Thread(target=self._write_loop, name="llm-cache-writer", daemon=True).start()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _memory_get(self, key: str, now: float):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+            return entry
+
+    def _disk_get(self, key: str, now: float):
+        db = getattr(self._readers, "db", None)
+        if db is None:
+            db = self._readers.db = sqlite3.connect(self.db_path)
+        row = db.execute(f"SELECT expires_at, text FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        with self._lock:
+            if row is None or row[0] <= now:
+                self.stats["misses"] += 1
+                return None
+            self._entries[key] = (row[0], row[1])
+            self._evict()
+            self.stats["disk_hits"] += 1
+            self.stats["hits"] += 1
+            return row[1]
+
+    def get(self, key: str):
+        now = self.clock()
+        entry = self._memory_get(key, now)
+        if entry is not None:
+            return entry[1]
+        if self._writes is None:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        return self._disk_get(key, now)
+
+    async def get_async(self, key: str):
+        """get() for event loop threads: a disk lookup runs in the default executor."""
+        now = self.clock()
+        entry = self._memory_get(key, now)
+        if entry is not None:
+            return entry[1]
+        if self._writes is None:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        return await asyncio.to_thread(self._disk_get, key, now)
+
+    def put(self, key: str, text: str):
+        expires_at = self.clock() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, text)
+            self._entries.move_to_end(key)
+            self._evict()
+        if self._writes is not None:
+            self._writes.put((key, expires_at, text))
+
+    def flush(self):
+        """Blocks until every put() so far is on disk."""
+        if self._writes is not None:
+            done = threading.Event()
+            self._writes.put(done)
+            done.wait()
+
+    def _write_loop(self):
+        db = sqlite3.connect(self.db_path)
+        while True:
+            batch = [self._writes.get()]
+            while True:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [item for item in batch if isinstance(item, tuple)]
+            try:
+                if rows:
+                    db.executemany(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?)", rows)
+                    db.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (self.clock(),))
+                    # A replaced key gets a new rowid, so the lowest rowids are the oldest writes
+                    db.execute(f"DELETE FROM {self.table} WHERE rowid IN "
+                               f"(SELECT rowid FROM {self.table} ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                               (self.max_rows,))
+                    db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache write failed: {e}")
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _evict(self):
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def info(self) -> dict:
+        return {"size": len(self), "max_size": self.max_size, "ttl": self.ttl,
+                "persistent": self._writes is not None, **self.stats}
+
+
+class LLMClient:
+    def __init__(self, model_name: str = GEMINI_MODEL, concurrency: int = LLM_CONCURRENCY,
+                 queue_limit: int = LLM_QUEUE_LIMIT, timeout: float = LLM_TIMEOUT,
+                 cache: ResponseCache = None):
+        self.model_name = model_name
+        self.cache = cache
+        self.concurrency = concurrency
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self._model = None
+        self._initialized = False
+        self._lock = threading.Lock()
+        self._loop = None
+        self._semaphore = None
+        # Only touched on the client loop thread
+        self.queued = 0
+        self.in_flight = 0
+        self.stats = {"calls": 0, "ok": 0, "timeouts": 0, "rejected": 0, "errors": 0}
+
+    # ── Model ────────────────────────────────────────────────────────────────
+    @property
+    def model(self):
+        """Lazy load Gemini model."""
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    self._model = self._load_model()
+                    self._initialized = True
+        return self._model
+
+    def _load_model(self):
+        api_key = os.getenv('GEMINI_API_KEY') or os.getenv('GEMINI_RESUME_API_KEY')
+        if not api_key:
+            print("⚠️ No GEMINI_API_KEY.")
+            return None
+        try:
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel(self.model_name)
+            print("✅ Gemini initialized.")
+            return model
+        except Exception as e:
+            print(f"❌ Gemini failed: {e}")
+            return None
+
+    @property
+    def available(self) -> bool:
+        return self.model is not None
+
+    async def model_async(self):
+        """`model` for event loop threads: a first load (import, configure) runs in the default executor."""
+        if self._initialized:
+            return self._model
+        return await asyncio.to_thread(lambda: self.model)
+
+    async def available_async(self) -> bool:
+        return await self.model_async() is not None
+
+    # ── Calls ────────────────────────────────────────────────────────────────
+    def _client_loop(self):
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="llm-client", daemon=True).start()
+                    self._semaphore = asyncio.Semaphore(self.concurrency)
+                    self._loop = loop
+        return self._loop
+
+    async def _request(self, model, prompt: str, generation_config: dict):
+        kwargs = {"generation_config": generation_config} if generation_config else {}
+        if hasattr(model, "generate_content_async"):
+            return await model.generate_content_async(prompt, **kwargs)
+        return await asyncio.to_thread(model.generate_content, prompt, **kwargs)
+
+    async def _generate(self, prompt: str, timeout: float, generation_config: dict, use_cache: bool) -> str:
+        """_attempt() plus its duration in engine_llm_call_seconds{outcome}."""
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            text, outcome = await self._attempt(prompt, timeout, generation_config, use_cache)
+            return text
+        except LLMUnavailable as e:
+            outcome = e.reason
+            raise
+        finally:
+            LLM_CALL_SECONDS.observe(time.perf_counter() - start, outcome=outcome)
+
+    async def _attempt(self, prompt: str, timeout: float, generation_config: dict, use_cache: bool) -> tuple:
+        """Returns (text, "cached" or "ok"); raises LLMUnavailable."""
+        model = await self.model_async()
+        if model is None:
+            raise LLMUnavailable("Gemini is not configured")
+        self.stats["calls"] += 1
+        key = None
+        if use_cache and self.cache is not None:
+            key = cache_key(self.model_name, prompt, generation_config)
+            cached = await self.cache.get_async(key)
+            if cached is not None:
+                return cached, "cached"
+        if self.queued >= self.queue_limit:
+            self.stats["rejected"] += 1
+            raise LLMUnavailable(f"LLM queue full ({self.queued} waiting)", reason="rejected")
+
+        deadline = time.monotonic() + timeout
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise LLMUnavailable(f"Timed out after {timeout:.1f}s waiting for an LLM slot", reason="timeout")
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        try:
+            response = await asyncio.wait_for(
+                self._request(model, prompt, generation_config), max(0.0, deadline - time.monotonic())
+            )
+            text = response.text.strip()
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise LLMUnavailable(f"LLM call cancelled after {timeout:.1f}s", reason="timeout")
+        except Exception as e:
+            self.stats["errors"] += 1
+            raise LLMUnavailable(f"LLM call failed: {e}", reason="error") from e
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+        self.stats["ok"] += 1
+        if key is not None and text:
+            self.cache.put(key, text)
+        return text, "ok"
+
+    def _submit(self, prompt: str, timeout: float, generation_config: dict, cache: bool):
+        return asyncio.run_coroutine_threadsafe(
+            self._generate(prompt, timeout or self.timeout, generation_config, cache), self._client_loop()
+        )
+
+    async def generate(self, prompt: str, timeout: float = None, generation_config: dict = None,
+                       cache: bool = True) -> str:
+        """Response text for `prompt`; raises LLMUnavailable instead of hanging."""
+        return await asyncio.wrap_future(self._submit(prompt, timeout, generation_config, cache))
+
+    def generate_sync(self, prompt: str, timeout: float = None, generation_config: dict = None,
+                      cache: bool = True) -> str:
+        """Blocking variant of generate() for code that is not running on an event loop."""
+        return self._submit(prompt, timeout, generation_config, cache).result()
+
+    def info(self) -> dict:
+        return {
+            "available": self._model is not None,
+            "concurrency": self.concurrency,
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            **self.stats,
+            "cache": self.cache.info() if self.cache is not None else None,
+        }
+
+
+LLM = LLMClient(cache=ResponseCache())
+register_cache("llm", lambda: LLM.cache)
+
+
+@REGISTRY.register_collector
+def _collect_llm() -> list:
+    return [
+        ("engine_llm_queued", "gauge", "LLM calls waiting for a concurrency slot.", [({}, LLM.queued)]),
+        ("engine_llm_in_flight", "gauge", "LLM calls running.", [({}, LLM.in_flight)]),
+    ]
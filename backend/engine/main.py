@@ -1,23 +1,123 @@
+# Time every import below (GET /startup)
+from startup import PROFILE
+PROFILE.install()
+
+import asyncio
 import os
+import re
 import json
 import logging
-from typing import List, Dict, Any
-from fastapi import FastAPI, BackgroundTasks, HTTPException, Request
-from pydantic import BaseModel
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Literal, Optional, Union
+from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, ValidationError
 from dotenv import load_dotenv
 
 # Import our logic
-from matcher import process_matching, KNOWN_SKILLS, analyze_resume_deep
+from matcher import (apply_explanations, batch_response, explanation_order, llm_explanations_async,
+                     rank_matches, rank_matches_batch, resume_analysis_fallback, resume_analysis_llm,
+                     resume_analysis_start, KNOWN_SKILLS, RESUME_CACHE)
 from processor import DataProcessor
+from catalog import StaleCatalogVersion, get_catalog, load_catalog, validate_filters
+from llm import LLM
+from jobs import JOBS
+from workers import JOB_POOL, POOL, STATELESS_POOL, PoolSaturated
+from metrics import HTTP_REQUEST_SECONDS, LLM_RESULTS, REGISTRY, register_pool
+from codec import (MSGPACK, UnsupportedMediaType, decode_model, dumps_json, encode, msgpack_available, negotiate,
+                   request_body_schema)
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("PythonBrain")
 
 # Load Environment
-load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+with PROFILE.phase("dotenv"):
+    load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+PROFILE.finish_imports()
+
+# Bundled catalog source ("csv"/"json") loaded before serving; empty = wait for /catalog/load
+CATALOG_PRELOAD = os.getenv('CATALOG_PRELOAD', '')
+# /clean-data requests with more items than this run as a background job
+CLEAN_SYNC_LIMIT = int(os.getenv('CLEAN_SYNC_LIMIT', '50'))
+# Import and configure the Gemini client in the background at startup instead of on first use
+LLM_WARMUP = os.getenv('LLM_WARMUP', '1') == '1'
+
+
+def _warm_llm():
+    with PROFILE.phase("llm_warmup"):
+        LLM.model
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if LLM_WARMUP:
+        threading.Thread(target=_warm_llm, name="llm-warmup", daemon=True).start()
+    if CATALOG_PRELOAD:
+        with PROFILE.phase("catalog_preload"):
+            try:
+                await POOL.run(load_catalog, None, CATALOG_PRELOAD)
+            except Exception as e:
+                logger.error(f"Preloading catalog '{CATALOG_PRELOAD}' failed: {e}")
+    JOBS.resume()
+    PROFILE.mark_ready()
+    report = PROFILE.report(top=0)
+    logger.info(f"Ready {report['ready_ms']:.0f}ms after process start (imports {report['imports_ms']:.0f}ms).")
+    yield
+
+
+app = FastAPI(title="Internship Platform AI Brain", version="2.0.0", lifespan=lifespan)
+
+register_pool("workers", POOL)
+if STATELESS_POOL is not POOL:
+    register_pool("stateless", STATELESS_POOL)
+register_pool("jobs", JOB_POOL)
+
+
+class RecordLatency:
+    """
+    Times every request by route template (not raw path, so IDs don't explode
+    the labels) until the last body message is sent, so streamed responses are
+    timed to their end rather than to their first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            recorded = True
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=scope["method"],
+                                         route=getattr(route, "path", "unmatched"), status=status)
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and not recorded:
+                record()
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            if not recorded:  # failed or disconnected before the body was complete
+                record()
+
 
-app = FastAPI(title="Internship Platform AI Brain", version="2.0.0")
+app.add_middleware(RecordLatency)
 
 # --- Models ---
 class StudentProfile(BaseModel):
@@ -30,8 +130,72 @@ class StudentProfile(BaseModel):
 
 class RecommendationRequest(BaseModel):
     student: Dict[str, Any]
-    internships: List[Dict[str, Any]]
+    # Legacy: full job list per call. Omit it to match against the loaded catalog.
+    internships: Optional[List[Dict[str, Any]]] = None
+    catalog_version: Optional[str] = None
+    job_ids: Optional[List[Union[int, str]]] = None
+    filters: Optional[Dict[str, Any]] = None
+    full_pool: bool = False  # score every preferred-sector job instead of the capped pool
     workPreference: str = "office"
+    similarity: Optional[Literal["jaccard", "tfidf"]] = None  # default: MATCH_SIMILARITY
+    retrieval: Optional[Literal["exhaustive", "lsh"]] = None  # default: MATCH_RETRIEVAL
+    lsh_top_n: Optional[int] = None  # candidates kept by 'lsh' retrieval (default: LSH_TOP_N)
+    topk: Optional[Literal["pruned", "exhaustive"]] = None  # default: MATCH_TOPK
+
+class BatchRecommendationRequest(BaseModel):
+    students: List[Dict[str, Any]]
+    internships: Optional[List[Dict[str, Any]]] = None
+    catalog_version: Optional[str] = None
+    job_ids: Optional[List[Union[int, str]]] = None
+    filters: Optional[Dict[str, Any]] = None
+    full_pool: bool = False
+    workPreference: str = "office"
+    similarity: Optional[Literal["jaccard", "tfidf"]] = None
+    top_k: int = 10
+    explain: bool = False  # run the Gemini stage per student (slow); rule-based text otherwise
+
+class CatalogLoadRequest(BaseModel):
+    internships: Optional[List[Dict[str, Any]]] = None
+    source: Optional[str] = None  # "csv" or "json" (bundled data files)
+    columnar: Optional[bool] = None  # load `source` from the mmap'd columnar file (default: CATALOG_COLUMNAR)
+
+class CatalogUpsertRequest(BaseModel):
+    internships: List[Dict[str, Any]]  # each needs an 'id'; existing IDs are replaced
+    catalog_version: Optional[str] = None  # if set, the change is refused unless it is still current
+
+class CatalogDeleteRequest(BaseModel):
+    job_ids: List[Union[str, int]]
+    catalog_version: Optional[str] = None
+
+class MatchResult(BaseModel):
+    """One ranked internship: the job's own fields plus its scores and explanation."""
+    model_config = ConfigDict(extra="allow")
+    id: Union[str, int]
+    role: str = ""
+    company: str = ""
+    location: str = ""
+    match_score: int
+    match_percentage: str
+    match_type: str
+    semantic_score: float
+    matched_skills_list: List[str] = []
+    missing_skills: List[str] = []
+    gap_analysis: Dict[str, Any] = {}
+    aiExplanation: str = ""
+    roadmap: Dict[str, Any] = {}
+    llm_reranked: bool = False
+
+class MatchData(BaseModel):
+    results: List[MatchResult]
+    location_fallback: bool = False
+
+class MatchResponse(BaseModel):
+    success: bool
+    data: MatchData
+
+class BatchMatchResponse(BaseModel):
+    success: bool
+    data: List[MatchData]  # one per student, in request order
 
 class ResumeAnalysisRequest(BaseModel):
     resumeText: str
@@ -41,51 +205,213 @@ class CleaningRequest(BaseModel):
 
 
 
-# --- Background Workers Simulation ---
-def background_data_cleaning(items: List[Dict[str, Any]]):
-    """Simulates a background job for cleaning large datasets."""
-    logger.info(f"Starting background cleaning for {len(items)} items...")
-    cleaned = []
-    for item in items:
-        # Normalize locations
-        if "location" in item:
-            item["location"] = DataProcessor.normalize_location(item["location"])
-        # Clean description HTML
-        if "description" in item:
-            item["description"] = DataProcessor.clean_text(item["description"])
-        cleaned.append(item)
-    
-    # In a real scenario, we would save this back to the DB or notify Node.js
-    logger.info("Background cleaning complete.")
+# --- Bodies (see codec.py) ---
+def decoded(model):
+    """Dependency: the body validated into `model`, from JSON or MessagePack."""
+    async def parse(request: Request):
+        try:
+            return decode_model(model, await request.body(), request.headers.get("content-type"))
+        except ValidationError as e:
+            errors = e.errors(include_url=False, include_context=False, include_input=False)
+            raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in errors])
+        except UnsupportedMediaType as e:
+            raise HTTPException(status_code=415, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return parse
+
+def respond(request: Request, payload) -> Response:
+    """Encodes `payload` as JSON, or MessagePack when the client accepts it."""
+    media_type = negotiate(request.headers.get("accept"))
+    return Response(encode(payload, media_type), media_type=media_type)
+
+def response_doc(model) -> dict:
+    """OpenAPI `responses` for a route answering through respond(): `model` is documented, not validated."""
+    doc = {"model": model, "description": "Successful Response"}
+    if msgpack_available():
+        doc["content"] = {MSGPACK: {}}
+    return {200: doc}
 
 # --- Endpoints ---
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "engine": "Python 3.10", "nlp": "Ready"}
+    return {
+        "status": "healthy", "engine": "Python 3.10", "nlp": "Ready",
+        "llm": LLM.info(),
+        "resume_cache": RESUME_CACHE.info(),
+        "workers": POOL.info(),
+        "stateless_workers": STATELESS_POOL.info() if STATELESS_POOL is not POOL else None,
+        "jobs": JOBS.info(),
+    }
 
-@app.post("/match")
-async def match_internships(request: RecommendationRequest):
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/startup")
+async def startup_profile(top: int = 25):
+    """Where this process spent its startup: imports per module and package, plus startup phases."""
+    return PROFILE.report(top)
+
+@app.post("/catalog/load", openapi_extra=request_body_schema(CatalogLoadRequest))
+async def catalog_load(request: CatalogLoadRequest = Depends(decoded(CatalogLoadRequest))):
+    """Loads (or replaces) the engine-owned internship catalog."""
+    if request.internships is None and not request.source:
+        raise HTTPException(status_code=400, detail="Provide either 'internships' or 'source'")
+    try:
+        catalog = await POOL.run(load_catalog, request.internships, request.source, request.columnar)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "data": catalog.info()}
+
+async def _update_catalog(method: str, *args):
+    """Runs an incremental catalog update; returns the changed job IDs and the new catalog info."""
+    catalog = get_catalog()
+    if catalog is None:
+        raise HTTPException(status_code=409, detail="No catalog loaded. POST /catalog/load first.")
+    try:
+        changed = await POOL.run(getattr(catalog, method), *args)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except StaleCatalogVersion as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "data": {**catalog.info(), "changed": changed}}
+
+@app.post("/catalog/upsert", openapi_extra=request_body_schema(CatalogUpsertRequest))
+async def catalog_upsert(request: CatalogUpsertRequest = Depends(decoded(CatalogUpsertRequest))):
+    """Adds or replaces internships in the loaded catalog without a full rebuild."""
+    return await _update_catalog("upsert", request.internships, request.catalog_version)
+
+@app.post("/catalog/delete", openapi_extra=request_body_schema(CatalogDeleteRequest))
+async def catalog_delete(request: CatalogDeleteRequest = Depends(decoded(CatalogDeleteRequest))):
+    """Removes internships from the loaded catalog by ID."""
+    return await _update_catalog("delete", request.job_ids, request.catalog_version)
+
+@app.get("/catalog")
+async def catalog_info():
+    catalog = get_catalog()
+    if catalog is None:
+        return {"success": True, "data": {"catalog_version": None, "count": 0}}
+    return {"success": True, "data": catalog.info()}
+
+def _resolve_match_catalog(request: RecommendationRequest):
+    """Returns the catalog a /match call runs against, or None for inline job lists."""
+    if request.internships is not None:
+        return None
+
+    catalog = get_catalog()
+    if catalog is None:
+        raise HTTPException(status_code=409, detail="No catalog loaded. POST /catalog/load first.")
+    if request.catalog_version and request.catalog_version != catalog.version:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Stale catalog_version '{request.catalog_version}', current is '{catalog.version}'"
+        )
+    try:
+        validate_filters(request.filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return catalog
+
+@app.post("/match", responses=response_doc(MatchResponse), openapi_extra=request_body_schema(RecommendationRequest))
+async def match_internships(raw: Request, request: RecommendationRequest = Depends(decoded(RecommendationRequest))):
     """Advanced Matching Engine Endpoint."""
+    catalog = _resolve_match_catalog(request)
     try:
-        # We pass the dict directly to the existing process_matching function
-        results = process_matching(request.dict())
-        return {"success": True, "data": results}
+        # The validated fields are fresh objects already: a shallow dict is enough (no deep copy).
+        # Scoring runs on the worker pool so a heavy match never blocks the event loop; the
+        # LLM stage is awaited here, so a slow Gemini call never holds a pool thread.
+        ranked = await POOL.run(rank_matches, dict(request), catalog=catalog)
+        patches = await llm_explanations_async(ranked["student"], ranked["results"])
+        results = {"results": apply_explanations(ranked["results"], patches),
+                   "location_fallback": ranked["location_fallback"]}
+        return respond(raw, {"success": True, "data": results})
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Matching Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/match/stream", openapi_extra=request_body_schema(RecommendationRequest))
+async def match_internships_stream(request: RecommendationRequest = Depends(decoded(RecommendationRequest))):
+    """
+    Streaming /match (NDJSON): the ranked results with rule-based explanations come
+    first, then one line per Gemini explanation, then the final order.
+    """
+    catalog = _resolve_match_catalog(request)
+    data = dict(request)
+
+    async def events():
+        # Scoring runs on the worker pool, the LLM stage on the async client
+        try:
+            ranked = await POOL.run(rank_matches, data, catalog=catalog)
+            results = ranked["results"]
+            yield dumps_json({"event": "results", "results": results,
+                              "location_fallback": ranked["location_fallback"]}) + b"\n"
+            patches = await llm_explanations_async(ranked["student"], results)
+            for patch in patches:
+                yield dumps_json({"event": "explanation", **patch, "llm_reranked": True}) + b"\n"
+            yield dumps_json({"event": "done", "order": explanation_order(patches, len(results)),
+                              "llm_reranked": bool(patches)}) + b"\n"
+        except Exception as e:
+            logger.error(f"Streaming Match Error: {str(e)}")
+            yield dumps_json({"event": "error", "detail": str(e)}) + b"\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.post("/match/batch", responses=response_doc(BatchMatchResponse),
+          openapi_extra=request_body_schema(BatchRecommendationRequest))
+async def match_internships_batch(raw: Request,
+                                  request: BatchRecommendationRequest = Depends(decoded(BatchRecommendationRequest))):
+    """Matches many students against the same catalog (or internship list) in one call."""
+    catalog = _resolve_match_catalog(request)
+    try:
+        ranked = await POOL.run(rank_matches_batch, dict(request), catalog=catalog)
+        patches = None
+        if request.explain:
+            # Bounded so one batch cannot fill the LLM queue for everyone else
+            slots = asyncio.Semaphore(LLM.concurrency)
+
+            async def explain(r):
+                async with slots:
+                    return await llm_explanations_async(r["student"], r["results"])
+
+            patches = await asyncio.gather(*(explain(r) for r in ranked))
+        return respond(raw, {"success": True, "data": batch_response(ranked, patches)})
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Batch Matching Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/analyze-resume")
 async def analyze_resume(request: ResumeAnalysisRequest):
     """Resume Parsing & Extraction Endpoint."""
     try:
-        # Extract full profile using the deep AI engine
-        profile_data = analyze_resume_deep(request.resumeText)
-        
+        # Extract full profile using the deep AI engine: CPU stages on the pool, Gemini awaited here
+        state = await STATELESS_POOL.run(resume_analysis_start, request.resumeText)
+        profile_data = state["data"]
+        if profile_data is None:
+            profile_data = await resume_analysis_llm(state)
+        if profile_data is None:
+            profile_data = await STATELESS_POOL.run(resume_analysis_fallback, request.resumeText, state)
+
         return {
             "success": True,
             "data": profile_data
         }
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Resume Analysis Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -94,8 +420,6 @@ async def analyze_resume(request: ResumeAnalysisRequest):
 async def generate_project_ideas(request: Dict[str, Any]):
     """Generates 3 unique project ideas for a missing skill with real-world 2024-25 context."""
     try:
-        from matcher import get_gemini_model, is_gemini_available
-        
         skill = request.get('skill', 'Development')
         company = request.get('company', 'this industry')
         
@@ -111,8 +435,7 @@ async def generate_project_ideas(request: Dict[str, Any]):
         is_design = any(k in sk_lower for k in ['design', 'archit', 'ui', 'ux', 'graphic', 'video', 'interior', 'textile', 'art'])
         is_operations = any(k in sk_lower for k in ['operat', 'supply', 'logistic', 'manage', 'admin', 'event'])
 
-        g_model = get_gemini_model()
-        if not is_gemini_available() or g_model is None:
+        if not await LLM.available_async():
             # Dynamic role-based fallback
             if "data" in sk_lower or "analytics" in sk_lower:
                 ideas = [
@@ -168,6 +491,7 @@ async def generate_project_ideas(request: Dict[str, Any]):
                     f"AI-Driven {clean_skill} Optimizer: An automated efficiency tool for {company}.",
                     f"Smart {clean_skill} Auditor: A compliance tracker for the modern 2025 market."
                 ]
+            LLM_RESULTS.inc(feature="project_ideas", result="fallback")
             return {"success": True, "data": {"ideas": ideas}}
 
         prompt = f"""You are a creative technical and professional mentor. 
@@ -198,11 +522,10 @@ async def generate_project_ideas(request: Dict[str, Any]):
         
         Only output raw JSON."""
         
-        response = g_model.generate_content(
+        content = await LLM.generate(
             prompt,
             generation_config={"temperature": 0.98, "top_p": 1.0} 
         )
-        content = response.text.strip()
         
         if "```json" in content:
             content = content.split("```json")[1].split("```")[0].strip()
@@ -211,9 +534,12 @@ async def generate_project_ideas(request: Dict[str, Any]):
             end = content.rfind("}") + 1
             content = content[start:end]
             
-        return {"success": True, "data": json.loads(content)}
+        data = json.loads(content)
+        LLM_RESULTS.inc(feature="project_ideas", result="llm")
+        return {"success": True, "data": data}
     except Exception as e:
         logger.error(f"Project Ideas Error: {str(e)}")
+        LLM_RESULTS.inc(feature="project_ideas", result="fallback")
         # Ultimate fallback with generic professional logic
         sk_lower = clean_skill.lower() if 'clean_skill' in locals() else ""
         if any(k in sk_lower for k in ['finance', 'account']):
@@ -261,8 +587,6 @@ async def generate_dream_roadmap(request: RoadmapRequest):
     """Generates a personalized career roadmap from resume text and a dream company."""
     dream_company = request.company or "a top tech company"
     try:
-        from matcher import get_gemini_model, is_gemini_available
-
         student = request.student or {}
         resume_text = request.resume_text or ""
         skills_from_profile = student.get('skills', []) if isinstance(student, dict) else []
@@ -276,20 +600,9 @@ async def generate_dream_roadmap(request: RoadmapRequest):
         else:
             student_context = f"QUALIFICATION: {qualification}\n(No skills or resume provided — generate a generic roadmap)"
 
-        # Try to use Gemini model, with fallback to resume api key if needed
-        model_to_use = get_gemini_model()
-        if not is_gemini_available() or model_to_use is None:
-            # Try initializing locally with fallback key
-            fb_key = os.getenv('GEMINI_RESUME_API_KEY') or os.getenv('GEMINI_API_KEY')
-            if fb_key:
-                try:
-                    import google.generativeai as genai
-                    genai.configure(api_key=fb_key)
-                    model_to_use = genai.GenerativeModel('gemini-1.5-flash')
-                except:
-                    model_to_use = None
-            
-        if model_to_use is None:
+        # The shared client falls back to GEMINI_RESUME_API_KEY when GEMINI_API_KEY is unset
+        if not await LLM.available_async():
+            LLM_RESULTS.inc(feature="dream_roadmap", result="fallback")
             return {"success": True, "data": _smart_fallback(dream_company, student)}
 
         prompt = f"""You are a Silicon Valley Technical Career Coach. A student targeting **{dream_company}** needs a roadmap.
@@ -344,11 +657,10 @@ OUTPUT JSON ONLY:
 }}"""
 
         try:
-            response = model_to_use.generate_content(
+            content = await LLM.generate(
                 prompt,
                 generation_config={"temperature": 0.8, "top_p": 0.95, "max_output_tokens": 2048}
             )
-            content = response.text.strip()
         except Exception as ai_err:
             print(f"❌ Gemini Content Generation Failed: {str(ai_err)}")
             raise ai_err
@@ -367,10 +679,12 @@ OUTPUT JSON ONLY:
             try: parsed["readiness"] = int(re.search(r'\d+', parsed["readiness"]).group())
             except: parsed["readiness"] = 30
 
+        LLM_RESULTS.inc(feature="dream_roadmap", result="llm")
         return {"success": True, "data": parsed}
 
     except Exception as e:
         logger.error(f"Dream Roadmap AI Error: {str(e)}")
+        LLM_RESULTS.inc(feature="dream_roadmap", result="fallback")
         return {"success": True, "data": _smart_fallback(dream_company, student or {})}
 
 
@@ -461,22 +775,45 @@ def _smart_fallback(company: str, student: dict) -> dict:
 
 
 @app.post("/clean-data")
-async def clean_data(request: CleaningRequest, background_tasks: BackgroundTasks):
+async def clean_data(request: CleaningRequest):
     """Automated Data Cleaning Endpoint (Supports Background Processing)."""
-    # For small batches, process immediately. For large, offload.
-    if len(request.items) > 50:
-        background_tasks.add_task(background_data_cleaning, request.items)
-        return {"success": True, "message": "Task queued for background processing"}
-    
-    # Synchronous processing for small lists
-    cleaned = []
-    for item in request.items:
-        if "location" in item:
-            item["location"] = DataProcessor.normalize_location(item["location"])
-        cleaned.append(item)
-    
+    # Small batches are cleaned immediately; large ones become a job (see jobs.py)
+    if len(request.items) > CLEAN_SYNC_LIMIT:
+        try:
+            job_id = await POOL.run(JOBS.submit, "clean-data", request.items)
+        except PoolSaturated as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        return JSONResponse(status_code=202, content={
+            "success": True, "message": "Task queued for background processing",
+            "job_id": job_id, "status_url": f"/jobs/{job_id}", "result_url": f"/jobs/{job_id}/result",
+        })
+
+    try:
+        cleaned = await STATELESS_POOL.run(DataProcessor.clean_items, request.items)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     return {"success": True, "data": cleaned}
 
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Status and progress of a background job."""
+    job = JOBS.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    return {"success": True, "data": job}
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(raw: Request, job_id: str):
+    """Output of a finished background job."""
+    job = JOBS.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    if job["status"] != "done":
+        detail = f"Job is {job['status']}" + (f": {job['error']}" if job["error"] else "")
+        raise HTTPException(status_code=409, detail=detail)
+    items = await POOL.run(JOBS.result, job_id)
+    return respond(raw, {"success": True, "data": items})
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -17,9 +17,21 @@ import json
 import os
 import re
 import gc
-import threading
+import hashlib
+import heapq
+import unicodedata
+from contextlib import nullcontext
 from dotenv import load_dotenv
 import logging
+from skills import SkillExtractor, SkillRegistry
+from ingest import as_text, normalize_record
+from llm import LLM, LLMUnavailable, ResponseCache
+from metrics import LLM_RESULTS, register_cache, stage
+from similarity import LSH_TOP_N, SIMILARITY_ENGINE, TfidfIndex, is_available as similarity_available
+from gazetteer import GAZETTEER, REMOTE_KEYWORDS, StudentLocations
+from sharding import SCORING_SHARDS, SHARD_MIN_POOL, sharded_scorer
+from scoring import (JobFeatures, FeatureMatrix, score_pool, combine_scores, rank, pool_match_counts,
+                     score_upper_bounds, is_available as scoring_available)
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO)
@@ -31,47 +43,12 @@ os.environ["MKL_NUM_THREADS"] = "1"
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
-# ─── TF-IDF Memory Efficient Engine ───────────────────────────────────────────
-_tfidf_vectorizer = None
-
-def get_matcher():
-    """Lightweight TF-IDF matcher for 512MB RAM environments."""
-    global _tfidf_vectorizer
-    if _tfidf_vectorizer is None:
-        try:
-            from sklearn.feature_extraction.text import TfidfVectorizer
-            # Pre-configured to match tech profile well
-            _tfidf_vectorizer = TfidfVectorizer(
-                stop_words='english', 
-                max_features=1000, 
-                ngram_range=(1, 2)
-            )
-        except Exception as e:
-            logger.error(f"⚠️ TfIdf setup failed: {e}")
-    return _tfidf_vectorizer
-
-def get_gemini_model():
-    """Lazy load Gemini model."""
-    global _gemini_model, _gemini_initialized
-    if not _gemini_initialized:
-        api_key = os.getenv('GEMINI_API_KEY')
-        if api_key:
-            try:
-                import google.generativeai as genai
-                genai.configure(api_key=api_key)
-                _gemini_model = genai.GenerativeModel('gemini-1.5-flash')
-                _gemini_initialized = True
-                print("✅ Gemini initialized.")
-            except Exception as e:
-                print(f"❌ Gemini failed: {e}")
-                _gemini_initialized = True # Mark as tried
-        else:
-            print("⚠️ No GEMINI_API_KEY.")
-            _gemini_initialized = True
-    return _gemini_model
-
 def is_gemini_available():
-    return get_gemini_model() is not None
+    return LLM.available
+
+async def is_gemini_available_async():
+    """is_gemini_available() for async handlers; never blocks the event loop."""
+    return await LLM.available_async()
 
 
 # ─── STEP 1: RESUME PARSER ────────────────────────────────────────────────────
@@ -114,18 +91,72 @@ SKILL_SYNONYMS = {
     "civil": ["civil", "construction", "site engineer", "revit", "staad pro", "surveying", "concrete", "structural", "architecture", "urban planning"]
 }
 
+# Built once at import: one regex pass over a resume finds every known skill
+SKILL_EXTRACTOR = SkillExtractor(KNOWN_SKILLS)
+
+# Every skill, synonym and job requirement interned as an integer ID
+SKILL_REGISTRY = SkillRegistry(SKILL_SYNONYMS, KNOWN_SKILLS)
+
+# Parsed resumes by normalized-text hash: returning students skip the regex scan
+# and repeat uploads skip Gemini. RESUME_CACHE_DB persists entries across restarts
+# (table resume_cache). Entries hold no personal data: the resume summary is not
+# stored and PERSONAL_FIELDS are stored as offsets into the resume text.
+RESUME_CACHE = ResponseCache(
+    max_size=int(os.getenv('RESUME_CACHE_SIZE', '2048')),
+    ttl=float(os.getenv('RESUME_CACHE_TTL', str(7 * 86400))),
+    db_path=os.getenv('RESUME_CACHE_DB', ''),
+    table="resume_cache",
+)
+PERSONAL_FIELDS = ("fullName", "email", "phone")
+register_cache("resume", lambda: RESUME_CACHE)
+# Parse results depend on the skill vocabulary; a new vocabulary gets new keys
+_PARSER_KEY = hashlib.sha1(json.dumps(KNOWN_SKILLS).encode('utf-8')).hexdigest()[:8]
+
+def normalize_resume_text(resume_text: str) -> str:
+    """Resume text as it is parsed and hashed: NFC, LF line ends, no trailing spaces."""
+    text = unicodedata.normalize('NFC', resume_text or '').replace('\r\n', '\n').replace('\r', '\n')
+    return '\n'.join(line.rstrip() for line in text.split('\n')).strip()
+
+def resume_cache_key(kind: str, text: str) -> str:
+    return hashlib.sha256(f"{kind}\0{text}".encode('utf-8')).hexdigest()
+
+def redact_personal(data: dict, text: str):
+    """
+    `data` with each PERSONAL_FIELDS value replaced by its [start, end] offsets
+    in `text`, or None when a value does not appear verbatim (not cacheable).
+    """
+    redacted = dict(data)
+    for field in PERSONAL_FIELDS:
+        value = data.get(field)
+        if not value:
+            continue
+        start = text.find(value) if isinstance(value, str) else -1
+        if start < 0:
+            return None
+        redacted[field] = [start, start + len(value)]
+    return redacted
+
+def restore_personal(redacted: dict, text: str) -> dict:
+    """Inverse of redact_personal for the same text."""
+    for field in PERSONAL_FIELDS:
+        span = redacted.get(field)
+        if isinstance(span, list):
+            redacted[field] = text[span[0]:span[1]]
+    return redacted
+
 def get_synonym_expanded(skills):
     """Expands a list of skills with their synonyms."""
-    expanded = set()
-    for s in skills:
-        s_low = s.lower().strip()
-        expanded.add(s_low)
-        for main, syns in SKILL_SYNONYMS.items():
-            if s_low == main or s_low in syns:
-                expanded.add(main)
-                for syn in syns:
-                    expanded.add(syn)
-    return list(expanded)
+    return SKILL_REGISTRY.to_names(SKILL_REGISTRY.expand(skills))
+
+def split_requirements(skills_raw: str, expanded) -> tuple:
+    """Splits a job's skill string into (matched, missing) against an expanded skill set."""
+    matched, missing = [], []
+    for req in [s.strip().lower() for s in re.split(r'[,;/|]', skills_raw) if s.strip()]:
+        if SKILL_REGISTRY.name_weight(req, expanded):
+            matched.append(req)
+        else:
+            missing.append(req)
+    return matched, missing
 
 def parse_resume(resume_text: str, existing_skills: list) -> dict:
     """
@@ -141,13 +172,32 @@ def parse_resume(resume_text: str, existing_skills: list) -> dict:
             "summary": ""
         }
 
+    text = normalize_resume_text(resume_text)
+    key = resume_cache_key(f"parse:{_PARSER_KEY}", text)
+    cached = RESUME_CACHE.get(key)
+    if cached is not None:
+        parsed = json.loads(cached)
+    else:
+        parsed = _parse_resume_text(text)
+        RESUME_CACHE.put(key, json.dumps(parsed))
+
+    found_skills = set(s.lower() for s in existing_skills)
+    found_skills.update(parsed["terms"])
+    return {
+        "skills": list(found_skills),
+        "education": parsed["education"],
+        "experience_years": parsed["experience_years"],
+        # Build a clean summary (first 300 chars of resume as context); not cached
+        "summary": text[:300]
+    }
+
+
+def _parse_resume_text(resume_text: str) -> dict:
+    """The text-only part of parse_resume (what RESUME_CACHE stores)."""
     text_lower = resume_text.lower()
 
     # 1a. Extract skills by scanning for known keywords
-    found_skills = set(s.lower() for s in existing_skills)
-    for skill in KNOWN_SKILLS:
-        if re.search(r'\b' + re.escape(skill) + r'\b', text_lower):
-            found_skills.add(skill)
+    terms = sorted(SKILL_EXTRACTOR.find_terms(text_lower))
 
     # 1b. Estimate experience from years mentioned
     year_matches = re.findall(r'(\d+)\+?\s*year', text_lower)
@@ -158,26 +208,78 @@ def parse_resume(resume_text: str, existing_skills: list) -> dict:
                     "bca", "mca", "bsc", "msc", "phd", "diploma", "12th", "10th", "business", "commerce", "finance"]
     education = next((kw for kw in edu_keywords if kw in text_lower), "Management")
 
-    # 1d. Build a clean summary (first 300 chars of resume as context)
-    summary = resume_text.strip()[:300]
-
     return {
-        "skills": list(found_skills),
+        "terms": terms,
         "education": education,
         "experience_years": experience_years,
-        "summary": summary
     }
 
 
+RESUME_PROMPT = """
+        Extract the following structured information from this resume text as a clean JSON object.
+        NO CONVERSATIONAL TEXT. ONLY JSON.
+
+        OUTPUT SCHEMA:
+        {{
+          "fullName": "Name detected",
+          "email": "Email detected",
+          "phone": "Phone detected",
+          "location": "City, State",
+          "extractedSkills": ["skill1", "skill2"],
+          "experienceLevel": "Entry/Intermediate/Senior",
+          "experienceYears": 0,
+          "educationLevel": "Bachelor/Master/Diploma/etc.",
+          "education": "Full Degree Name (e.g. Bachelor of Science in Finance)",
+          "college": "College Name",
+          "graduationYear": "YYYY",
+          "cgpa": "Detect GPA/CGPA (e.g. 3.5/4.0 or 8.5)",
+          "resumeStrengthScore": 0 (0-100)
+        }}
+
+        RESUME TEXT:
+        {resume_text}
+        """
+
+
 def analyze_resume_deep(resume_text: str) -> dict:
     """
     Advanced Resume Analysis using Gemini (AI Brain).
     Returns the full structured data expected by the frontend.
+    Gemini results are cached by normalized resume text (fallbacks are not),
+    with the personal fields redacted to offsets into that text.
+
+    Blocking; async handlers run resume_analysis_start() and
+    resume_analysis_fallback() on a worker pool and await resume_analysis_llm().
     """
+    state = resume_analysis_start(resume_text)
+    if state["data"] is not None:
+        return state["data"]
+    if is_gemini_available():
+        try:
+            # Not through the LLM response cache: that would keep the raw extraction (personal data)
+            return resume_analysis_finish(state, LLM.generate_sync(state["prompt"], cache=False))
+        except Exception as e:
+            print(f"⚠️ ERROR in analyze_resume_deep: {e}")
+            state["llm_failed"] = True
+    return resume_analysis_fallback(resume_text, state)
+
+
+def resume_analysis_start(resume_text: str) -> dict:
+    """
+    CPU part of analyze_resume_deep before Gemini. Returns {"data": cached result}
+    or, on a miss, data None plus what the LLM call and the fallback need.
+    """
+    normalized = normalize_resume_text(resume_text)
+    cache_key = resume_cache_key(f"deep:{LLM.model_name}", normalized)
+    cached = RESUME_CACHE.get(cache_key)
+    if cached is not None:
+        LLM_RESULTS.inc(feature="resume_analysis", result="cache")
+        return {"data": restore_personal(json.loads(cached), normalized)}
+
     # Regex fallback for key fields
     email_match = re.search(r'[\w\.-]+@[\w\.-]+\.\w+', resume_text)
     phone_match = re.search(r'(\+?\d{1,3}[- ]?)?\d{10}', resume_text)
-    
+
     fallback_data = {
         "fullName": "Candidate Name",
         "email": email_match.group(0) if email_match else "",
@@ -193,71 +295,63 @@ def analyze_resume_deep(resume_text: str) -> dict:
         "cgpa": "",
         "resumeStrengthScore": 50
     }
+    return {"data": None, "normalized": normalized, "cache_key": cache_key, "fallback": fallback_data,
+            "prompt": RESUME_PROMPT.format(resume_text=resume_text), "llm_failed": False}
 
-    if not is_gemini_available():
-        parsed = parse_resume(resume_text, [])
-        fallback_data["extractedSkills"] = parsed["skills"]
-        fallback_data["education"] = parsed["education"]
-        return fallback_data
 
+async def resume_analysis_llm(state: dict):
+    """
+    Gemini step of analyze_resume_deep for async handlers: awaits the shared
+    LLM client, so no worker waits on Gemini. None when the fallback is needed.
+    """
+    if not await is_gemini_available_async():
+        return None
     try:
-        g_model = get_gemini_model()
-        if not g_model:
-            return fallback_data
-        
-        prompt = f"""
-        Extract the following structured information from this resume text as a clean JSON object.
-        NO CONVERSATIONAL TEXT. ONLY JSON.
-
-        OUTPUT SCHEMA:
-        {{
-          "fullName": "Name detected",
-          "email": "Email detected",
-          "phone": "Phone detected",
-          "location": "City, State",
-          "extractedSkills": ["skill1", "skill2"],
-          "experienceLevel": "Entry/Intermediate/Senior",
-          "experienceYears": 0,
-          "educationLevel": "Bachelor/Master/Diploma/etc.",
-          "education": "Full Degree Name (e.g. Bachelor of Science in Finance)",
-          "college": "College Name",
-          "graduationYear": "YYYY",
-          "cgpa": "Detect GPA/CGPA (e.g. 3.5/4.0 or 8.5)",
-          "resumeStrengthScore": 0 (0-100)
-        }}
-
-        RESUME TEXT:
-        {resume_text}
-        """
-
-        response = g_model.generate_content(prompt)
-        text = response.text.strip()
-        
-        # Clean JSON if any markdown artifacts
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0].strip()
-        
-        # Handle cases where Gemini might return starting with { but not ending correctly
-        if not text.startswith("{"):
-            start = text.find("{")
-            end = text.rfind("}")
-            if start != -1 and end != -1:
-                text = text[start:end+1]
-            
-        data = json.loads(text)
-        
-        # Merge with fallback to ensure all keys present
-        for k, v in fallback_data.items():
-            if k not in data:
-                data[k] = v
-        return data
+        # Not through the LLM response cache: that would keep the raw extraction (personal data)
+        return resume_analysis_finish(state, await LLM.generate(state["prompt"], cache=False))
     except Exception as e:
         print(f"⚠️ ERROR in analyze_resume_deep: {e}")
-        parsed = parse_resume(resume_text, [])
-        fallback_data["extractedSkills"] = parsed["skills"]
-        return fallback_data
+        state["llm_failed"] = True
+        return None
+
+
+def resume_analysis_finish(state: dict, text: str) -> dict:
+    """Parses Gemini's JSON reply, fills missing keys and caches the redacted result."""
+    # Clean JSON if any markdown artifacts
+    if "```json" in text:
+        text = text.split("```json")[1].split("```")[0].strip()
+    elif "```" in text:
+        text = text.split("```")[1].split("```")[0].strip()
+
+    # Handle cases where Gemini might return starting with { but not ending correctly
+    if not text.startswith("{"):
+        start = text.find("{")
+        end = text.rfind("}")
+        if start != -1 and end != -1:
+            text = text[start:end+1]
+
+    data = json.loads(text)
+
+    # Merge with fallback to ensure all keys present
+    for k, v in state["fallback"].items():
+        if k not in data:
+            data[k] = v
+    redacted = redact_personal(data, state["normalized"])
+    if redacted is not None:
+        RESUME_CACHE.put(state["cache_key"], json.dumps(redacted))
+    LLM_RESULTS.inc(feature="resume_analysis", result="llm")
+    return data
+
+
+def resume_analysis_fallback(resume_text: str, state: dict) -> dict:
+    """Rule-based result when Gemini is unavailable or its answer failed (CPU: parse_resume)."""
+    LLM_RESULTS.inc(feature="resume_analysis", result="fallback")
+    fallback_data = dict(state["fallback"])
+    parsed = parse_resume(resume_text, [])
+    fallback_data["extractedSkills"] = parsed["skills"]
+    if not state["llm_failed"]:
+        fallback_data["education"] = parsed["education"]
+    return fallback_data
 
 
 # ─── STEP 2 & 3: EMBEDDINGS ───────────────────────────────────────────────────
@@ -288,7 +382,7 @@ def build_job_text(job: dict) -> str:
         job.get("company", ""),
         job.get("sector", ""),
         loc,
-        job.get("skills_required") or job.get("skills") or "",
+        as_text(job.get("skills_required") or job.get("skills")),
         job.get("description", "")[:500],
         job.get("requirements", "")[:500],
     ]
@@ -330,7 +424,7 @@ def compute_gap_analysis(student_skills: list, job: dict) -> dict:
     STEP 7 - Compares student skills vs job requirements.
     Returns: { matched, missing, match_count, gap_count }
     """
-    job_skills_raw = job.get("skills_required") or job.get("skills") or ""
+    job_skills_raw = as_text(job.get("skills_required") or job.get("skills"))
     
     # Parse job skills - handle comma/ slash / semicolon separation
     job_skills = [s.strip().lower() for s in re.split(r'[,;/|]', job_skills_raw) if s.strip()]
@@ -362,66 +456,37 @@ def compute_gap_analysis(student_skills: list, job: dict) -> dict:
 
 
 # ─── STEP 5 & 6: LLM RE-RANKING + EXPLAINABILITY ─────────────────────────────
-def gemini_rerank_and_explain(student: dict, top_jobs: list, parsed_resume: dict) -> list:
-    """
-    STEP 5 & 6 - Uses Gemini to:
-      a) Re-rank the top results based on holistic understanding
-      b) Generate a personalized "Why this matches you" explanation
-    Falls back to rule-based if Gemini is unavailable/slow.
-    """
-    if not is_gemini_available():
-        return _fallback_explain(student, top_jobs)
+RERANK_TIMEOUT = 8  # seconds before /match falls back to rule-based explanations
 
-    try:
-        import threading
-        results = [None]
+def _rerank_prompt(student: dict, top_jobs: list) -> str:
+    # Pre-calculate verified matches for each job to guide the LLM
+    def get_verified_matches(job_skills_str, student_skills):
+        matched, _ = split_requirements(job_skills_str or "", SKILL_REGISTRY.expand(student_skills))
+        return list(set(matched))
+
+    student_skills = student.get('skills', [])
+    
+    # ONLY ANALYZE TOP 3 JOBS WITH GEMINI TO SAVE TIME/MEMORY
+    jobs_to_analyze = []
+    for i, j in enumerate(top_jobs[:3]): # REDUCED TO 3 FOR FAST RESPONSE
+        j_skills = as_text(j.get('skills_required') or j.get('skills')) or 'N/A'
+        verified = get_verified_matches(j_skills, student_skills)
+        verified_str = ", ".join(verified) if verified else "NONE"
+        loc_type = j.get('locationLabel', 'Nationwide match')
+        is_remote = j.get('work_mode') == 'Remote' or 'work from home' in j.get('location', '').lower()
         
-        def call_gemini():
-            try:
-                g_model = get_gemini_model()
-                if not g_model:
-                    results[0] = None
-                    return
-                
-                # Pre-calculate verified matches for each job to guide the LLM
-                def get_verified_matches(job_skills_str, student_skills):
-                    verified = []
-                    job_skills_low = (job_skills_str or "").lower()
-                    expanded_student = get_synonym_expanded(student_skills)
-                    
-                    # Split job skills for individual checking
-                    required = [s.strip().lower() for s in re.split(r'[,;/|]', job_skills_low) if s.strip()]
-                    
-                    for req in required:
-                        if req in expanded_student:
-                            verified.append(req)
-                        elif any(sk in req or req in sk for sk in expanded_student):
-                            verified.append(req)
-                    return list(set(verified))
-
-                student_skills = student.get('skills', [])
-                
-                # ONLY ANALYZE TOP 3 JOBS WITH GEMINI TO SAVE TIME/MEMORY
-                jobs_to_analyze = []
-                for i, j in enumerate(top_jobs[:3]): # REDUCED TO 3 FOR FAST RESPONSE
-                    j_skills = j.get('skills_required') or j.get('skills') or 'N/A'
-                    verified = get_verified_matches(j_skills, student_skills)
-                    verified_str = ", ".join(verified) if verified else "NONE"
-                    loc_type = j.get('locationLabel', 'Nationwide match')
-                    is_remote = j.get('work_mode') == 'Remote' or 'work from home' in j.get('location', '').lower()
-                    
-                    jobs_to_analyze.append(
-                        f"JOB #{i}:\n"
-                        f"- Role: {j['role']}\n"
-                        f"- Company: {j['company']}\n"
-                        f"- Location: {j.get('location')} ({loc_type})\n"
-                        f"- Verified Matches: {verified_str}\n"
-                        f"- Context: {'High technical match found in nearby district' if j.get('match_type') == 'regional' else 'Remote internship' if is_remote else 'Direct location match'}"
-                    )
-                
-                jobs_summary = "\n\n".join(jobs_to_analyze)
-                
-                prompt = f"""You are an elite career mentor for students in the {student.get('preferredSector', 'Technology')} sector.
+        jobs_to_analyze.append(
+            f"JOB #{i}:\n"
+            f"- Role: {j['role']}\n"
+            f"- Company: {j['company']}\n"
+            f"- Location: {j.get('location')} ({loc_type})\n"
+            f"- Verified Matches: {verified_str}\n"
+            f"- Context: {'High technical match found in nearby district' if j.get('match_type') == 'regional' else 'Remote internship' if is_remote else 'Direct location match'}"
+        )
+    
+    jobs_summary = "\n\n".join(jobs_to_analyze)
+    
+    return f"""You are an elite career mentor for students in the {student.get('preferredSector', 'Technology')} sector.
 For the student and internships below, create a personalized "Career Bridge" Roadmap.
 
 STUDENT PROFILE:
@@ -457,91 +522,95 @@ Format as a strict JSON array where each object has:
 ]
 Ensure the project ideas are CREATIVE and DIFFERENT for each internship. Only output the JSON array."""
 
-                response = g_model.generate_content(
-                    prompt,
-                    generation_config={"temperature": 0.8, "max_output_tokens": 1024} # higher temperature for variety
-                )
-                results[0] = response.text.strip()
-
-
-
-            except Exception as e:
-                results[0] = None
-
-        thread = threading.Thread(target=call_gemini, daemon=True)
-        thread.start()
-        thread.join(timeout=8)  # Increased timeout for better AI quality
-
-        if results[0]:
-            # Parse Gemini output
-            json_start = results[0].find('[')
-            json_end = results[0].rfind(']') + 1
-            if json_start != -1 and json_end > json_start:
-                rerank_data = json.loads(results[0][json_start:json_end])
-                
-                # Apply re-ranking and explanations
-                reranked = []
-                used_indices = set()
-                
-                for item in rerank_data:
-                    idx = item.get('index', 0)
-                    if 0 <= idx < len(top_jobs) and idx not in used_indices:
-                        job = dict(top_jobs[idx])
-                        explanation = item.get('explanation', '')
-                        # If the model returned an object for explanation, attempt to flatten it
-                        if isinstance(explanation, dict):
-                            explanation = explanation.get('text', explanation.get('reasoning', str(explanation)))
-                        
-                        job['aiExplanation'] = str(explanation)
-                        job['roadmap'] = item.get('roadmap')
-                        job['llm_reranked'] = True
-                        reranked.append(job)
-
-                        used_indices.add(idx)
-                
-                # Add remaining jobs not re-ranked (beyond top 5)
-                for i, job in enumerate(top_jobs):
-                    if i not in used_indices:
-                        job_copy = dict(job)
-                        fallback = _build_fallback_explanation(student, job)
-                        job_copy['aiExplanation'] = fallback.get("explanation", "")
-                        job_copy['roadmap'] = fallback.get("roadmap")
-                        job_copy['llm_reranked'] = False
-                        reranked.append(job_copy)
-
-                
-                return reranked
-
-    except Exception:
-        pass
-
-    # Fallback
-    return _fallback_explain(student, top_jobs)
+
+RERANK_CONFIG = {"temperature": 0.8, "max_output_tokens": 1024}  # higher temperature for variety
+
+
+def llm_explanations(student: dict, top_jobs: list) -> list:
+    """
+    STEP 5 & 6 via Gemini: [{"index", "aiExplanation", "roadmap"}] for the jobs
+    the model ranked, best first. Empty when Gemini is unavailable/slow.
+    Blocks the calling thread; async handlers use llm_explanations_async.
+    """
+    with stage("llm_rerank"):
+        patches = []
+        if is_gemini_available():
+            try:
+                patches = _parse_patches(LLM.generate_sync(
+                    _rerank_prompt(student, top_jobs), timeout=RERANK_TIMEOUT, generation_config=RERANK_CONFIG
+                ), top_jobs)
+            except LLMUnavailable as e:
+                logger.warning(f"Rerank skipped: {e}")
+            except Exception:
+                pass
+    LLM_RESULTS.inc(feature="rerank", result="llm" if patches else "fallback")
+    return patches
+
+
+async def llm_explanations_async(student: dict, top_jobs: list) -> list:
+    """llm_explanations() awaiting the shared LLM client, so no worker thread waits on Gemini."""
+    with stage("llm_rerank"):
+        patches = []
+        if await is_gemini_available_async():
+            try:
+                patches = _parse_patches(await LLM.generate(
+                    _rerank_prompt(student, top_jobs), timeout=RERANK_TIMEOUT, generation_config=RERANK_CONFIG
+                ), top_jobs)
+            except LLMUnavailable as e:
+                logger.warning(f"Rerank skipped: {e}")
+            except Exception:
+                pass
+    LLM_RESULTS.inc(feature="rerank", result="llm" if patches else "fallback")
+    return patches
+
+
+def _parse_patches(text: str, top_jobs: list) -> list:
+    """Patches from Gemini's JSON array; each job index at most once."""
+    json_start = text.find('[')
+    json_end = text.rfind(']') + 1
+    if json_start == -1 or json_end <= json_start:
+        return []
+    rerank_data = json.loads(text[json_start:json_end])
+
+    patches = []
+    used_indices = set()
+    for item in rerank_data:
+        idx = item.get('index', 0)
+        if 0 <= idx < len(top_jobs) and idx not in used_indices:
+            explanation = item.get('explanation', '')
+            # If the model returned an object for explanation, attempt to flatten it
+            if isinstance(explanation, dict):
+                explanation = explanation.get('text', explanation.get('reasoning', str(explanation)))
+            patches.append({"index": idx, "aiExplanation": str(explanation), "roadmap": item.get('roadmap')})
+            used_indices.add(idx)
+    return patches
+
+
+def apply_explanations(explained: list, patches: list) -> list:
+    """Applies re-ranking and explanations: LLM picks first, the rest keep rule-based text."""
+    for patch in patches:
+        explained[patch["index"]].update(
+            aiExplanation=patch["aiExplanation"], roadmap=patch["roadmap"], llm_reranked=True
+        )
+    picked = [patch["index"] for patch in patches]
+    return [explained[i] for i in picked] + [job for i, job in enumerate(explained) if i not in set(picked)]
+
+
+def explanation_order(patches: list, count: int) -> list:
+    """The final ranking after `patches`, as indices into the rule-based results."""
+    explained = [patch["index"] for patch in patches]
+    return explained + [i for i in range(count) if i not in set(explained)]
 
 
 def _build_fallback_explanation(student: dict, job: dict) -> dict:
     """Fast rule-based explanation and basic roadmap when Gemini is unavailable."""
-    import re
     skill_list = student.get('skills', [])
-    expanded_student = get_synonym_expanded(skill_list)
-    
-    job_skills_raw = (job.get('skills_required') or job.get('skills') or '')
-    all_job_skills = [s.strip().lower() for s in re.split(r'[,;/|]', job_skills_raw) if s.strip()]
-    
-    matched = []
-    missing = []
-    
-    for req in all_job_skills:
-        # Check if requirement matches expanded student skills
-        if req in expanded_student:
-            matched.append(req)
-        else:
-            # Substring match
-            if any(sk in req or req in sk for sk in expanded_student):
-                matched.append(req)
-            else:
-                missing.append(req)
-            
+    expanded_mask = SKILL_REGISTRY.expand(skill_list)
+    expanded_student = SKILL_REGISTRY.to_names(expanded_mask)
+
+    job_skills_raw = as_text(job.get('skills_required') or job.get('skills'))
+    matched, missing = split_requirements(job_skills_raw, expanded_mask)
+
     pct = int(job.get('match_score', 0))
     role = job.get('role', 'Internship')
     company = job.get('company', 'this organization')
@@ -567,7 +636,7 @@ def _build_fallback_explanation(student: dict, job: dict) -> dict:
     
     # Career Bridge Roadmap (Always available to trigger the UI)
     role_low = str(role).lower()
-    sector_low = str(job.get('sector') or job.get('internType') or '').lower()
+    sector_low = as_text(job.get('sector') or job.get('internType')).lower()
     domain = role_low + ' ' + sector_low
 
     is_finance = any(k in domain for k in ['finance', 'account', 'banking', 'audit', 'tax', 'tally'])
@@ -670,245 +739,144 @@ def _fallback_explain(student: dict, jobs: list) -> list:
 
 
 # ─── MAIN MATCHING PIPELINE ───────────────────────────────────────────────────
-def process_matching(data: dict) -> list:
-    student = data['student']
-    internships = data['internships']
-    work_preference = data.get('workPreference', 'office')
-    resume_text = student.get('resume_text', '') or ''
-
-    # ── STEP 1: Resume Parse ──────────────────────────────────────────────────
-    parsed_resume = parse_resume(resume_text, student.get('skills', []))
-    
-    # Merge parsed skills back into student profile
-    all_student_skills = list(set(
-        [s.lower().strip() for s in student.get('skills', [])] +
-        [s.lower().strip() for s in parsed_resume['skills']]
-    ))
-    student['skills'] = all_student_skills
-    expanded_student_skills = get_synonym_expanded(all_student_skills)
-
-    # ── Data Cleaning & Sector Lock ──────────────────────────────────────────
-    cleaned_internships = []
-    for job in internships:
-        job_copy = dict(job)
-        for key in ['location', 'role', 'company', 'sector']:
-            val = str(job_copy.get(key, ""))
-            # Handle ALL types of tuple formats: ('...',), ("...",), (...), etc
-            if "(" in val or "'" in val or '"' in val:
-                # Remove tuple punctuation
-                cleaned_val = re.sub(r"[\(\)\'\",]", " ", val)
-                # Deduplicate tokens (e.g., "Delhi Chennai Delhi" -> "Delhi Chennai")
-                words = cleaned_val.split()
-                seen = set()
-                deduped = []
-                for w in words:
-                    if w.lower() not in seen:
-                        deduped.append(w)
-                        seen.add(w.lower())
-                job_copy[key] = " ".join(deduped).strip()
-        cleaned_internships.append(job_copy)
-
-    pref_sector = (student.get('preferredSector') or 'Technology').lower().strip()
-    pref_loc_raw = (student.get('preferred_state') or '').lower().strip()
-    pref_locs = [l.strip() for l in pref_loc_raw.split(',') if l.strip()]
-    
-    # India-wide Tech Hub Map for automatic regional expansion
-    INDIA_TECH_HUBS = {
-        "tamil nadu": ["chennai", "coimbatore", "madurai", "trichy", "tiruchirappalli", "salem", "tiruppur", "erode", "vellore", "thoothukudi", "tirunelveli", "thanjavur", "dindigul", "karur", "hosur", "namakkal", "tenkasi", "pudukkottai", "kanyakumari", "nagercoil", "virudhunagar", "sivakasi", "ramanathapuram", "ariyalur", "perambalur", "nagapattinam", "tiruvarur", "mayiladuthurai", "cuddalore", "villupuram", "kallakurichi", "tiruvannamalai", "ranipet", "tirupattur", "dharmapuri", "krishnagiri"],
-        "karnataka": ["bangalore", "bengaluru", "mysore", "mysuru", "mangalore", "mangaluru", "hubli", "dharwad", "belgaum", "gulbarga", "davangere", "bellary", "shimoga", "tumkur", "udupi", "bidar"],
-        "maharashtra": ["mumbai", "pune", "nagpur", "nashik", "aurangabad", "thane", "navi mumbai", "vashi", "solapur", "kolhapur", "amravati", "akola", "nanded", "sangli", "jalgaon"],
-        "telangana": ["hyderabad", "warangal", "secunderabad", "nizamabad", "karimnagar", "khammam", "ramagundam", "mahbubnagar"],
-        "andhra pradesh": ["visakhapatnam", "vizag", "vijayawada", "guntur", "nellore", "tirupati", "kakinada", "rajahmundry", "kurnool", "kadapa", "anantapur", "vizianagaram", "eluru"],
-        "delhi ncr": ["delhi", "new delhi", "gurgaon", "gurugram", "noida", "greater noida", "ghaziabad", "faridabad", "gurugram"],
-        "kerala": ["kochi", "trivandrum", "thiruvananthapuram", "kozhikode", "thrissur", "kollam", "palakkad", "alappuzha", "kottayam", "malappuram"],
-        "gujarat": ["ahmedabad", "surat", "vadodara", "baroda", "rajkot", "gandhinagar", "bhavnagar", "jamnagar", "junagadh", "anand", "navsari"],
-        "west bengal": ["kolkata", "howrah", "durgapur", "siliguri", "asansol", "kharagpur", "haldia", "bardhaman"],
-        "rajasthan": ["jaipur", "jodhpur", "udaipur", "kota", "ajmer", "bikaner", "alwar", "bhilwara", "sikar"],
-        "uttar pradesh": ["lucknow", "kanpur", "agra", "varanasi", "meerut", "prayagraj", "allahabad", "bareilly", "aligarh", "moradabad", "saharanpur", "gorakhpur", "jhansi"],
-        "madhya pradesh": ["indore", "bhopal", "jabalpur", "gwalior", "ujjain", "sagar", "ratlam", "rewa"],
-        "punjab": ["ludhiana", "amritsar", "jalandhar", "patiala", "bathinda", "mohali", "ajitgarh"],
-        "haryana": ["faridabad", "gurugram", "panipat", "ambala", "yamunanagar", "rohtak", "hissar", "karnal"],
-        "bihar": ["patna", "gaya", "bhagalpur", "muzaffarpur", "purnia", "darbhanga"],
-        "odisha": ["bhubaneswar", "cuttack", "rourkela", "berhampur", "sambalpur", "puri"],
-        "chhattisgarh": ["raipur", "bhilai", "bilaspur", "korba", "durg"],
-        "assam": ["guwahati", "silchar", "dibrugarh", "jorhat", "nagaon"],
-        "jharkhand": ["jamshedpur", "ranchi", "dhanbad", "bokaro", "hazaribagh"]
+def _scored_entry(job, score_int, match_ratio, loc_val, semantic_score, skill_score_raw, match_details):
+    return {
+        **job,
+        'match_score': score_int,
+        'finalScore': score_int,
+        'match_percentage': f"{score_int}%",
+        'skill_match_percentage': int(match_ratio * 100),
+        'scoreBreakdown': {
+            'profileSkillScore': int(match_ratio * 100),
+            'locationScore': int(loc_val * 100)
+        },
+
+        'semantic_score': round(semantic_score, 4),
+        'skill_boost': round(skill_score_raw, 4),
+        'matched_skills_list': match_details
     }
 
-    # ── TIERED LOCATION EXPANSION (All India Support) ──────────────────────
-    bucket_tech_local = []
-    bucket_tech_regional = [] # Same state, different city
-    bucket_tech_anywhere = []
-    bucket_others = []
-
-    # Better location parsing
-    state_hints = []
-    city_hints = []
-    active_states = set()
-
-    for loc_item in pref_locs:
-        parts = [p.strip() for p in loc_item.split(',') if p.strip()]
-        if len(parts) >= 2:
-            city_hints.append(parts[0])
-            state_low = parts[1].lower()
-            state_hints.append(state_low)
-            active_states.add(state_low)
-        else:
-            city = parts[0]
-            city_hints.append(city)
-            # Find which state this city belongs to
-            for state, hubs in INDIA_TECH_HUBS.items():
-                if city in hubs:
-                    active_states.add(state)
-                    state_hints.append(state)
-
-    def is_preferred_sector_match(j):
-        role_raw = j.get('role', '').lower()
-        sector_raw = (j.get('sector') or j.get('internType') or '').lower()
-        job_text = (role_raw + ' ' + sector_raw)
-        
-        target_sector = pref_sector.lower()
-        
-        # 1. Exact Match
-        if target_sector in job_text:
-            return True
-            
-        # 2. Tech Synonym Logic (Keep for backward compatibility)
-        if any(sec in target_sector for sec in ['tech', 'it', 'computer', 'science', 'data']):
-            tech_kws = ['software', 'developer', 'web', 'app', 'it', 'technical', 'data', 'coder', 'engineer', 'ai', 'ml', 'frontend', 'backend', 'fullstack', 'python', 'java', 'react', 'node', 'computing', 'science', 'development', 'programming', 'architecture', 'embedded', 'iot']
-            if any(kw in job_text for kw in tech_kws):
-                return True
-        
-        # 3. Marketing/Business Match
-        if any(sec in target_sector for sec in ['market', 'business', 'sales', 'commerce']):
-            biz_kws = ['marketing', 'sales', 'searc', 'seo', 'growth', 'business', 'commerce', 'retail', 'brand', 'content']
-            if any(kw in job_text for kw in biz_kws):
-                return True
-
-        # 4. HR/Ops Match
-        if any(sec in target_sector for sec in ['hr', 'human', 'ops', 'operation', 'admin']):
-            ops_kws = ['hr', 'human', 'recruitment', 'talent', 'ops', 'operation', 'admin', 'coordinator', 'office']
-            if any(kw in job_text for kw in ops_kws):
-                return True
-                
-        # 5. Finance/Accounts Match
-        if any(sec in target_sector for sec in ['finance', 'account', 'banking', 'audit', 'commerce', 'business']):
-            fin_kws = ['finance', 'account', 'banking', 'audit', 'tax', 'tally', 'investment', 'ledger', 'payroll', 'equity', 'gst', 'financial', 'analytical', 'bookkeep', 'corporate', 'business', 'commerce']
-            if any(kw in job_text for kw in fin_kws):
-                return True
-            
-        # 6. Engineering & Industrial Match (Mechanical, Auto, Civil, etc)
-        if any(sec in target_sector for sec in ['mechanical', 'automobile', 'civil', 'electrical', 'electronics', 'manufacturing', 'engineering', 'energy', 'fabrication']):
-            eng_kws = ['mechanical', 'automobile', 'automotive', 'civil', 'electrical', 'electronic', 'manufacturing', 'construct', 'energy', 'power', 'engineer', 'cad', 'solidworks', 'autocad', 'catia', 'ansys', 'robotics', 'mechatronics', 'ev', 'renewable', 'site', 'circuit', 'embedded', 'hardware']
-            if any(kw in job_text for kw in eng_kws):
-                return True
-                
-        # 7. Design & Creative Match
-        if any(sec in target_sector for sec in ['design', 'creative', 'art', 'interior', 'textile', 'fashion', 'graphic']):
-            des_kws = ['design', 'creative', 'art', 'interior', 'textile', 'fashion', 'graphic', 'ui', 'ux', 'photoshop', 'illustrator', 'video', 'animation']
-            if any(kw in job_text for kw in des_kws):
-                return True
-            
-        return False
 
-    # -- TIERED LOCATION BUCKETS --
-    bucket_pref_local = []
-    bucket_pref_remote = []
-    bucket_pref_regional = []
-    bucket_pref_anywhere = []
-    bucket_others = []
+def _score_vectorized(filtered, scores, pool_sector_match, student, all_student_skills, limit, catalog=None,
+                      shards=0):
+    """Batch scoring over job feature arrays (same scores as _score_loop)."""
+    raw_edu = (student.get('education') or student.get('qualification') or '').lower()
+    match_types = [j.get('match_type', 'anywhere') for j in filtered]
+
+    if catalog is not None and shards > 1:
+        # Catalog shards scored in worker processes, then heap-merged
+        with sharded_scorer(catalog, shards, SKILL_SYNONYMS, KNOWN_SKILLS) as scorer:
+            top = scorer.top_k([str(j['id']) for j in filtered], scores, match_types, all_student_skills,
+                               pool_sector_match, raw_edu, limit)
+        return [
+            _scored_entry(filtered[pos], -neg_score, match_ratio, loc_val, scores[pos], skill_score_raw, terms)
+            for neg_score, pos, match_ratio, loc_val, skill_score_raw, terms in top
+        ]
+
+    if catalog is not None:
+        features, keys = catalog.features, [str(j['id']) for j in filtered]
+    else:
+        features, keys = JobFeatures(SKILL_REGISTRY.scope()), list(range(len(filtered)))
+        for key, job in zip(keys, filtered):
+            features.add(key, job)
+
+    batch = score_pool(
+        features, keys, scores,
+        sector_match=[pool_sector_match] * len(filtered),
+        match_types=match_types,
+        expanded=SKILL_REGISTRY.expand(all_student_skills),
+        raw_edu=raw_edu,
+    )
+    return [
+        _scored_entry(filtered[i], int(batch['score'][i]), float(batch['match_ratio'][i]),
+                      float(batch['loc_val'][i]), scores[i], float(batch['skill_score_raw'][i]),
+                      features.matched_terms(keys[i], batch['weights']))
+        for i in rank(batch['score'], limit)
+    ]
 
-    for job in cleaned_internships:
-        # AGGRESSIVE LOCATION CLEANING
-        loc_val = str(job.get('location', ""))
-        # Handle ('Coimbatore',) style tuples
-        loc_val = re.sub(r"[\(\)\[\]\'\",]", " ", loc_val).strip()
-        loc_parts = list(set([p.strip() for p in loc_val.split(' ') if p.strip()]))
-        job['location'] = ", ".join(loc_parts)
-        
-        is_sector_match = is_preferred_sector_match(job)
-        job_loc_low = job['location'].lower()
-        
-        # KEY: Remote/WFH Logic
-        is_job_remote = any(kw in job_loc_low for kw in ['remote', 'work from home', 'wfh'])
-        wants_remote = any(kw in [l.lower() for l in pref_locs] for kw in ['remote', 'work from home', 'wfh'])
-        wants_remote = wants_remote or student.get('work_mode', '').lower() in ['remote', 'any']
-        wants_remote = wants_remote or work_preference in ['remote', 'both']
 
-        match_type = 'anywhere'
-        
-        # 1. Direct Physical City Match (Highest Priority)
-        if city_hints and any(city in job_loc_low for city in city_hints):
-            match_type = 'local'
-        # 2. Work From Home / Remote Match (Second Priority)
-        elif is_job_remote and wants_remote:
-            match_type = 'remote_match'
-        elif not pref_locs or 'any' in pref_locs:
-            match_type = 'local'
-        # 3. Regional / State Match
-        elif any(state in job_loc_low for state in state_hints):
-            match_type = 'regional'
-        # 4. National Cluster Fallback
-        else:
-            for active_st in active_states:
-                if active_st in INDIA_TECH_HUBS:
-                    if any(dist in job_loc_low for dist in INDIA_TECH_HUBS[active_st]):
-                        match_type = 'regional'
-                        break
-
-        if is_job_remote:
-            job['work_mode'] = 'Remote'
-        
-        job['match_type'] = match_type
-        
-        # BUCKETIZATION
-        if is_sector_match:
-            if match_type == 'local':
-                job['locationLabel'] = 'Direct Match'
-                bucket_pref_local.append(job)
-            elif match_type == 'remote_match':
-                job['locationLabel'] = 'Remote Match'
-                bucket_pref_remote.append(job)
-            elif match_type == 'regional':
-                job['locationLabel'] = 'Regional Match'
-                bucket_pref_regional.append(job)
+def _semantic_source(student: dict, parsed_resume: dict, pool: list, catalog=None, engine: str = None) -> tuple:
+    """
+    (similarities(positions) -> list, per-job upper bounds) for the pooled jobs.
+    Similarities equal _pool_similarities for the same jobs.
+    """
+    student_text = build_student_text(student, parsed_resume)
+    if (engine or SIMILARITY_ENGINE) == 'tfidf' and similarity_available():
+        # One sparse product scores every job, so nothing is skipped; the bounds are exact
+        scores = _pool_similarities(student, parsed_resume, pool, catalog, engine)
+        return (lambda positions: [scores[i] for i in positions]), scores
+    if catalog is not None:
+        keys = [str(j['id']) for j in pool]
+        index = catalog.token_index
+        return ((lambda positions: index.similarities(student_text, [keys[i] for i in positions])),
+                index.upper_bounds(student_text, keys))
+    return ((lambda positions: compute_similarities(student_text, [build_job_text(pool[i]) for i in positions])),
+            [0.9] * len(pool))  # scaled Jaccard never exceeds 0.9
+
+
+def _score_pruned(filtered, student, parsed_resume, pool_sector_match, all_student_skills, limit,
+                  catalog=None, engine=None) -> list:
+    """
+    Top-`limit` scoring with upper-bound pruning (WAND-style); same results as
+    _pool_similarities + _score_vectorized. Each job gets a cheap bound from
+    its exact skill coverage, education and location parts and the most its
+    text similarity could add. Jobs are scored best bound first, in batches,
+    against a `limit`-sized heap; once the next bound is below the heap's
+    worst score, the rest of the pool is never text-matched or scored.
+    """
+    raw_edu = (student.get('education') or student.get('qualification') or '').lower()
+    match_types = [j.get('match_type', 'anywhere') for j in filtered]
+    if catalog is not None:
+        features, keys = catalog.features, [str(j['id']) for j in filtered]
+    else:
+        features, keys = JobFeatures(SKILL_REGISTRY.scope()), list(range(len(filtered)))
+        for key, job in zip(keys, filtered):
+            features.add(key, job)
+    lengths, match_count, weights = pool_match_counts(features, keys, SKILL_REGISTRY.expand(all_student_skills))
+    similarities, semantic_bounds = _semantic_source(student, parsed_resume, filtered, catalog, engine)
+    bounds = score_upper_bounds(features, keys, lengths, match_count, semantic_bounds,
+                                [pool_sector_match] * len(filtered), match_types, raw_edu)
+
+    order = rank(bounds, len(filtered))  # best bound first, ties in pool order
+    heap = []     # (score, -position): the root is the worst kept job, later pool position losing ties
+    details = {}  # position -> (match_ratio, loc_val, semantic, skill_score_raw)
+    for start in range(0, len(order), TOPK_BATCH):
+        if len(heap) >= limit and bounds[order[start]] < heap[0][0]:
+            break
+        positions = order[start:start + TOPK_BATCH]
+        semantic = similarities(positions)
+        batch = combine_scores(features, [keys[i] for i in positions], lengths[positions], match_count[positions],
+                               semantic, [pool_sector_match] * len(positions), [match_types[i] for i in positions],
+                               raw_edu)
+        for j, pos in enumerate(positions):
+            entry = (int(batch['score'][j]), -pos)
+            if len(heap) < limit:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
             else:
-                job['locationLabel'] = 'Anywhere'
-                bucket_pref_anywhere.append(job)
-        else:
-            job['locationLabel'] = 'Alternative'
-            bucket_others.append(job)
-
-    # ── POOL CONSTRUCTION (Strategic Balancing) ──────────────────────────
-    # Prioritize physical local, then regional (nearby), then remote
-    filtered = bucket_pref_local[:25] + bucket_pref_regional[:25] + bucket_pref_remote[:15]
-    
-    # Fill remaining space with 'anywhere' pref matches up to pool size
-    if len(filtered) < 50:
-        filtered += bucket_pref_anywhere[:(50 - len(filtered))]
-    
-    # Emergency fallback to other sectors if pool is empty
-    if not filtered:
-        filtered = bucket_others[:20]
+                continue
+            details[pos] = (float(batch['match_ratio'][j]), float(batch['loc_val'][j]), semantic[j],
+                            float(batch['skill_score_raw'][j]))
 
-    # Global Location Fallback Detection
-    # If user provided a specific city, but we found nothing locally for their preferred sector
-    location_fallback = False
-    if city_hints and not bucket_pref_local and any(j.get('match_type') == 'regional' for j in (filtered[:15])):
-        location_fallback = True
+    top = []
+    for score, neg_pos in sorted(heap, reverse=True):
+        match_ratio, loc_val, semantic, skill_score_raw = details[-neg_pos]
+        top.append(_scored_entry(filtered[-neg_pos], score, match_ratio, loc_val, semantic, skill_score_raw,
+                                 features.matched_terms(keys[-neg_pos], weights)))
+    return top
 
-    # ── STEP 2 & 3: Build Embeddings & Scoring ────────────────────────────────
-    student_text = build_student_text(student, parsed_resume)
-    job_texts = [build_job_text(j) for j in filtered]
-    scores = compute_similarities(student_text, job_texts)
 
+def _score_loop(filtered, scores, is_sector_match, student, all_student_skills, limit):
+    """Per-job scoring loop (used when NumPy is unavailable)."""
+    expanded_student = SKILL_REGISTRY.expand(all_student_skills)
     scored = []
     for i, job in enumerate(filtered):
         semantic_score = scores[i]
-        is_sm = is_preferred_sector_match(job)
+        is_sm = is_sector_match(job)
         
         # IMPROVED Skill Match logic
-        job_skills_raw = (job.get('skills_required') or job.get('skills') or '').lower()
+        job_skills_raw = as_text(job.get('skills_required') or job.get('skills')).lower()
         job_skills_raw = re.sub(r"[\[\]\(\)\'\"]", "", job_skills_raw)
         job_skills_list = [s.strip() for s in re.split(r'[,;/|]', job_skills_raw) if s.strip()]
         total_reqs = max(len(job_skills_list), 1)
@@ -925,17 +893,11 @@ def process_matching(data: dict) -> list:
         # Find exact matches in synonym set
         match_details = []
         match_count = 0
-        expanded_student = get_synonym_expanded(all_student_skills)
         for req in job_skills_list:
-            req_low = req.lower()
-            if req_low in expanded_student:
-                match_count += 1
+            weight = SKILL_REGISTRY.name_weight(req, expanded_student)
+            if weight:
+                match_count += weight
                 match_details.append(req)
-            else:
-                # Substring match
-                if any(sk in req_low or req_low in sk for sk in expanded_student):
-                    match_count += 0.8
-                    match_details.append(req)
 
         match_ratio = match_count / total_reqs
         skill_score_raw = (match_ratio * 0.6) + (semantic_score * 0.4)
@@ -967,44 +929,435 @@ def process_matching(data: dict) -> list:
              score_int = 50 + int(match_ratio * 25) + int(semantic_score * 50)
              score_int = min(85, score_int) # Cap the floor boost
 
-        scored.append({
-            **job,
-            'match_score': score_int,
-            'finalScore': score_int,
-            'match_percentage': f"{score_int}%",
-            'skill_match_percentage': int(match_ratio * 100),
-            'scoreBreakdown': {
-                'profileSkillScore': int(match_ratio * 100),
-                'locationScore': int(loc_val * 100)
-            },
-
-            'semantic_score': round(semantic_score, 4),
-            'skill_boost': round(skill_score_raw, 4),
-            'matched_skills_list': match_details
-        })    
+        scored.append(_scored_entry(job, score_int, match_ratio, loc_val, semantic_score,
+                                    skill_score_raw, match_details))
 
     # ── Ranking ───────────────────────────────────────────────────────────────
-    scored.sort(key=lambda x: x['match_score'], reverse=True)
-    top_results_pool = scored[:15]
+    # Same order as a stable sort by score, without sorting the whole pool
+    return heapq.nlargest(limit, scored, key=lambda x: x['match_score'])
+
+
+def is_preferred_sector_match(j: dict, pref_sector: str) -> bool:
+    """Whether a job's role / sector fits the student's preferred sector."""
+    role_raw = j.get('role', '').lower()
+    sector_raw = as_text(j.get('sector') or j.get('internType')).lower()
+    job_text = (role_raw + ' ' + sector_raw)
+    
+    target_sector = pref_sector.lower()
+    
+    # 1. Exact Match
+    if target_sector in job_text:
+        return True
+        
+    # 2. Tech Synonym Logic (Keep for backward compatibility)
+    if any(sec in target_sector for sec in ['tech', 'it', 'computer', 'science', 'data']):
+        tech_kws = ['software', 'developer', 'web', 'app', 'it', 'technical', 'data', 'coder', 'engineer', 'ai', 'ml', 'frontend', 'backend', 'fullstack', 'python', 'java', 'react', 'node', 'computing', 'science', 'development', 'programming', 'architecture', 'embedded', 'iot']
+        if any(kw in job_text for kw in tech_kws):
+            return True
+    
+    # 3. Marketing/Business Match
+    if any(sec in target_sector for sec in ['market', 'business', 'sales', 'commerce']):
+        biz_kws = ['marketing', 'sales', 'searc', 'seo', 'growth', 'business', 'commerce', 'retail', 'brand', 'content']
+        if any(kw in job_text for kw in biz_kws):
+            return True
+
+    # 4. HR/Ops Match
+    if any(sec in target_sector for sec in ['hr', 'human', 'ops', 'operation', 'admin']):
+        ops_kws = ['hr', 'human', 'recruitment', 'talent', 'ops', 'operation', 'admin', 'coordinator', 'office']
+        if any(kw in job_text for kw in ops_kws):
+            return True
+            
+    # 5. Finance/Accounts Match
+    if any(sec in target_sector for sec in ['finance', 'account', 'banking', 'audit', 'commerce', 'business']):
+        fin_kws = ['finance', 'account', 'banking', 'audit', 'tax', 'tally', 'investment', 'ledger', 'payroll', 'equity', 'gst', 'financial', 'analytical', 'bookkeep', 'corporate', 'business', 'commerce']
+        if any(kw in job_text for kw in fin_kws):
+            return True
+        
+    # 6. Engineering & Industrial Match (Mechanical, Auto, Civil, etc)
+    if any(sec in target_sector for sec in ['mechanical', 'automobile', 'civil', 'electrical', 'electronics', 'manufacturing', 'engineering', 'energy', 'fabrication']):
+        eng_kws = ['mechanical', 'automobile', 'automotive', 'civil', 'electrical', 'electronic', 'manufacturing', 'construct', 'energy', 'power', 'engineer', 'cad', 'solidworks', 'autocad', 'catia', 'ansys', 'robotics', 'mechatronics', 'ev', 'renewable', 'site', 'circuit', 'embedded', 'hardware']
+        if any(kw in job_text for kw in eng_kws):
+            return True
+            
+    # 7. Design & Creative Match
+    if any(sec in target_sector for sec in ['design', 'creative', 'art', 'interior', 'textile', 'fashion', 'graphic']):
+        des_kws = ['design', 'creative', 'art', 'interior', 'textile', 'fashion', 'graphic', 'ui', 'ux', 'photoshop', 'illustrator', 'video', 'animation']
+        if any(kw in job_text for kw in des_kws):
+            return True
+        
+    return False
+
+
+def _pref_sector(student: dict) -> str:
+    return (student.get('preferredSector') or 'Technology').lower().strip()
+
+
+def _merge_student_skills(student: dict) -> tuple:
+    """STEP 1: parses the resume and merges its skills into student['skills']."""
+    resume_text = student.get('resume_text', '') or ''
+    parsed_resume = parse_resume(resume_text, student.get('skills', []))
+
+    # Merge parsed skills back into student profile
+    all_student_skills = list(set(
+        [s.lower().strip() for s in student.get('skills', [])] +
+        [s.lower().strip() for s in parsed_resume['skills']]
+    ))
+    student['skills'] = all_student_skills
+    return parsed_resume, all_student_skills
+
+
+# match_type -> locationLabel for preferred-sector jobs
+LOCATION_LABELS = {'local': 'Direct Match', 'remote_match': 'Remote Match',
+                   'regional': 'Regional Match', 'anywhere': 'Anywhere'}
+
+def _tag_job(job: dict, match_type: str, label: str, is_remote: bool) -> dict:
+    job = dict(job)
+    if is_remote:
+        job['work_mode'] = 'Remote'
+    job['match_type'] = match_type
+    job['locationLabel'] = label
+    return job
+
+
+def _build_pool(student: dict, jobs: list, work_preference: str, full_pool: bool = False,
+                locations: dict = None, sector_matches: dict = None) -> tuple:
+    """
+    Tiers `jobs` by location and sector and builds the candidate pool.
+    `locations` (job id -> GeoLocation) and `sector_matches` (job id -> bool,
+    filled in as it goes) are optional precomputed lookups.
+    Returns (pool, pool_sector_match, location_fallback); pool jobs are copies.
+    """
+    pref_sector = _pref_sector(student)
+    pref_loc_raw = (student.get('preferred_state') or '').lower().strip()
+    pref_locs = [l.strip() for l in pref_loc_raw.split(',') if l.strip()]
+
+    # Preferred cities/states resolved to gazetteer IDs once per request
+    student_locs = StudentLocations(pref_locs)
+    city_hints = pref_locs
+
+    # KEY: Remote/WFH Logic
+    wants_remote = any(kw in [l.lower() for l in pref_locs] for kw in REMOTE_KEYWORDS)
+    wants_remote = wants_remote or student.get('work_mode', '').lower() in ['remote', 'any']
+    wants_remote = wants_remote or work_preference in ['remote', 'both']
+
+    # -- TIERED LOCATION BUCKETS --
+    bucket_pref_local = []
+    bucket_pref_remote = []
+    bucket_pref_regional = []
+    bucket_pref_anywhere = []
+    bucket_others = []
+
+    for job in jobs:
+        # Location IDs: precomputed by the catalog, else resolved (and cached) per text
+        if locations is not None:
+            geo = locations[str(job['id'])]
+        else:
+            geo = GAZETTEER.resolve(str(job.get('location', "")))
+        is_job_remote = geo.is_remote
+
+        if sector_matches is not None:
+            is_sector_match = sector_matches.get(str(job['id']))
+            if is_sector_match is None:
+                is_sector_match = sector_matches[str(job['id'])] = is_preferred_sector_match(job, pref_sector)
+        else:
+            is_sector_match = is_preferred_sector_match(job, pref_sector)
+
+        match_type = 'anywhere'
+        
+        # 1. Direct Physical City Match (Highest Priority)
+        if student_locs.is_local(geo):
+            match_type = 'local'
+        # 2. Work From Home / Remote Match (Second Priority)
+        elif is_job_remote and wants_remote:
+            match_type = 'remote_match'
+        elif not pref_locs or 'any' in pref_locs:
+            match_type = 'local'
+        # 3. Regional / State Match (same state, or a hub city of a preferred state)
+        elif student_locs.is_regional(geo):
+            match_type = 'regional'
+
+        # BUCKETIZATION (jobs are only copied and tagged once they make the pool)
+        if is_sector_match:
+            entry = (job, match_type, LOCATION_LABELS[match_type], is_job_remote)
+            if match_type == 'local':
+                bucket_pref_local.append(entry)
+            elif match_type == 'remote_match':
+                bucket_pref_remote.append(entry)
+            elif match_type == 'regional':
+                bucket_pref_regional.append(entry)
+            else:
+                bucket_pref_anywhere.append(entry)
+        else:
+            bucket_others.append((job, match_type, 'Alternative', is_job_remote))
+
+    # ── POOL CONSTRUCTION (Strategic Balancing) ──────────────────────────
+    # Prioritize physical local, then regional (nearby), then remote
+    pool_sector_match = True
+    if full_pool:
+        # Score every preferred-sector job (cheap with the catalog's token index)
+        filtered = bucket_pref_local + bucket_pref_regional + bucket_pref_remote + bucket_pref_anywhere
+        if not filtered:
+            filtered, pool_sector_match = bucket_others, False
+    else:
+        filtered = (bucket_pref_local[:POOL_LIMITS["local"]] + bucket_pref_regional[:POOL_LIMITS["regional"]]
+                    + bucket_pref_remote[:POOL_LIMITS["remote"]])
+
+        # Fill remaining space with 'anywhere' pref matches up to pool size
+        if len(filtered) < POOL_LIMITS["total"]:
+            filtered += bucket_pref_anywhere[:(POOL_LIMITS["total"] - len(filtered))]
+
+        # Emergency fallback to other sectors if pool is empty
+        if not filtered:
+            filtered, pool_sector_match = bucket_others[:POOL_LIMITS["others"]], False
+
+    filtered = [_tag_job(*entry) for entry in filtered]
+
+    # Global Location Fallback Detection
+    # If user provided a specific city, but we found nothing locally for their preferred sector
+    location_fallback = False
+    if city_hints and not bucket_pref_local and any(j.get('match_type') == 'regional' for j in (filtered[:15])):
+        location_fallback = True
+
+    return filtered, pool_sector_match, location_fallback
+
 
+def _lsh_candidates(data: dict, student: dict, parsed_resume: dict, catalog) -> list:
+    """
+    With retrieval 'lsh': keys of the catalog jobs most Jaccard-similar to the
+    student, narrowed to data['job_ids']. Empty otherwise, or when LSH finds
+    nothing, so the caller falls back to every job. catalog.select() puts them
+    back into catalog order, so score ties rank as in an exhaustive match.
+    """
+    if (data.get('retrieval') or RETRIEVAL_MODE) != 'lsh' or not similarity_available():
+        return []
+    candidates = catalog.minhash().query(build_student_text(student, parsed_resume),
+                                         data.get('lsh_top_n') or LSH_TOP_N)
+    if data.get('job_ids'):
+        wanted = {str(j) for j in data['job_ids']}
+        candidates = [k for k in candidates if k in wanted]
+    return candidates
+
+
+def _pool_similarities(student: dict, parsed_resume: dict, pool: list, catalog=None, engine: str = None) -> list:
+    """STEP 2-4: similarity of the student against each pooled job (Jaccard or TF-IDF cosine)."""
+    student_text = build_student_text(student, parsed_resume)
+    if (engine or SIMILARITY_ENGINE) == 'tfidf' and similarity_available():
+        if catalog is not None:
+            return catalog.tfidf().similarities(student_text, [str(j['id']) for j in pool])
+        # Inline lists: fit on the pool itself
+        texts = {str(i): build_job_text(j) for i, j in enumerate(pool)}
+        return TfidfIndex.fit(texts).similarities(student_text, list(texts))
+    if catalog is not None:
+        # Job texts were tokenized at catalog load; only overlapping postings are walked
+        return catalog.token_index.similarities(student_text, [str(j['id']) for j in pool])
+    job_texts = [build_job_text(j) for j in pool]
+    return compute_similarities(student_text, job_texts)
+
+
+def _finish_results(student: dict, all_student_skills: list, top_results_pool: list, limit: int = 10) -> list:
+    """STEP 5 & 7: gap analysis and rule-based explanations (the LLM stage runs after, see rank_matches)."""
     # Gap Analysis
-    for res in top_results_pool:
-        res['gap_analysis'] = compute_gap_analysis(all_student_skills, res)
+    with stage("gap_analysis"):
+        for res in top_results_pool:
+            res['gap_analysis'] = compute_gap_analysis(all_student_skills, res)
+
+    top_results = top_results_pool[:limit]
+
+    with stage("fallback_explain"):
+        return _fallback_explain(student, top_results)
+
+
+# Candidate pool caps per location bucket (see POOL CONSTRUCTION)
+# "vectorized" (NumPy batch scoring) or "loop" (per-job Python scoring)
+SCORING_MODE = os.getenv('MATCH_SCORING', 'vectorized')
+# 'pruned' stops scoring once no pooled job's upper bound can reach the top 15; 'exhaustive' scores all
+TOPK_MODE = os.getenv('MATCH_TOPK', 'pruned')
+TOPK_BATCH = int(os.getenv('MATCH_TOPK_BATCH', '64'))  # jobs text-matched and scored per step
+# 'exhaustive' tiers every catalog job; 'lsh' only the MinHash/LSH top-N (LSH_TOP_N)
+RETRIEVAL_MODE = os.getenv('MATCH_RETRIEVAL', 'exhaustive')
+POOL_LIMITS = {"local": 25, "regional": 25, "remote": 15, "total": 50, "others": 20}
+
+def _reading(catalog):
+    """The catalog's read lock (updates wait until the request is done with it)."""
+    return catalog.reading() if catalog is not None else nullcontext()
+
+
+def _rank_candidates(data: dict, catalog=None) -> tuple:
+    """
+    Deterministic part of the pipeline for one student (steps 1-4 plus scoring).
+    Returns (student, parsed_resume, all_student_skills, top_results_pool, location_fallback).
+    """
+    student = data['student']
+    work_preference = data.get('workPreference', 'office')
+
+    # ── STEP 1: Resume Parse ──────────────────────────────────────────────────
+    with stage("parse_resume"):
+        parsed_resume, all_student_skills = _merge_student_skills(student)
+
+    with _reading(catalog):
+        # ── Data Cleaning & Sector Lock ──────────────────────────────────────
+        # Catalog records were normalized at load; an inline list is normalized here
+        with stage("cleaning"):
+            if catalog is not None:
+                candidates = _lsh_candidates(data, student, parsed_resume, catalog)
+                internships = catalog.select(candidates or data.get('job_ids'), data.get('filters'))
+                locations = catalog.locations
+                sector_matches = catalog.sector_matches(_pref_sector(student))
+            else:
+                internships = [normalize_record(job) for job in data['internships']]
+                locations = sector_matches = None
+
+        # ── TIERED LOCATION EXPANSION (All India Support) ──────────────────
+        with stage("bucketization"):
+            filtered, pool_sector_match, location_fallback = _build_pool(
+                student, internships, work_preference, full_pool=data.get('full_pool'), locations=locations,
+                sector_matches=sector_matches)
+
+        # ── STEP 2 & 3: Build Embeddings & Scoring ────────────────────────────
+        scoring_mode = data.get('scoring') or SCORING_MODE
+        vectorized = scoring_mode == 'vectorized' and scoring_available()
+        # Large catalog pools are split across SCORING_SHARDS worker processes
+        shards = data.get('shards') or (SCORING_SHARDS if len(filtered) >= SHARD_MIN_POOL else 0)
+        if vectorized and shards <= 1 and (data.get('topk') or TOPK_MODE) == 'pruned':
+            # Text similarity is computed inside, only for jobs that can still make the top 15
+            with stage("scoring"):
+                top_results_pool = _score_pruned(filtered, student, parsed_resume, pool_sector_match,
+                                                 all_student_skills, 15, catalog=catalog,
+                                                 engine=data.get('similarity'))
+            return student, parsed_resume, all_student_skills, top_results_pool, location_fallback
+
+        with stage("similarity"):
+            scores = _pool_similarities(student, parsed_resume, filtered, catalog, data.get('similarity'))
+
+        with stage("scoring"):
+            if vectorized:
+                top_results_pool = _score_vectorized(filtered, scores, pool_sector_match, student,
+                                                     all_student_skills, 15, catalog=catalog, shards=shards)
+            else:
+                pref_sector = _pref_sector(student)
+                top_results_pool = _score_loop(filtered, scores, lambda j: is_preferred_sector_match(j, pref_sector),
+                                               student, all_student_skills, 15)
+    return student, parsed_resume, all_student_skills, top_results_pool, location_fallback
 
-    top_results = top_results_pool[:10]
 
-    # ── STEP 5: LLM Re-ranking + Explanations ────────────────────────
-    final_results = gemini_rerank_and_explain(student, top_results, parsed_resume)
+def rank_matches(data: dict, catalog=None) -> dict:
+    """
+    The deterministic part of process_matching: ranked results with gap analysis
+    and rule-based explanations, as {"student", "results", "location_fallback"}.
+    This is the CPU-bound stage main.py runs on the worker pool; the LLM stage
+    (llm_explanations_async + apply_explanations) is awaited outside it.
+    """
+    student, parsed_resume, all_student_skills, top_results_pool, location_fallback = _rank_candidates(data, catalog)
+    results = _finish_results(student, all_student_skills, top_results_pool)
 
     # FINAL CLEANUP: Aggressive memory release
-    gc.collect()
-    
+    with stage("gc"):
+        gc.collect()
+    return {"student": student, "results": results, "location_fallback": location_fallback}
+
+
+def process_matching(data: dict, catalog=None) -> list:
+    """
+    Runs the full pipeline for one student.
+    With `catalog` (an InternshipCatalog) the jobs come from the catalog, narrowed by
+    data['job_ids'] / data['filters'], and its prebuilt indexes are reused;
+    otherwise data['internships'] is matched as sent.
+    """
+    ranked = rank_matches(data, catalog)
     return {
-        "results": final_results,
-        "location_fallback": location_fallback
+        "results": apply_explanations(ranked["results"], llm_explanations(ranked["student"], ranked["results"])),
+        "location_fallback": ranked["location_fallback"]
     }
 
 
+def batch_response(ranked: list, patches: list = None) -> list:
+    """
+    The /match/batch payload from rank_matches_batch results and optional per-student
+    patches: one {"index", "student_id", "results", "location_fallback"} per student.
+    """
+    return [
+        {
+            "index": index,
+            "student_id": r["student"].get('id'),
+            "results": apply_explanations(r["results"], patches[index]) if patches else r["results"],
+            "location_fallback": r["location_fallback"],
+        }
+        for index, r in enumerate(ranked)
+    ]
+
+
+def rank_matches_batch(data: dict, catalog=None) -> list:
+    """
+    rank_matches() for every student of data['students'], in order. Job-side
+    features are built once; each student's skill matches are summed over its
+    own pool only.
+    """
+    top_k = 10 if data.get('top_k') is None else int(data['top_k'])
+    if top_k < 1:
+        raise ValueError(f"top_k must be at least 1, got {top_k}")
+    if catalog is None:
+        # A transient catalog gives inline lists the same precomputed indexes. It is keyed
+        # by job ID, so duplicate IDs are rejected rather than merged.
+        from catalog import InternshipCatalog, duplicate_ids
+        internships = data.get('internships') or []
+        duplicates = duplicate_ids(internships)
+        if duplicates:
+            raise ValueError(f"Duplicate internship IDs in the inline list: {', '.join(duplicates[:10])}")
+        catalog = InternshipCatalog(internships, source="batch", registry=SKILL_REGISTRY.scope())
+    work_preference = data.get('workPreference', 'office')
+    scoring_mode = data.get('scoring') or SCORING_MODE
+    use_matrix = scoring_mode == 'vectorized' and scoring_available()
+
+    ranked = []  # (student, parsed_resume, all_student_skills, top, location_fallback)
+    with catalog.reading():
+        jobs = catalog.select(data.get('job_ids'), data.get('filters'))
+        matrix = FeatureMatrix(catalog.features, [str(j['id']) for j in jobs]) if use_matrix and jobs else None
+
+        for student in data['students']:
+            student = dict(student)
+            parsed_resume, all_student_skills = _merge_student_skills(student)
+            pool, pool_sector_match, location_fallback = _build_pool(
+                student, jobs, work_preference, full_pool=data.get('full_pool'), locations=catalog.locations,
+                sector_matches=catalog.sector_matches(_pref_sector(student)))
+            scores = _pool_similarities(student, parsed_resume, pool, catalog, data.get('similarity'))
+
+            if not pool:
+                top = []
+            elif matrix is None:
+                pref_sector = _pref_sector(student)
+                top = _score_loop(pool, scores, lambda j: is_preferred_sector_match(j, pref_sector),
+                                  student, all_student_skills, top_k)
+            else:
+                keys = [str(j['id']) for j in pool]
+                positions = [matrix.position[k] for k in keys]
+                counts, weights = matrix.pool_counts(positions, SKILL_REGISTRY.expand(all_student_skills))
+                raw_edu = (student.get('education') or student.get('qualification') or '').lower()
+                batch = combine_scores(
+                    catalog.features, keys, matrix.lengths[positions], counts, scores,
+                    sector_match=[pool_sector_match] * len(pool),
+                    match_types=[j.get('match_type', 'anywhere') for j in pool],
+                    raw_edu=raw_edu,
+                )
+                top = [
+                    _scored_entry(pool[i], int(batch['score'][i]), float(batch['match_ratio'][i]),
+                                  float(batch['loc_val'][i]), scores[i], float(batch['skill_score_raw'][i]),
+                                  catalog.features.matched_terms(keys[i], weights))
+                    for i in rank(batch['score'], top_k)
+                ]
+            ranked.append((student, parsed_resume, all_student_skills, top, location_fallback))
+
+    # Explanations run after the catalog is released
+    output = [
+        {"student": student, "location_fallback": location_fallback,
+         "results": _finish_results(student, all_student_skills, top, limit=top_k)}
+        for student, parsed_resume, all_student_skills, top, location_fallback in ranked
+    ]
+
+    with stage("gc"):
+        gc.collect()
+    return output
+
+
 # ─── Entry Point ──────────────────────────────────────────────────────────────
 if __name__ == "__main__":
     import io
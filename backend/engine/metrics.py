@@ -0,0 +1,230 @@
+"""
+In-process metrics, exposed in the Prometheus text format on GET /metrics.
+
+A small dependency-free take on prometheus_client: Counter and Histogram
+with labels, plus collectors that turn existing stats dicts (LLM client,
+response caches, worker pools) into samples at scrape time, so nothing is
+counted twice.
+
+What is recorded:
+    engine_stage_seconds{stage}                 matching pipeline stages
+    engine_llm_call_seconds{outcome}            every LLM call (cached/ok/timeout/rejected/error/unavailable)
+    engine_llm_results_total{feature,result}    LLM answer vs rule-based fallback per feature
+    engine_http_request_seconds{method,route,status}
+plus cache hits/misses/evictions and worker pool counters from collectors.
+
+Each process keeps its own metrics (scrape every uvicorn worker).
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers sub-millisecond stages up to LLM calls near their deadline
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(pairs) -> str:
+    pairs = list(pairs)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect):
+        """`collect()` returns [(name, type, help, [(labels dict, value), ...]), ...]."""
+        with self._lock:
+            self._collectors.append(collect)
+        return collect
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for metric in list(self._metrics):
+            lines.extend(metric.render())
+        for collect in list(self._collectors):
+            for name, kind, documentation, samples in collect():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values tuple -> state
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(zip(self.labelnames, key))} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 buckets: tuple = DEFAULT_BUCKETS, registry: Registry = REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]  # bucket counts, sum, count
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the wall-clock duration of the block, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def sum(self, **labels) -> float:
+        state = self._values.get(self._key(labels))
+        return state[1] if state else 0.0
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._values.items())
+        lines = self._header()
+        for key, (counts, total, count) in items:
+            base = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_format_labels(base + [('le', _format_value(float(bound)))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(base + [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(base)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(base)} {count}")
+        return lines
+
+
+# ─── Engine metrics ───────────────────────────────────────────────────────────
+STAGE_SECONDS = Histogram("engine_stage_seconds", "Time spent in each matching pipeline stage.", ("stage",))
+LLM_CALL_SECONDS = Histogram("engine_llm_call_seconds", "LLM calls by outcome, including queue wait.", ("outcome",))
+LLM_RESULTS = Counter("engine_llm_results_total",
+                      "LLM-backed features served by the LLM, the cache or the rule-based fallback.",
+                      ("feature", "result"))
+HTTP_REQUEST_SECONDS = Histogram("engine_http_request_seconds", "HTTP request latency by route.",
+                                 ("method", "route", "status"))
+
+
+def stage(name: str):
+    """`with stage("scoring"): ...` records one pipeline stage."""
+    return STAGE_SECONDS.time(stage=name)
+
+
+_caches = {}  # name -> callable returning a llm.ResponseCache
+_pools = {}   # name -> workers.WorkerPool
+
+
+def register_cache(name: str, get_cache):
+    """Exposes a ResponseCache's stats; `get_cache()` returns the cache (or None) at scrape time."""
+    _caches[name] = get_cache
+
+
+def register_pool(name: str, pool):
+    """Exposes a workers.WorkerPool's counters and queue depth."""
+    _pools[name] = pool
+
+
+def _collect_caches() -> list:
+    caches = {name: get_cache() for name, get_cache in list(_caches.items())}
+    infos = {name: cache.info() for name, cache in caches.items() if cache is not None}
+    families = [
+        (f"engine_cache_{field}_total", "counter", f"Cache {field.replace('_', ' ')}.",
+         [({"cache": name}, info[field]) for name, info in infos.items()])
+        for field in ("hits", "misses", "disk_hits", "evictions", "expired")
+    ]
+    families.append(("engine_cache_entries", "gauge", "Entries held in memory.",
+                     [({"cache": name}, info["size"]) for name, info in infos.items()]))
+    return families if infos else []
+
+
+def _collect_pools() -> list:
+    infos = {name: pool.info() for name, pool in list(_pools.items())}
+    if not infos:
+        return []
+    return [
+        ("engine_pool_calls_total", "counter", "Worker pool calls by result.",
+         [({"pool": name, "result": r}, info[r]) for name, info in infos.items()
+          for r in ("submitted", "completed", "failed", "rejected")]),
+        ("engine_pool_in_flight", "gauge", "Calls queued or running.",
+         [({"pool": name}, info["in_flight"]) for name, info in infos.items()]),
+        ("engine_pool_queued", "gauge", "Calls waiting for a worker.",
+         [({"pool": name}, info["queued"]) for name, info in infos.items()]),
+    ]
+
+
+REGISTRY.register_collector(_collect_caches)
+REGISTRY.register_collector(_collect_pools)
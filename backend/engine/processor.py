@@ -1,5 +1,8 @@
 import re
 from typing import List, Dict, Any
+from skills import get_skill_extractor
+from ingest import parse_locations
+from htmlclean import clean_html
 
 # Global cache for lazy-loaded models
 _nlp = None
@@ -11,20 +14,8 @@ def get_nlp():
 class DataProcessor:
     @staticmethod
     def clean_text(text: str) -> str:
-        """Basic text cleaning."""
-        if not text:
-            return ""
-        # Remove HTML tags if any (Lazy Load BeautifulSoup)
-        try:
-            from bs4 import BeautifulSoup
-            text = BeautifulSoup(text, "html.parser").get_text()
-        except ImportError:
-            # Fallback if bs4 not available or fails
-            text = re.sub(r'<[^>]*>', '', text)
-        
-        # Remove special characters and extra whitespace
-        text = re.sub(r'\s+', ' ', text)
-        return text.strip()
+        """Basic text cleaning: markup and entities resolved, whitespace collapsed (see htmlclean.py)."""
+        return clean_html(text)
 
     @staticmethod
     def normalize_location(location: str) -> str:
@@ -45,25 +36,32 @@ class DataProcessor:
             "pun": "Pune"
         }
         
+        # ('Chennai', 'Chennai') style tuples from the CSV export
+        location = ", ".join(parse_locations(location)) or location
         loc_lower = location.lower().strip()
         for key, val in loc_map.items():
             if key in loc_lower:
                 return val
         return location.title()
 
+    @staticmethod
+    def clean_items(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Normalizes locations and strips HTML from descriptions (the /clean-data task)."""
+        for item in items:
+            if "description" in item:
+                item["description"] = clean_html(item["description"])
+            if "location" in item:
+                item["location"] = DataProcessor.normalize_location(item["location"])
+        return list(items)
+
     @staticmethod
     def extract_skills_nlp(text: str, known_skills: List[str]) -> List[str]:
         """Use NLP to extract skills from text."""
         if not text:
             return []
         
-        text_lower = text.lower()
-        found_skills = set()
-        
-        # 1. Simple keyword matching (fast)
-        for skill in known_skills:
-            if re.search(r'\b' + re.escape(skill.lower()) + r'\b', text_lower):
-                found_skills.add(skill)
+        # 1. Keyword matching: one compiled pass over the text (fast)
+        found_skills = get_skill_extractor(tuple(known_skills)).extract(text)
         
         # 2. NLP Entity Recognition (if spaCy is available)
         nlp = get_nlp()
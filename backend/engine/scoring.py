@@ -0,0 +1,203 @@
+"""
+Vectorized scoring for process_matching.
+
+Job-side features are held as arrays: a sparse job x requirement matrix
+(one entry per listed requirement, CSR-style), a location-tier vector and a
+sector-match mask. A request then only computes a weight per distinct
+requirement and combines everything with a handful of NumPy operations.
+The arithmetic mirrors the per-job loop in matcher.process_matching step for
+step, so scores are identical.
+"""
+import re
+
+from ingest import as_text
+
+try:
+    import numpy as np
+except ImportError:  # Loop scoring in matcher.py is used instead
+    np = None
+
+# match_type -> location score (same tiers as the scoring loop)
+LOCATION_TIERS = {"local": 1.0, "remote_match": 0.85, "regional": 0.65, "anywhere": 0.3}
+
+
+def is_available() -> bool:
+    return np is not None
+
+
+def parse_job_skills(job: dict) -> list:
+    """Lowercased requirement list of a job, in listed order (duplicates kept)."""
+    raw = as_text(job.get('skills_required') or job.get('skills')).lower()
+    raw = re.sub(r"[\[\]\(\)\'\"]", "", raw)
+    return [s.strip() for s in re.split(r'[,;/|]', raw) if s.strip()]
+
+
+class JobFeatures:
+    """Each job's requirements as registry IDs (listed order) plus its sector text."""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.rows = {}
+        self.sectors = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, key, job: dict, sector: str = None):
+        self.add_requirements(key, parse_job_skills(job), as_text(job.get('sector') if sector is None else sector))
+
+    def add_requirements(self, key, requirements: list, sector: str):
+        """add() from an already parsed requirement list and sector text."""
+        self.rows[key] = [self.registry.intern(req) for req in requirements]
+        self.sectors[key] = sector
+
+    def remove(self, key):
+        self.rows.pop(key, None)
+        self.sectors.pop(key, None)
+
+    def matched_terms(self, key, weights: dict) -> list:
+        return [self.registry.name(t) for t in self.rows[key] if weights.get(t)]
+
+
+def _term_weights(registry, terms, expanded) -> dict:
+    return {int(t): registry.weight(int(t), expanded) for t in terms}
+
+
+def _job_parts(features: JobFeatures, keys: list, lengths, match_count, sector_match: list,
+               match_types: list, raw_edu: str) -> tuple:
+    """(match_ratio, is_sm, edu_score, loc_val): the score inputs that do not depend on text similarity."""
+    n = len(keys)
+    match_ratio = match_count / np.maximum(lengths, 1)
+    is_sm = np.asarray(sector_match, dtype=bool)
+
+    sector_hits = {}
+    for k in keys:
+        sec = features.sectors[k].lower()
+        if sec not in sector_hits:
+            sector_hits[sec] = any(kw in raw_edu for kw in sec.split())
+    edu_match = np.fromiter((sector_hits[features.sectors[k].lower()] for k in keys), dtype=bool, count=n)
+    edu_score = np.where(is_sm, 0.95, np.where(edu_match, 0.8, 0.5))
+
+    loc_val = np.fromiter((LOCATION_TIERS.get(m, 0.3) for m in match_types), dtype=np.float64, count=n)
+    return match_ratio, is_sm, edu_score, loc_val
+
+
+def combine_scores(features: JobFeatures, keys: list, lengths, match_count, semantic: list,
+                   sector_match: list, match_types: list, raw_edu: str) -> dict:
+    """Turns per-job requirement match counts into the final score arrays."""
+    match_ratio, is_sm, edu_score, loc_val = _job_parts(features, keys, lengths, match_count, sector_match,
+                                                        match_types, raw_edu)
+    semantic = np.asarray(semantic, dtype=np.float64)
+    skill_score_raw = (match_ratio * 0.6) + (semantic * 0.4)
+    final_score = (skill_score_raw) + (edu_score * 0.3) + (loc_val * 0.2)
+
+    is_valid = is_sm | (semantic > 0.15) | (match_ratio >= 0.3)
+    final_score = np.where(is_valid, final_score, final_score * 0.4)
+    score_int = np.trunc(np.minimum(0.98, np.maximum(0.2, final_score)) * 100).astype(np.int64)
+
+    # Minimum visibility floor for relevant matches
+    floor = 50 + np.trunc(match_ratio * 25).astype(np.int64) + np.trunc(semantic * 50).astype(np.int64)
+    score_int = np.where(is_valid & (score_int < 60), np.minimum(85, floor), score_int)
+
+    return {
+        "score": score_int,
+        "match_ratio": match_ratio,
+        "loc_val": loc_val,
+        "skill_score_raw": skill_score_raw,
+    }
+
+
+def score_upper_bounds(features: JobFeatures, keys: list, lengths, match_count, semantic_bound,
+                       sector_match: list, match_types: list, raw_edu: str):
+    """
+    The highest score combine_scores() can give each job when its semantic
+    score is at most `semantic_bound` (scalar or per job). Every branch of
+    the score is non-decreasing in the semantic score, so the bound takes
+    each branch at the bound and keeps the larger one.
+    """
+    match_ratio, is_sm, edu_score, loc_val = _job_parts(features, keys, lengths, match_count, sector_match,
+                                                        match_types, raw_edu)
+    semantic = np.broadcast_to(np.asarray(semantic_bound, dtype=np.float64), match_ratio.shape)
+    final_score = ((match_ratio * 0.6) + (semantic * 0.4)) + (edu_score * 0.3) + (loc_val * 0.2)
+    may_be_valid = is_sm | (semantic > 0.15) | (match_ratio >= 0.3)
+    # Jobs that can be valid are bounded by the unpenalized score (or the floor)
+    final_score = np.where(may_be_valid, final_score, final_score * 0.4)
+    bound = np.trunc(np.minimum(0.98, np.maximum(0.2, final_score)) * 100).astype(np.int64)
+    floor = 50 + np.trunc(match_ratio * 25).astype(np.int64) + np.trunc(semantic * 50).astype(np.int64)
+    return np.where(may_be_valid, np.maximum(bound, np.minimum(85, floor)), bound)
+
+
+def pool_match_counts(features: JobFeatures, keys: list, expanded) -> tuple:
+    """
+    (lengths, match_count, weights) for the pooled jobs `keys`: requirement
+    counts, summed requirement weights, and term id -> weight.
+    """
+    n = len(keys)
+    rows = [features.rows[k] for k in keys]
+    lengths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=n)
+    cols = np.fromiter((t for r in rows for t in r), dtype=np.int64, count=int(lengths.sum()))
+    row_ids = np.repeat(np.arange(n), lengths)
+
+    # One weight per distinct requirement present in the pool (`expanded` is the student's skill set)
+    uniq, inverse = np.unique(cols, return_inverse=True)
+    weights = _term_weights(features.registry, uniq, expanded)
+    uniq_w = np.fromiter((weights[int(t)] for t in uniq), dtype=np.float64, count=len(uniq))
+
+    # Sparse matrix-vector product; bincount adds in listed order like the loop does
+    match_count = np.bincount(row_ids, weights=uniq_w[inverse], minlength=n)
+    return lengths, match_count, weights
+
+
+def score_pool(features: JobFeatures, keys: list, semantic: list, sector_match: list,
+               match_types: list, expanded, raw_edu: str) -> dict:
+    """
+    Scores the pooled jobs `keys` in one batch.
+    Returns the per-job arrays the result dicts are built from, plus the
+    requirement weights used (term id -> weight) for matched-skill details.
+    """
+    lengths, match_count, weights = pool_match_counts(features, keys, expanded)
+    batch = combine_scores(features, keys, lengths, match_count, semantic, sector_match, match_types, raw_edu)
+    batch["weights"] = weights
+    return batch
+
+
+class FeatureMatrix:
+    """
+    CSR layout of JobFeatures rows for a fixed job order, built once and shared
+    by every student of a batch. `pool_counts` sums requirement weights for
+    one student's pool only, so memory and weight lookups scale with the pool
+    (at most POOL_LIMITS["total"] jobs), not with the catalog.
+    """
+
+    def __init__(self, features: JobFeatures, keys: list):
+        self.features = features
+        self.keys = list(keys)
+        self.position = {k: i for i, k in enumerate(self.keys)}
+        rows = [features.rows[k] for k in self.keys]
+        n = len(rows)
+        self.lengths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=n)
+        self.starts = np.concatenate(([0], np.cumsum(self.lengths)[:-1])).astype(np.int64)
+        self.cols = np.fromiter((t for r in rows for t in r), dtype=np.int64, count=int(self.lengths.sum()))
+
+    def pool_counts(self, positions: list, expanded) -> tuple:
+        """
+        Returns (counts, weights) for the jobs at `positions`: summed requirement
+        weights per job (the same sums as pool_match_counts), and term id -> weight.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        lengths = self.lengths[positions]
+        n = len(positions)
+        # Flat index of every listed requirement of the pooled jobs, in listed order
+        ends = np.cumsum(lengths)
+        entries = np.repeat(self.starts[positions] - (ends - lengths), lengths) + np.arange(int(ends[-1]) if n else 0)
+        uniq, inverse = np.unique(self.cols[entries], return_inverse=True)
+        weights = _term_weights(self.features.registry, uniq, expanded)
+        uniq_w = np.fromiter((weights[int(t)] for t in uniq), dtype=np.float64, count=len(uniq))
+        counts = np.bincount(np.repeat(np.arange(n), lengths), weights=uniq_w[inverse], minlength=n)
+        return counts, weights
+
+
+def rank(scores, limit: int) -> list:
+    """Indices of the best `limit` scores, ties kept in pool order (stable)."""
+    order = np.argsort(-scores, kind='stable')
+    return [int(i) for i in order[:limit]]
@@ -0,0 +1,214 @@
+"""
+Process-sharded scoring for large catalogs.
+
+The catalog's job features are split into shards held by long-lived worker
+processes (one single-process executor per shard, so a shard always lives in
+the same process). A request sends each shard only its part of the pool:
+pool position, semantic score and location tier per job. Each worker scores
+its jobs with the same NumPy arithmetic as scoring.score_pool and returns a
+local top-k ordered by (-score, pool position); a k-way heap merge of those
+lists gives exactly the single-process ranking, ties included.
+
+Workers intern requirements in their own SkillRegistry. Weights depend only
+on skill names, so they match the parent process. Catalog upserts/deletes are
+replayed to the owning shards from the catalog's change log instead of
+restarting the workers. A rebuild (new catalog, shard count or a change log
+that no longer reaches back) retires the old scorer; its workers stop once
+the last request using them has finished.
+"""
+import heapq
+import logging
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from scoring import JobFeatures, combine_scores, np, parse_job_skills
+from skills import SkillRegistry
+
+logger = logging.getLogger("Sharding")
+
+# Number of scoring shards ("auto" = one per core; 0 or 1 = single-process scoring)
+_shards_env = os.getenv('SCORING_SHARDS', '0')
+SCORING_SHARDS = (os.cpu_count() or 1) if _shards_env == 'auto' else int(_shards_env)
+# Pools smaller than this are scored in-process (IPC would cost more than it saves)
+SHARD_MIN_POOL = int(os.getenv('SHARD_MIN_POOL', '2000'))
+
+# ─── Worker side ──────────────────────────────────────────────────────────────
+_features = None
+
+
+def _init_shard(synonyms: dict, known: list, rows: dict):
+    """Builds this worker's features; `rows` is key -> (requirement names, sector)."""
+    global _features
+    _features = JobFeatures(SkillRegistry(synonyms, known))
+    for key, (reqs, sector) in rows.items():
+        _features.rows[key] = [_features.registry.intern(r) for r in reqs]
+        _features.sectors[key] = sector
+
+
+def _update_shard(rows: dict):
+    """Applies catalog changes: key -> (requirement names, sector), or None for a delete."""
+    for key, row in rows.items():
+        if row is None:
+            _features.remove(key)
+        else:
+            _features.rows[key] = [_features.registry.intern(r) for r in row[0]]
+            _features.sectors[key] = row[1]
+
+
+def _score_shard(payload: dict) -> list:
+    """Local top-k as (-score, pool position, match_ratio, loc_val, skill_score_raw, matched terms)."""
+    positions, keys = payload["positions"], payload["keys"]
+    if not keys:
+        return []
+    features = _features
+    registry = features.registry
+    rows = [features.rows[k] for k in keys]
+    n = len(keys)
+    lengths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=n)
+    cols = np.fromiter((t for r in rows for t in r), dtype=np.int64, count=int(lengths.sum()))
+    row_ids = np.repeat(np.arange(n), lengths)
+
+    expanded = registry.expand(payload["skills"])
+    uniq, inverse = np.unique(cols, return_inverse=True)
+    weights = {int(t): registry.weight(int(t), expanded) for t in uniq}
+    uniq_w = np.fromiter((weights[int(t)] for t in uniq), dtype=np.float64, count=len(uniq))
+    match_count = np.bincount(row_ids, weights=uniq_w[inverse], minlength=n)
+
+    batch = combine_scores(features, keys, lengths, match_count, payload["semantic"],
+                           [payload["sector_match"]] * n, payload["match_types"], payload["raw_edu"])
+    score = batch["score"]
+    # Best first, ties by pool position (the same order as scoring.rank on the whole pool)
+    order = np.lexsort((np.asarray(positions), -score))[:payload["limit"]]
+    return [
+        (-int(score[i]), positions[i], float(batch["match_ratio"][i]), float(batch["loc_val"][i]),
+         float(batch["skill_score_raw"][i]), features.matched_terms(keys[i], weights))
+        for i in order
+    ]
+
+
+# ─── Parent side ──────────────────────────────────────────────────────────────
+class ShardedScorer:
+    """Catalog features split across `n_shards` worker processes."""
+
+    def __init__(self, catalog, n_shards: int, synonyms: dict, known: list):
+        self.catalog = weakref.ref(catalog)
+        self.revision = catalog.revision
+        self.n_shards = n_shards
+        self.shard_of = {}
+        shard_rows = [{} for _ in range(n_shards)]
+        for i, (key, job) in enumerate(catalog.records.items()):
+            shard = i % n_shards
+            self.shard_of[key] = shard
+            shard_rows[shard][key] = (parse_job_skills(job), catalog.features.sectors[key])
+        self._next_shard = len(self.shard_of)
+        self._lock = threading.Lock()
+        self._users = 0  # requests between acquire() and release()
+        self._retired = False
+
+        ctx = multiprocessing.get_context("spawn")
+        self.executors = [
+            ProcessPoolExecutor(max_workers=1, mp_context=ctx, initializer=_init_shard,
+                                initargs=(synonyms, list(known), rows))
+            for rows in shard_rows
+        ]
+        logger.info(f"Sharded scorer for catalog {catalog.version}: {n_shards} shards.")
+
+    def apply(self, catalog, keys: list):
+        """Sends the current state of changed `keys` to the shards that hold them."""
+        updates = [{} for _ in self.executors]
+        for key in keys:
+            job = catalog.records.get(key)
+            shard = self.shard_of.get(key)
+            if job is None:
+                if shard is not None:
+                    updates[self.shard_of.pop(key)][key] = None
+                continue
+            if shard is None:
+                shard = self.shard_of[key] = self._next_shard % self.n_shards
+                self._next_shard += 1
+            updates[shard][key] = (parse_job_skills(job), catalog.features.sectors[key])
+        # Each shard is a single worker, so these run before any later top_k payload
+        for executor, rows in zip(self.executors, updates):
+            if rows:
+                executor.submit(_update_shard, rows)
+        self.revision = catalog.revision
+
+    def top_k(self, keys: list, semantic: list, match_types: list, skills: list,
+              sector_match: bool, raw_edu: str, limit: int) -> list:
+        """Global top `limit` over the pool `keys` (same order as scoring.rank)."""
+        payloads = [{"positions": [], "keys": [], "semantic": [], "match_types": []} for _ in self.executors]
+        for pos, key in enumerate(keys):
+            p = payloads[self.shard_of[key]]
+            p["positions"].append(pos)
+            p["keys"].append(key)
+            p["semantic"].append(semantic[pos])
+            p["match_types"].append(match_types[pos])
+        futures = []
+        for executor, p in zip(self.executors, payloads):
+            p.update(skills=list(skills), sector_match=sector_match, raw_edu=raw_edu, limit=limit)
+            futures.append(executor.submit(_score_shard, p))
+        # k-way merge of the shard-local rankings
+        merged = heapq.merge(*(f.result() for f in futures), key=lambda r: (r[0], r[1]))
+        return [r for _, r in zip(range(limit), merged)]
+
+    def acquire(self):
+        with self._lock:
+            self._users += 1
+
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            stop = self._retired and not self._users
+        if stop:
+            self.shutdown()
+
+    def retire(self):
+        """Stops the workers now if idle, else when the last request releases the scorer."""
+        with self._lock:
+            self._retired = True
+            stop = not self._users
+        if stop:
+            self.shutdown()
+
+    def shutdown(self):
+        # Nothing is waiting on these executors any more; queued updates may finish
+        for executor in self.executors:
+            executor.shutdown(wait=False)
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+
+@contextmanager
+def sharded_scorer(catalog, n_shards: int, synonyms: dict, known: list):
+    """
+    `with sharded_scorer(...) as scorer:` the scorer for `catalog`. Upserts/
+    deletes since the last call are applied in place; a different catalog (or
+    a change log that no longer reaches back) builds a new scorer and retires
+    the old one, whose workers keep serving the requests still inside it.
+    """
+    global _scorer
+    with _scorer_lock:
+        scorer = _scorer
+        if scorer is not None and scorer.n_shards == n_shards and scorer.catalog() is catalog:
+            keys = catalog.changed_since(scorer.revision)
+            if keys is None:
+                scorer = None
+            elif keys:
+                scorer.apply(catalog, keys)
+        else:
+            scorer = None
+        if scorer is None:
+            if _scorer is not None:
+                _scorer.retire()
+            scorer = _scorer = ShardedScorer(catalog, n_shards, synonyms, known)
+        scorer.acquire()
+    try:
+        yield scorer
+    finally:
+        scorer.release()
@@ -0,0 +1,258 @@
+"""
+Skill extraction helpers shared by the matcher and the data processor.
+
+`SkillExtractor` compiles a whole skill vocabulary into one trie-shaped
+regex, so a resume is scanned once instead of once per known skill. It
+returns exactly what the old per-skill `re.search(r'\\b' + skill + r'\\b')`
+loop returned, including overlapping hits such as "react" inside
+"react native".
+
+`SkillRegistry` gives every skill, synonym and catalog requirement an
+integer ID so synonym expansion and skill matching become bitmask
+operations. Only the vocabulary and catalog requirements are interned: a
+student's skill set (`expand`) and the requirements of inline job lists
+(`scope`) live in request-local objects, so the registry does not grow with
+traffic.
+"""
+import re
+import threading
+from functools import lru_cache
+
+_WORD_CHAR = re.compile(r'\w')
+
+
+def _is_word(ch: str) -> bool:
+    return bool(_WORD_CHAR.match(ch))
+
+
+def _trie_pattern(node: dict) -> str:
+    """Turns a char trie into a regex that prefers the longest term at each node."""
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch != '']
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        # A term ends here too: the longer continuations are tried first
+        return '(?:' + body + ')?' if len(branches) == 1 else body + '?'
+    return body
+
+
+class SkillExtractor:
+    """Finds every vocabulary term that occurs as a whole word in a text."""
+
+    def __init__(self, terms):
+        # term (lowercase) -> labels reported when it is found
+        self.labels = {}
+        for term in terms:
+            key = term.lower()
+            if key:
+                self.labels.setdefault(key, []).append(term)
+
+        trie = {}
+        for key in self.labels:
+            node = trie
+            for ch in key:
+                node = node.setdefault(ch, {})
+            node[''] = {}
+
+        # Zero-width lookahead so overlapping terms at later offsets still match
+        self._pattern = re.compile(r'(?=\b(' + _trie_pattern(trie) + r')\b)') if trie else None
+
+        # The regex reports the longest term at an offset; shorter terms that are
+        # prefixes of it also match whenever a word boundary follows them inside it.
+        self._implied = {}
+        for key in self.labels:
+            self._implied[key] = [
+                other for other in self.labels
+                if len(other) < len(key) and key.startswith(other)
+                and _is_word(other[-1]) != _is_word(key[len(other)])
+            ]
+
+    def find_terms(self, text_lower: str) -> set:
+        """Returns the matched vocabulary terms (lowercase) for already-lowered text."""
+        if not text_lower or self._pattern is None:
+            return set()
+        longest = {m.group(1) for m in self._pattern.finditer(text_lower)}
+        found = set(longest)
+        for key in longest:
+            found.update(self._implied[key])
+        return found
+
+    def extract(self, text: str) -> set:
+        """Returns the original labels of every term found in `text`."""
+        found = set()
+        for key in self.find_terms((text or '').lower()):
+            found.update(self.labels[key])
+        return found
+
+
+@lru_cache(maxsize=16)
+def get_skill_extractor(terms: tuple) -> SkillExtractor:
+    """Compiled extractor for a vocabulary, built once per distinct tuple."""
+    return SkillExtractor(terms)
+
+
+def iter_bits(mask: int):
+    """Yields the set bit positions of `mask`, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class ExpandedSkills:
+    """
+    A student's skills plus their synonym groups, for one request: a mask over
+    registry IDs and the names the registry does not know (`extra`).
+    """
+
+    __slots__ = ("mask", "extra", "names")
+
+    def __init__(self, mask: int, extra: tuple, names: list):
+        self.mask = mask
+        self.extra = extra
+        self.names = names  # every expanded name, registry IDs first
+
+    def related_extra(self, req: str) -> bool:
+        return any(sk in req or req in sk for sk in self.extra)
+
+
+class SkillRegistry:
+    """
+    Interns skills, synonyms and catalog requirements as integer IDs.
+
+    A set of skills is an int bitmask over those IDs. Synonym expansion is an
+    OR of precomputed group masks, and requirement matching is a bit test
+    (exact hit) or a mask intersection (substring hit, `sk in req or req in sk`).
+    Substring relations are computed lazily, at most once per pair.
+    """
+
+    def __init__(self, synonyms: dict, known: list = ()):
+        self._lock = threading.Lock()
+        self.ids = {}
+        self.names = []
+        self._groups = {}        # id -> mask of every synonym group it belongs to
+        self._student_side = []  # ids that have appeared in an expanded student set
+        self._student_mask = 0
+        self._related = {}       # requirement id -> (mask, number of student-side ids checked)
+
+        for main, syns in synonyms.items():
+            group = 0
+            for name in [main] + list(syns):
+                group |= 1 << self.intern(name)
+            for name in [main] + list(syns):
+                sid = self.ids[name.lower().strip()]
+                self._groups[sid] = self._groups.get(sid, 0) | group
+        for name in known:
+            self.intern(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, name: str) -> int:
+        """ID of `name`, added when new; only for vocabulary and catalog requirements."""
+        key = name.lower().strip()
+        sid = self.ids.get(key)
+        if sid is None:
+            with self._lock:
+                sid = self.ids.get(key)
+                if sid is None:
+                    sid = self.ids[key] = len(self.names)
+                    self.names.append(key)
+        return sid
+
+    def lookup(self, name: str):
+        """ID of `name`, or None when it was never interned."""
+        return self.ids.get(name.lower().strip())
+
+    def name(self, sid: int) -> str:
+        return self.names[sid]
+
+    def scope(self) -> "SkillScope":
+        return SkillScope(self)
+
+    def expand(self, skills) -> ExpandedSkills:
+        """`skills` plus every synonym group they belong to; unknown skills are not interned."""
+        mask = 0
+        extra = {}
+        for s in skills:
+            sid = self.lookup(s)
+            if sid is None:
+                extra[s.lower().strip()] = None
+            else:
+                mask |= (1 << sid) | self._groups.get(sid, 0)
+        new = mask & ~self._student_mask
+        if new:
+            with self._lock:
+                new = mask & ~self._student_mask
+                self._student_side.extend(iter_bits(new))
+                self._student_mask |= new
+        return ExpandedSkills(mask, tuple(extra), [self.names[i] for i in iter_bits(mask)] + list(extra))
+
+    def to_names(self, expanded: ExpandedSkills) -> list:
+        return list(expanded.names)
+
+    def related(self, rid: int) -> int:
+        """Student-side ids that contain, or are contained in, requirement `rid`."""
+        mask, checked = self._related.get(rid, (0, 0))
+        side = self._student_side
+        if checked < len(side):
+            req = self.names[rid]
+            end = len(side)
+            for sid in side[checked:end]:
+                sk = self.names[sid]
+                if sk in req or req in sk:
+                    mask |= 1 << sid
+            self._related[rid] = (mask, end)
+        return mask
+
+    def weight(self, rid: int, expanded: ExpandedSkills) -> float:
+        """1 for an exact synonym-set hit, 0.8 for a substring hit, else 0."""
+        if expanded.mask >> rid & 1:
+            return 1
+        if self.related(rid) & expanded.mask:
+            return 0.8
+        if expanded.extra and expanded.related_extra(self.names[rid]):
+            return 0.8
+        return 0
+
+    def name_weight(self, req: str, expanded: ExpandedSkills) -> float:
+        """weight() for a requirement given by name, without interning it."""
+        rid = self.lookup(req)
+        if rid is not None:
+            return self.weight(rid, expanded)
+        req = req.lower().strip()
+        if req in expanded.extra:
+            return 1
+        return 0.8 if any(sk in req or req in sk for sk in expanded.names) else 0
+
+
+class SkillScope:
+    """
+    Registry view for one request's inline jobs: requirements the registry
+    knows keep their IDs, the rest get local negative IDs that disappear
+    with the scope.
+    """
+
+    def __init__(self, registry: SkillRegistry):
+        self.registry = registry
+        self._local = {}
+        self._names = []
+
+    def intern(self, name: str) -> int:
+        sid = self.registry.lookup(name)
+        if sid is None:
+            key = name.lower().strip()
+            sid = self._local.get(key)
+            if sid is None:
+                self._names.append(key)
+                sid = self._local[key] = -len(self._names)
+        return sid
+
+    def name(self, sid: int) -> str:
+        return self.registry.names[sid] if sid >= 0 else self._names[-sid - 1]
+
+    def weight(self, rid: int, expanded: ExpandedSkills) -> float:
+        if rid >= 0:
+            return self.registry.weight(rid, expanded)
+        return self.registry.name_weight(self._names[-rid - 1], expanded)
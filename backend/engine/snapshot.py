@@ -0,0 +1,139 @@
+"""
+Versioned snapshot files for the derived catalog structures.
+
+Building a catalog normalizes every record, interns skill IDs, tokenizes the
+job texts and resolves every location against the gazetteer. All of that is a
+pure function of the data file and the code that derives it, so catalog.py
+saves the result here after a build and the next process start loads it
+instead of recomputing.
+
+A snapshot is two pickles in one file: a small header, then the state. The
+header carries SNAPSHOT_FORMAT and `code_key()`, a hash of the modules that
+derive the structures and of the settings baked into them (LSH_BANDS,
+LSH_ROWS); when either differs the snapshot is ignored (and rebuilt), so an
+engine upgrade or a config change never reads stale indexes.
+
+Snapshots are written by the engine into its own data directory. Like any
+pickle they must not be loaded from an untrusted location: a file that is
+not owned by this user, or that group/others may write, is never read.
+
+Prebuild the bundled sources at deploy time (e.g. in the build command, so
+an instance that starts with CATALOG_PRELOAD never builds them):
+
+    python snapshot.py csv json
+"""
+import argparse
+import functools
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+logger = logging.getLogger("Snapshot")
+
+# Bump when the layout of the pickled state changes
+SNAPSHOT_FORMAT = 1
+# Snapshots kept per source (the key up to its first '.'); older ones are removed after a write
+SNAPSHOT_KEEP = int(os.getenv('CATALOG_SNAPSHOT_KEEP', '4'))
+SNAPSHOT_SUFFIX = ".snap"
+
+# Modules whose code decides what the derived structures contain
+DERIVING_MODULES = ("catalog", "columnar", "gazetteer", "ingest", "matcher", "scoring", "similarity", "skills")
+
+
+def deriving_settings() -> dict:
+    """Settings the pickled text indexes are built with."""
+    from similarity import LSH_BANDS, LSH_ROWS
+    return {"LSH_BANDS": LSH_BANDS, "LSH_ROWS": LSH_ROWS}
+
+
+@functools.lru_cache(maxsize=1)
+def code_key() -> str:
+    digest = hashlib.sha1()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in DERIVING_MODULES:
+        with open(os.path.join(here, f"{name}.py"), 'rb') as f:
+            digest.update(f.read())
+    digest.update(repr(sorted(deriving_settings().items())).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def _header() -> dict:
+    return {"format": SNAPSHOT_FORMAT, "code": code_key()}
+
+
+def snapshot_path(directory: str, key: str) -> str:
+    return os.path.join(directory, f"{key}{SNAPSHOT_SUFFIX}")
+
+
+def write_snapshot(path: str, state: dict):
+    """Writes atomically, so a concurrent reader sees the old file or the new one."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(_header(), f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    prune_snapshots(directory, os.path.basename(path).split('.', 1)[0])
+
+
+def _trusted(f) -> bool:
+    """Owned by this user and not writable by group/others."""
+    st = os.fstat(f.fileno())
+    return (not hasattr(os, "getuid") or st.st_uid == os.getuid()) and not st.st_mode & 0o022
+
+
+def read_snapshot(path: str):
+    """The saved state, or None when there is no usable snapshot at `path`."""
+    try:
+        with open(path, 'rb') as f:
+            if not _trusted(f):
+                logger.warning(f"Ignoring snapshot {path}: not owned by this user or writable by others.")
+                return None
+            header = pickle.load(f)
+            if header != _header():
+                logger.info(f"Ignoring snapshot {path}: written by other code ({header}).")
+                return None
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+
+def prune_snapshots(directory: str, source: str, keep: int = None):
+    """Removes all but the `keep` most recently written snapshots of `source`."""
+    keep = SNAPSHOT_KEEP if keep is None else keep
+    paths = [os.path.join(directory, name) for name in os.listdir(directory)
+             if name.startswith(f"{source}.") and name.endswith(SNAPSHOT_SUFFIX)]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build catalog snapshots for bundled sources.")
+    parser.add_argument("sources", nargs="+", help="catalog sources, e.g. csv json")
+    parser.add_argument("--columnar", action="store_true", help="snapshot the columnar-backed catalog")
+    args = parser.parse_args(argv)
+
+    from catalog import SNAPSHOT_DIR, load_catalog
+    logging.basicConfig(level=logging.INFO)
+    for source in args.sources:
+        load_catalog(source=source, columnar=args.columnar, snapshot=True)
+    print(f"Snapshots in {os.path.abspath(SNAPSHOT_DIR)}: {sorted(os.listdir(SNAPSHOT_DIR))}")
+
+
+if __name__ == "__main__":
+    main()
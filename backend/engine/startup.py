@@ -0,0 +1,186 @@
+"""
+Startup profile: where a cold start spends its time.
+
+`PROFILE.install()` (first thing in main.py) puts an import timer at the
+front of `sys.meta_path`. Every module imported after it is timed while it
+executes: `total_ms` includes the modules it imports, `self_ms` does not.
+main.py calls `PROFILE.finish_imports()` once its own imports are done, which
+removes the timer so later imports run untouched, times its startup phases
+(dotenv, catalog preload, LLM client warm-up) with `PROFILE.phase(name)`, and
+calls `PROFILE.mark_ready()` when the app starts serving.
+
+When the imports take longer than STARTUP_IMPORT_BUDGET_MS (0 = no budget)
+the slowest modules are logged as a warning.
+
+The report is served on GET /startup. To profile a cold import locally:
+
+    python startup.py            # imports main.py, prints the JSON report
+    python startup.py --top 40   # exits with 1 when over the import budget
+"""
+import argparse
+import importlib.abc
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("Startup")
+
+
+
+def _process_start_time() -> float:
+    """Wall-clock start of this process (from /proc on Linux), else now."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - (uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+
+PROCESS_STARTED = _process_start_time()
+IMPORT_BUDGET_MS = float(os.getenv('STARTUP_IMPORT_BUDGET_MS', '0'))
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """Times exec_module(); the module keeps its real loader."""
+
+    def __init__(self, loader, timer):
+        self.loader = loader
+        self.timer = timer
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+        self.timer._exec(module, self.loader)
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    def __init__(self):
+        self.modules = []  # (name, total seconds, self seconds), in completion order
+        self._local = threading.local()
+
+    def find_spec(self, name, path, target=None):
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                        spec.loader = _TimedLoader(spec.loader, self)
+                    return spec
+            return None
+        finally:
+            self._local.finding = False
+
+    def _exec(self, module, loader):
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)  # time spent in nested imports
+        start = time.perf_counter()
+        try:
+            loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += total
+            self.modules.append((module.__name__, total, total - nested))
+
+
+class StartupProfile:
+    def __init__(self, import_budget_ms: float = IMPORT_BUDGET_MS):
+        self.timer = None
+        self.import_budget_ms = import_budget_ms
+        self.phases = {}  # name -> seconds
+        self.ready_at = None
+
+    def install(self):
+        if self.timer is None:
+            self.timer = ImportTimer()
+            sys.meta_path.insert(0, self.timer)
+
+    def finish_imports(self):
+        """Stops timing imports and checks them against the budget."""
+        if self.timer is None or self.timer not in sys.meta_path:
+            return
+        sys.meta_path.remove(self.timer)
+        report = self.report(top=5)
+        if self.over_budget(report):
+            slowest = ", ".join(f"{m['module']} {m['self_ms']:.0f}ms" for m in report["slowest_modules"])
+            logger.warning(f"Imports took {report['imports_ms']:.0f}ms, over the "
+                           f"{self.import_budget_ms:.0f}ms budget. Slowest: {slowest}")
+
+    def mark_ready(self):
+        """The app is serving; the time since process start counts as startup."""
+        if self.ready_at is None:
+            self.ready_at = time.time()
+
+    def over_budget(self, report: dict) -> bool:
+        return bool(self.import_budget_ms) and report["imports_ms"] > self.import_budget_ms
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def report(self, top: int = 25) -> dict:
+        ms = lambda s: round(1000 * s, 2)
+        modules = self.timer.modules if self.timer is not None else []
+        by_package = {}
+        for name, _, self_s in modules:
+            package = name.split(".")[0]
+            by_package[package] = by_package.get(package, 0.0) + self_s
+        return {
+            "process_started_at": PROCESS_STARTED,
+            "ready_ms": ms(self.ready_at - PROCESS_STARTED) if self.ready_at else None,
+            "imports_ms": ms(sum(self_s for _, _, self_s in modules)),
+            "import_budget_ms": self.import_budget_ms or None,
+            "modules_imported": len(modules),
+            "phases_ms": {name: ms(s) for name, s in self.phases.items()},
+            "packages_ms": dict(sorted(((p, ms(s)) for p, s in by_package.items()), key=lambda x: -x[1])[:top]),
+            "slowest_modules": [
+                {"module": name, "self_ms": ms(self_s), "total_ms": ms(total)}
+                for name, total, self_s in sorted(modules, key=lambda m: -m[2])[:top]
+            ],
+        }
+
+
+PROFILE = StartupProfile()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile a cold import of the engine.")
+    parser.add_argument("--module", default="main", help="module to import (default: main)")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args(argv)
+
+    # main.py imports this module by name; share one profile with it
+    sys.modules.setdefault("startup", sys.modules[__name__])
+    PROFILE.install()
+    with PROFILE.phase(f"import {args.module}"):
+        __import__(args.module)
+    PROFILE.finish_imports()
+    PROFILE.mark_ready()
+    report = PROFILE.report(args.top)
+    print(json.dumps(report, indent=2))
+    return 1 if PROFILE.over_budget(report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
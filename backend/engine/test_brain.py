@@ -56,3 +56,737 @@ def test_matching_engine_structure():
         data = response.json()
         assert data["success"] is True
         assert len(data["data"]) > 0
+
+def test_catalog_match():
+    internships = [
+        {"id": 1, "role": "Python Intern", "company": "Tech Corp", "location": "Bangalore", "skills_required": "Python"},
+        {"id": 2, "role": "Sales Intern", "company": "Shop Co", "location": "Mumbai", "skills_required": "Sales"},
+    ]
+    response = client.post("/catalog/load", json={"internships": internships})
+    assert response.status_code == 200
+    info = response.json()["data"]
+    assert info["count"] == 2
+
+    student = {"name": "Jane", "skills": ["Python"], "preferred_state": "Bangalore", "resume_text": ""}
+    response = client.post("/match", json={"student": student, "catalog_version": info["catalog_version"], "job_ids": [1]})
+    assert response.status_code == 200
+    results = response.json()["data"]["results"]
+    assert [r["id"] for r in results] == [1]
+
+    response = client.post("/match", json={"student": student, "catalog_version": "stale.0"})
+    assert response.status_code == 409
+
+def test_token_index_matches_compute_similarities():
+    from matcher import compute_similarities
+    from similarity import TokenIndex
+    texts = ["Python Intern Tech Corp Bangalore Python", "Sales Intern Shop Co Mumbai", ""]
+    index = TokenIndex()
+    for i, text in enumerate(texts):
+        index.add(str(i), text)
+    student_text = "python react bangalore"
+    assert index.similarities(student_text, ["0", "1", "2"]) == compute_similarities(student_text, texts)
+
+def test_vectorized_scoring_matches_loop():
+    from matcher import process_matching
+    from scoring import is_available
+    if not is_available():
+        pytest.skip("NumPy not installed")
+    internships = [
+        {"id": i, "role": role, "company": "Co", "location": loc, "sector": sector, "skills": skills}
+        for i, (role, loc, sector, skills) in enumerate([
+            ("Python Developer Intern", "('Bangalore',)", "Information Technology", "Python, SQL, Django"),
+            ("Data Analyst Intern", "Chennai", "Technology", "Excel, Power BI, Python"),
+            ("Accounts Intern", "Bangalore", "Finance", "Tally, GST"),
+            ("Web Developer Intern", "Work From Home", "Technology", "['HTML', 'CSS', 'JavaScript']"),
+        ])
+    ]
+    student = {"name": "A", "skills": ["Python", "CSS"], "qualification": "B.Tech",
+               "preferred_state": "Bangalore", "resume_text": "SQL and pandas, 1 year"}
+    results = {}
+    for mode in ("loop", "vectorized"):
+        data = {"student": dict(student), "internships": internships, "workPreference": "both", "scoring": mode}
+        results[mode] = process_matching(data)["results"]
+    assert results["loop"] == results["vectorized"]
+
+def test_skill_registry_matches_substring_rules():
+    from matcher import SKILL_REGISTRY, split_requirements
+    expanded = SKILL_REGISTRY.expand(["postgresql", "React"])
+    names = set(SKILL_REGISTRY.to_names(expanded))
+    assert {"sql", "mysql", "javascript", "typescript"} <= names
+    matched, missing = split_requirements("SQL Server, Node.js / reactjs; Tally", expanded)
+    assert matched == ["sql server", "node.js", "reactjs"]
+    assert missing == ["tally"]
+
+def test_skill_registry_does_not_grow_with_requests():
+    from matcher import SKILL_REGISTRY, process_matching, split_requirements
+    SKILL_REGISTRY.expand(["python"])
+    size = len(SKILL_REGISTRY)
+    for i in range(20):
+        expanded = SKILL_REGISTRY.expand([f"zyx-skill-{i}", "python"])
+        assert split_requirements(f"zyx-skill-{i}, Python 3, zyx", expanded) == (
+            [f"zyx-skill-{i}", "python 3", "zyx"], [])
+        process_matching({"student": {"skills": [f"qwv-{i}"]}, "workPreference": "both",
+                          "internships": [{"id": 1, "role": "Intern", "location": "Pune",
+                                           "skills_required": f"qwv-{i}, qwv-other-{i}"}]})
+    assert len(SKILL_REGISTRY) == size
+
+def test_gazetteer_location_tiers():
+    from gazetteer import GAZETTEER, StudentLocations
+    student = StudentLocations(["bengaluru", "pune"])
+    assert student.is_local(GAZETTEER.resolve("('Bangalore', 'Bangalore')"))
+    assert not student.is_local(GAZETTEER.resolve("Punei Road, Goa"))
+    assert student.is_regional(GAZETTEER.resolve("Mysore"))
+    assert student.is_regional(GAZETTEER.resolve("Thane, Maharashtra"))
+    assert not student.is_regional(GAZETTEER.resolve("Chennai"))
+
+    # A state next to a city qualifies it; on its own it is the preference
+    qualified = StudentLocations(["bangalore", "karnataka"])
+    assert qualified.is_local(GAZETTEER.resolve("Bangalore"))
+    assert not qualified.is_local(GAZETTEER.resolve("Mysore")) and qualified.is_regional(GAZETTEER.resolve("Mysore"))
+    assert StudentLocations(["karnataka", "remote"]).is_local(GAZETTEER.resolve("Mysore"))
+    assert GAZETTEER.resolve("('Work from home', 'Work from home')").is_remote
+
+def test_normalize_record_parses_literal_columns():
+    from ingest import normalize_record
+    job = normalize_record({
+        "id": 1, "role": "Sales (B2B) Intern", "location": "('Mohali', 'Chandigarh, Mohali')",
+        "skills": "['MS-Excel', 'English Proficiency (Spoken)']", "perks": "", "internType": "['Internship']",
+    })
+    assert job["locations"] == ["Mohali", "Chandigarh"]
+    assert job["location"] == "Mohali, Chandigarh"
+    assert job["skills"] == ["MS-Excel", "English Proficiency (Spoken)"]
+    assert job["internType"] == ["Internship"]
+    assert job["perks"] == ""
+    assert job["role"] == "Sales B2B Intern"
+    assert normalize_record(job) == job
+
+def test_batch_match_equals_single():
+    internships = [
+        {"id": 1, "role": "Python Intern", "company": "Tech Corp", "location": "Bangalore", "skills_required": "Python, SQL"},
+        {"id": 2, "role": "Sales Intern", "company": "Shop Co", "location": "Mumbai", "skills_required": "Sales"},
+        {"id": 3, "role": "Web Developer", "company": "Web Co", "location": "Work From Home", "skills_required": "HTML, CSS"},
+    ]
+    students = [
+        {"id": "a", "name": "A", "skills": ["Python"], "preferred_state": "Bangalore", "resume_text": "sql"},
+        {"id": "b", "name": "B", "skills": ["Sales"], "preferred_state": "Pune", "preferredSector": "Marketing", "resume_text": ""},
+    ]
+    response = client.post("/match/batch", json={"students": students, "internships": internships, "top_k": 2})
+    assert response.status_code == 200
+    batch = response.json()["data"]
+    assert [b["student_id"] for b in batch] == ["a", "b"]
+    for student, entry in zip(students, batch):
+        single = client.post("/match", json={"student": student, "internships": internships}).json()["data"]
+        assert entry["results"] == single["results"][:2]
+        assert entry["location_fallback"] == single["location_fallback"]
+
+    duplicated = internships + [dict(internships[0], role="Another Python Intern")]
+    response = client.post("/match/batch", json={"students": students, "internships": duplicated})
+    assert response.status_code == 400 and "1" in response.json()["detail"]
+    for top_k in (0, -1):
+        response = client.post("/match/batch", json={"students": students, "internships": internships, "top_k": top_k})
+        assert response.status_code == 400 and "top_k" in response.json()["detail"]
+
+def test_match_maps_bad_input_to_400(monkeypatch):
+    import main
+    def reject(data, catalog=None):
+        raise ValueError("bad input")
+    monkeypatch.setattr(main, "rank_matches", reject)
+    student = {"name": "A", "skills": ["Python"], "preferred_state": "Pune"}
+    response = client.post("/match", json={"student": student, "internships": []})
+    assert (response.status_code, response.json()["detail"]) == (400, "bad input")
+
+def test_llm_client_bounds_concurrency_and_cancels():
+    import asyncio
+    import time
+    from llm import LLMClient, LLMUnavailable
+
+    class FakeModel:
+        def __init__(self):
+            self.active = self.peak = self.cancelled = 0
+
+        async def generate_content_async(self, prompt, **kwargs):
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            try:
+                await asyncio.sleep(0.05 if prompt == "fast" else 5)
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            finally:
+                self.active -= 1
+            return type("Response", (), {"text": f" {prompt} "})()
+
+    client = LLMClient(concurrency=2, timeout=1)
+    client._model, client._initialized = FakeModel(), True
+
+    async def run():
+        return await asyncio.gather(*(client.generate("fast") for _ in range(6)))
+
+    assert asyncio.run(run()) == ["fast"] * 6
+    assert client._model.peak == 2
+
+    start = time.monotonic()
+    with pytest.raises(LLMUnavailable):
+        client.generate_sync("slow", timeout=0.2)
+    assert time.monotonic() - start < 1
+    time.sleep(0.05)
+    assert client._model.cancelled == 1
+    assert client.info()["timeouts"] == 1 and client.info()["in_flight"] == 0
+
+def test_llm_response_cache(tmp_path):
+    from llm import LLMClient, ResponseCache, cache_key
+
+    now = [1000.0]
+    db = str(tmp_path / "llm_cache.sqlite3")
+    cache = ResponseCache(max_size=2, ttl=60, db_path=db, clock=lambda: now[0])
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")  # evicts "b", the least recently used
+    assert len(cache) == 2 and cache.stats["evictions"] == 1
+    cache.flush()
+
+    restarted = ResponseCache(max_size=2, ttl=60, db_path=db, clock=lambda: now[0])
+    assert restarted.get("b") == "B" and restarted.stats["disk_hits"] == 1
+    now[0] += 61
+    assert restarted.get("b") is None and restarted.get("c") is None
+
+    # The file keeps only the newest `max_rows` writes
+    capped = ResponseCache(max_size=8, ttl=60, db_path=str(tmp_path / "capped.sqlite3"), max_rows=2)
+    for key in "abc":
+        capped.put(key, key.upper())
+    capped.flush()
+    reopened = ResponseCache(max_size=8, ttl=60, db_path=str(tmp_path / "capped.sqlite3"))
+    assert reopened.get("a") is None and reopened.get("b") == "B" and reopened.get("c") == "C"
+
+    class FakeModel:
+        calls = 0
+        async def generate_content_async(self, prompt, **kwargs):
+            FakeModel.calls += 1
+            return type("Response", (), {"text": prompt.upper()})()
+
+    client = LLMClient(cache=ResponseCache(max_size=8, ttl=60))
+    client._model, client._initialized = FakeModel(), True
+    config = {"temperature": 0.8}
+    assert client.generate_sync("react google", generation_config=config) == "REACT GOOGLE"
+    assert client.generate_sync("react google", generation_config=config) == "REACT GOOGLE"
+    assert FakeModel.calls == 1
+    assert client.info()["cache"]["hits"] == 1 and client.info()["cache"]["misses"] == 1
+    assert cache_key("m", "p", {"a": 1, "b": 2}) == cache_key("m", "p", {"b": 2, "a": 1})
+
+def test_match_stream_results_then_patches(monkeypatch):
+    import asyncio
+    import main
+    internships = [
+        {"id": i, "role": f"Python Intern {i}", "company": "Tech Corp", "location": "Bangalore", "skills_required": "Python"}
+        for i in range(4)
+    ]
+    student = {"name": "Jane", "skills": ["Python"], "preferred_state": "Bangalore", "resume_text": ""}
+    patches = [{"index": 2, "aiExplanation": "LLM pick", "roadmap": {"days": []}}]
+    async def fake_explanations(student, jobs):
+        await asyncio.sleep(0.2)
+        return patches
+    monkeypatch.setattr(main, "llm_explanations_async", fake_explanations)
+
+    labels = {"method": "POST", "route": "/match/stream", "status": 200}
+    timed = main.HTTP_REQUEST_SECONDS.sum(**labels)
+    response = client.post("/match/stream", json={"student": dict(student), "internships": internships})
+    assert response.status_code == 200
+    # Timed to the end of the stream, not to the first chunk
+    assert main.HTTP_REQUEST_SECONDS.sum(**labels) - timed >= 0.2
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [e["event"] for e in events] == ["results", "explanation", "done"]
+    results = events[0]["results"]
+    assert all(r["aiExplanation"] and r["llm_reranked"] is False for r in results)
+
+    for patch in events[1:-1]:
+        results[patch["index"]].update(aiExplanation=patch["aiExplanation"], roadmap=patch["roadmap"],
+                                       llm_reranked=patch["llm_reranked"])
+    final = [results[i] for i in events[-1]["order"]]
+    expected = client.post("/match", json={"student": dict(student), "internships": internships}).json()["data"]
+    assert final == expected["results"]
+
+def test_match_awaits_llm_outside_worker_pool(monkeypatch):
+    import asyncio
+    import time
+    import httpx
+    import main
+    import matcher
+    from workers import WorkerPool
+
+    pool = WorkerPool("thread", size=1, queue_limit=2)
+    monkeypatch.setattr(main, "POOL", pool)
+
+    async def slow_generate(prompt, **kwargs):
+        await asyncio.sleep(0.3)
+        return '[{"index": 0, "explanation": "LLM pick"}]'
+    async def available():
+        return True
+    monkeypatch.setattr(matcher, "is_gemini_available_async", available)
+    monkeypatch.setattr(matcher.LLM, "generate", slow_generate)
+
+    internships = [{"id": 1, "role": "Python Intern", "company": "Tech Corp", "location": "Pune", "skills_required": "Python"}]
+    payload = {"student": {"name": "Jane", "skills": ["Python"], "preferred_state": "Pune"}, "internships": internships}
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as ac:
+            return await asyncio.gather(*(ac.post("/match", json=payload) for _ in range(3)))
+
+    start = time.monotonic()
+    responses = asyncio.run(run())
+    assert time.monotonic() - start < 0.8  # the three LLM waits overlap; none holds the single pool thread
+    assert all(r.status_code == 200 for r in responses)
+    assert responses[0].json()["data"]["results"][0]["aiExplanation"] == "LLM pick"
+    assert pool.info()["completed"] == 3
+    pool.shutdown()
+
+    # A slow first model load runs off the event loop
+    from llm import LLMClient
+    client = LLMClient()
+    client._load_model = lambda: time.sleep(0.3)
+
+    async def check():
+        ticks = 0
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        ticker = asyncio.ensure_future(tick())
+        available = await client.available_async()
+        ticker.cancel()
+        return available, ticks
+    available, ticks = asyncio.run(check())
+    assert available is False and ticks >= 10
+
+def test_analyze_resume_awaits_llm_outside_worker_pool(monkeypatch):
+    import asyncio
+    import time
+    import httpx
+    import main
+    import matcher
+    from llm import ResponseCache
+    from workers import WorkerPool
+
+    pool = WorkerPool("thread", size=1, queue_limit=2)
+    monkeypatch.setattr(main, "STATELESS_POOL", pool)
+    monkeypatch.setattr(matcher, "RESUME_CACHE", ResponseCache(max_size=8, ttl=60, db_path=""))
+
+    async def slow_generate(prompt, **kwargs):
+        await asyncio.sleep(0.3)
+        return '{"fullName": "Jane Doe", "extractedSkills": ["Python"]}'
+    async def available():
+        return True
+    monkeypatch.setattr(matcher, "is_gemini_available_async", available)
+    monkeypatch.setattr(matcher.LLM, "generate", slow_generate)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as ac:
+            return await asyncio.gather(*(ac.post("/analyze-resume", json={"resumeText": f"Jane Doe {i} Python developer"})
+                                          for i in range(3)))
+
+    start = time.monotonic()
+    responses = asyncio.run(run())
+    assert time.monotonic() - start < 0.8  # only the parsing takes the single pool thread
+    assert all(r.status_code == 200 for r in responses)
+    assert responses[0].json()["data"]["fullName"] == "Jane Doe"
+    assert pool.info()["completed"] == 3
+    pool.shutdown()
+
+def test_worker_pool_limits_and_stats():
+    import asyncio
+    import time
+    from workers import WorkerPool, PoolSaturated
+
+    pool = WorkerPool("thread", size=1, queue_limit=1)
+
+    async def run():
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        calls = [asyncio.ensure_future(pool.run(time.sleep, 0.1)) for _ in range(3)]
+        await ticker()  # the event loop keeps running while workers sleep
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        return ticks, results
+
+    ticks, results = asyncio.run(run())
+    assert ticks[-1] - ticks[0] < 0.1
+    assert sum(isinstance(r, PoolSaturated) for r in results) == 1
+    info = pool.info()
+    assert info["completed"] == 2 and info["rejected"] == 1 and info["in_flight"] == 0
+    assert info["wait_ms"]["max"] >= 50  # the second call waited behind the first
+    pool.shutdown()
+
+def test_sharded_scoring_matches_single_process():
+    from catalog import InternshipCatalog
+    from matcher import process_matching
+    from scoring import is_available
+    if not is_available():
+        pytest.skip("NumPy not installed")
+    internships = [
+        {"id": i, "role": f"{role} Intern", "company": f"Co {i % 7}", "location": loc, "sector": "Technology", "skills": skills}
+        for i, (role, loc, skills) in enumerate([
+            ("Python Developer", "Bangalore", "Python, SQL"), ("Data Analyst", "Chennai", "Excel, Python"),
+            ("Web Developer", "Work From Home", "HTML, CSS, JavaScript"), ("Java Developer", "Pune", "Java, SQL"),
+        ] * 10)
+    ]
+    catalog = InternshipCatalog(internships)
+    student = {"name": "A", "skills": ["Python", "SQL"], "preferred_state": "Bangalore", "resume_text": ""}
+    single = process_matching({"student": dict(student), "full_pool": True}, catalog=catalog)
+    sharded = process_matching({"student": dict(student), "full_pool": True, "shards": 3}, catalog=catalog)
+    assert sharded == single
+
+def test_sharded_scorer_rebuild_waits_for_requests_in_flight():
+    import sharding
+    from catalog import InternshipCatalog
+    from matcher import KNOWN_SKILLS, SKILL_SYNONYMS
+    from scoring import is_available
+    if not is_available():
+        pytest.skip("NumPy not installed")
+    jobs = [{"id": i, "role": "Python Intern", "location": "Pune", "skills": "Python"} for i in range(6)]
+    first, second = InternshipCatalog(jobs), InternshipCatalog(jobs[:3])
+    args = (2, SKILL_SYNONYMS, KNOWN_SKILLS)
+    with sharding.sharded_scorer(first, *args) as old:
+        with sharding.sharded_scorer(second, *args) as new:
+            assert new is not old
+            # The retired scorer keeps serving the request that still holds it
+            top = old.top_k([str(i) for i in range(6)], [0.5] * 6, ["local"] * 6, ["python"], False, "", 3)
+            assert [r[1] for r in top] == [0, 1, 2]
+        assert not old.executors[0]._shutdown_thread
+    assert old.executors[0]._shutdown_thread
+    sharding._scorer.retire()
+    sharding._scorer = None
+
+def test_tfidf_engine_scores_and_refits():
+    import math
+    from collections import Counter
+    import catalog as catalog_module
+    from catalog import InternshipCatalog
+    from similarity import TfidfIndex, term_counts
+    texts = {"a": "python django backend", "b": "sales marketing", "c": "python data analysis python", "d": ""}
+    index = TfidfIndex.fit(texts)
+
+    def cosine(x, y):
+        idf = {t: math.log(5 / (1 + sum(t in term_counts(v) for v in texts.values()))) + 1 for t in index.vocabulary}
+        vec = lambda c: {t: (1 + math.log(n)) * idf[t] for t, n in c.items() if t in idf}
+        vx, vy = vec(term_counts(x)), vec(term_counts(y))
+        norm = math.sqrt(sum(w * w for w in vx.values()) * sum(w * w for w in vy.values()))
+        return sum(w * vy.get(t, 0) for t, w in vx.items()) / norm if norm else 0.0
+
+    student = "python backend developer"
+    scores = index.similarities(student, ["a", "b", "c", "d", "missing"])
+    assert scores == pytest.approx([cosine(student, texts[k]) for k in "abcd"] + [0.0], abs=1e-6)
+    assert scores[0] > scores[2] > scores[1] == 0.0
+
+    catalog = InternshipCatalog([
+        {"id": i, "role": f"Python Intern {i}", "company": "Tech Corp", "location": "Pune", "skills": "Python"}
+        for i in range(10)
+    ])
+    tfidf = catalog.tfidf()
+    catalog.upsert([{"id": 3, "role": "Sales Intern", "company": "Shop Co", "location": "Pune", "skills": "Sales"}])
+    assert catalog.tfidf() is tfidf and tfidf.similarities("python", ["3"]) == [0.0]
+    assert catalog_module.TEXT_INDEX_REFIT_RATIO * len(catalog) < 2
+    catalog.delete([4])  # second changed job crosses the refit threshold
+    refit = catalog._rebuilds.get("tfidf")
+    if refit is not None:
+        refit.join()
+    assert catalog.tfidf() is not tfidf and "sales" in catalog.tfidf().vocabulary
+    fresh = InternshipCatalog([catalog.records[k] for k in catalog.records]).tfidf()
+    keys = list(catalog.records)
+    assert catalog.tfidf().similarities("python sales", keys) == pytest.approx(fresh.similarities("python sales", keys))
+
+def test_minhash_lsh_retrieval():
+    from catalog import InternshipCatalog
+    from matcher import process_matching
+    from similarity import MinHashIndex
+    texts = {"py": "python django backend api developer", "web": "react javascript html css frontend",
+             "sales": "sales marketing outreach", "empty": ""}
+    index = MinHashIndex.build(texts, bands=64, rows=1)
+    assert index.query("python django backend developer", 2)[0] == "py"
+    assert index.query("") == [] and "empty" not in index.query("python react sales")
+
+    index.add("ml", "python machine learning developer")
+    index.remove("py")
+    assert index.query("python machine learning", 1) == ["ml"] and "py" not in index.query("python django")
+    assert index.stale == {"ml", "py"}
+
+    catalog = InternshipCatalog([
+        {"id": i, "role": role, "company": "Co", "location": "Pune", "skills": skills}
+        for i, (role, skills) in enumerate([("Python Intern", "Python, Django"), ("Sales Intern", "Sales"),
+                                            ("Data Intern", "Python, SQL"), ("Design Intern", "Figma")])
+    ])
+    student = {"name": "A", "skills": ["Python", "Django"], "preferred_state": "Pune", "resume_text": ""}
+    results = process_matching({"student": dict(student), "retrieval": "lsh", "lsh_top_n": 2}, catalog=catalog)
+    assert {r["id"] for r in results["results"]} <= {0, 2}
+    # Candidates come back best first; jobs are matched in catalog order
+    assert [j["id"] for j in catalog.select(["3", 0, "2", "9"])] == [0, 2, 3]
+
+def test_pruned_topk_equals_exhaustive_ranking(monkeypatch):
+    import copy
+    import bench
+    import matcher
+    from catalog import InternshipCatalog
+    raw = bench.synthetic_internships(400, seed=5)
+    catalog = InternshipCatalog(raw)
+    looked_up, pruned_lookups = [], []
+    similarities = catalog.token_index.similarities
+    monkeypatch.setattr(catalog.token_index, "similarities",
+                        lambda text, keys: looked_up.append(len(keys)) or similarities(text, keys))
+    with bench.benchmark_environment():
+        for student in bench.synthetic_students(8, seed=6):
+            for data in ({}, {"full_pool": True}, {"full_pool": True, "internships": raw}):
+                data = {"student": copy.deepcopy(student), **data}
+                target = None if "internships" in data else catalog
+                exhaustive = matcher._rank_candidates({**copy.deepcopy(data), "topk": "exhaustive"}, target)[3]
+                looked_up.clear()
+                pruned = matcher._rank_candidates({**copy.deepcopy(data), "topk": "pruned"}, target)[3]
+                assert pruned == exhaustive
+                if target is catalog and data.get("full_pool"):
+                    pruned_lookups.append(sum(looked_up))
+    assert min(pruned_lookups) < len(catalog)  # some jobs were never text-matched
+
+def test_columnar_catalog_round_trip(tmp_path):
+    from catalog import InternshipCatalog, write_catalog_file
+    from columnar import ColumnarStore
+    from matcher import process_matching
+    internships = [
+        {"id": 1, "role": "Python Intern", "company": "Tech Corp", "location": "('Bangalore, Pune',)", "stipend": 5000, "skills": "['Python', 'SQL']"},
+        {"id": 2, "role": "Sales Intern", "company": "Tech Corp", "location": "Mumbai", "stipend": 2500.5, "perks": ["Certificate"]},
+        {"id": 3, "role": "Web Developer", "company": "Web Co", "location": "Work From Home", "skills": "HTML, CSS"},
+        {"id": 3, "role": "Web Lead", "company": "Web Co", "location": "Pune", "skills": "React"},
+    ]
+    path = str(tmp_path / "jobs.icat")
+    write_catalog_file(path, internships)
+    store = ColumnarStore(path)
+    columnar = InternshipCatalog(store.views(), store=store)
+    memory = InternshipCatalog(internships)
+
+    assert columnar.version == memory.version
+    assert [dict(j) for j in columnar.jobs()] == memory.jobs()
+    # Mixed int/float columns keep each value's type
+    assert [type(j["stipend"]) for j in columnar.jobs() if "stipend" in j] == [int, float]
+    assert "perks" not in columnar.records["1"] and "text" not in columnar.records["1"]
+    assert columnar.texts == memory.texts and columnar.features.rows == memory.features.rows
+    # The repeated ID 3 keeps its last row and is reported
+    assert memory.records["3"]["role"] == "Web Lead"
+    assert columnar.info()["duplicate_ids"] == memory.info()["duplicate_ids"] == \
+        {"identical": 0, "conflicting": 1, "conflicting_ids": ["3"]}
+    assert columnar.features.sectors == memory.features.sectors and columnar.locations == memory.locations
+    student = {"name": "A", "skills": ["Python"], "preferred_state": "Bangalore", "resume_text": ""}
+    assert process_matching({"student": dict(student)}, catalog=columnar) == \
+        process_matching({"student": dict(student)}, catalog=memory)
+
+def test_catalog_upsert_delete_keeps_indexes_current():
+    from catalog import InternshipCatalog
+    from matcher import process_matching
+    internships = [
+        {"id": 1, "role": "Python Intern", "company": "Tech Corp", "location": "Bangalore", "skills": "Python, SQL"},
+        {"id": 2, "role": "Sales Intern", "company": "Shop Co", "location": "Mumbai", "skills": "Sales"},
+        {"id": 3, "role": "Web Developer", "company": "Web Co", "location": "Work From Home", "skills": "HTML, CSS"},
+    ]
+    catalog = InternshipCatalog(internships)
+    base = catalog.version
+    student = {"name": "A", "skills": ["Python", "React"], "preferred_state": "Bangalore", "resume_text": ""}
+    process_matching({"student": dict(student)}, catalog=catalog)  # warms the per-sector cache
+
+    changed = {"id": 2, "role": "React Developer", "company": "Shop Co", "location": "Bangalore", "skills": "React"}
+    new = {"id": 4, "role": "Data Intern", "company": "Data Co", "location": "Pune", "skills": "Python"}
+    assert catalog.upsert([changed, new]) == ["2", "4"]
+    assert catalog.delete([3, 99]) == ["3"]
+    assert catalog.version == base.rsplit(".", 1)[0] + ".2"
+
+    fresh = InternshipCatalog([internships[0], changed, new])
+    assert list(catalog.records) == list(fresh.records)
+    assert catalog.token_index.postings == fresh.token_index.postings
+    assert catalog.token_index.sizes == fresh.token_index.sizes
+    assert catalog.features.rows == fresh.features.rows and catalog.locations == fresh.locations
+    assert process_matching({"student": dict(student)}, catalog=catalog) == \
+        process_matching({"student": dict(student)}, catalog=fresh)
+
+def test_resume_cache_skips_parse_and_llm(monkeypatch):
+    import matcher
+    from llm import ResponseCache
+    monkeypatch.setattr(matcher, "RESUME_CACHE", ResponseCache(max_size=8, ttl=60, db_path=""))
+    resume = "Jane Doe\r\nPython and SQL developer   \r\n2 years experience, B.Tech"
+    first = matcher.parse_resume(resume, ["Excel"])
+    again = matcher.parse_resume("Jane Doe\nPython and SQL developer\n2 years experience, B.Tech  ", ["Excel"])
+    assert sorted(again["skills"]) == sorted(first["skills"]) and "python" in first["skills"]
+    assert again["experience_years"] == 2 and matcher.RESUME_CACHE.stats["hits"] == 1
+
+    calls = []
+    def fake_generate(prompt, **kwargs):
+        calls.append(prompt)
+        return '{"fullName": "Jane Doe", "extractedSkills": ["Python"]}'
+    monkeypatch.setattr(matcher, "is_gemini_available", lambda: True)
+    monkeypatch.setattr(matcher.LLM, "generate_sync", fake_generate)
+    assert matcher.analyze_resume_deep(resume)["fullName"] == "Jane Doe"
+    again = matcher.analyze_resume_deep(resume + "\n")
+    assert again["extractedSkills"] == ["Python"] and again["fullName"] == "Jane Doe"
+    assert len(calls) == 1
+    # Cached entries hold no personal data
+    assert not any("Jane" in text for _, text in matcher.RESUME_CACHE._entries.values())
+
+    # Neither does the shared LLM response cache when Gemini really answers
+    class FakeModel:
+        async def generate_content_async(self, prompt, **kwargs):
+            return type("Response", (), {"text": '{"fullName": "Jane Doe", "email": "jane@example.com", '
+                                                 '"phone": "9876543210", "extractedSkills": ["SQL"]}'})()
+    monkeypatch.undo()
+    monkeypatch.setattr(matcher, "RESUME_CACHE", ResponseCache(max_size=8, ttl=60, db_path=""))
+    monkeypatch.setattr(matcher.LLM, "cache", ResponseCache(max_size=8, ttl=60, db_path=""))
+    monkeypatch.setattr(matcher.LLM, "_model", FakeModel())
+    monkeypatch.setattr(matcher.LLM, "_initialized", True)
+    contact = "Jane Doe\njane@example.com 9876543210\nSQL analyst"
+    assert matcher.analyze_resume_deep(contact)["email"] == "jane@example.com"
+    assert not any("jane@example.com" in text or "9876543210" in text
+                   for _, text in matcher.LLM.cache._entries.values())
+
+def test_benchmark_report_shape():
+    import bench
+    report = bench.run(sizes=[60], n_students=2, memory=False)
+    (result,) = report["results"]
+    assert result["jobs"] == 60 and result["catalog"]["build_ms"] > 0
+    assert {"parse_resume", "bucketization", "compute_similarities", "skill_scoring", "gap_analysis",
+            "fallback_explain", "process_matching"} <= set(result["stages"])
+    assert result["stages"]["process_matching"]["calls"] == 2
+    slower = json.loads(json.dumps(report))
+    slower["results"][0]["stages"]["bucketization"]["p50_ms"] += 100
+    assert [r["stage"] for r in bench.compare(report, slower)] == ["bucketization"]
+
+def test_metrics_endpoint_reports_stages_and_routes():
+    from metrics import STAGE_SECONDS
+    before = STAGE_SECONDS.count(stage="bucketization")
+    internships = [{"id": 1, "role": "Python Intern", "company": "Tech Corp", "location": "Pune", "skills_required": "Python"}]
+    student = {"name": "Jane", "skills": ["Python"], "preferred_state": "Pune", "resume_text": ""}
+    assert client.post("/match", json={"student": student, "internships": internships}).status_code == 200
+    assert STAGE_SECONDS.count(stage="bucketization") == before + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+    assert 'engine_http_request_seconds_count{method="POST",route="/match",status="200"}' in response.text
+    assert 'engine_stage_seconds_bucket{stage="scoring",le="+Inf"}' in response.text
+    assert 'engine_cache_hits_total{cache="resume"}' in response.text
+
+def test_catalog_snapshot_restores_derived_structures(tmp_path, monkeypatch):
+    import catalog as catalog_module
+    import snapshot
+    from matcher import process_matching
+    monkeypatch.setattr(catalog_module, "SNAPSHOT_DIR", str(tmp_path))
+    internships = [
+        {"id": 1, "role": "Python Intern", "company": "Tech Corp", "location": "Bangalore", "skills": "Python, SQL"},
+        {"id": 2, "role": "Sales Intern", "company": "Shop Co", "location": "Mumbai", "skills": "Sales"},
+        {"id": 3, "role": "Web Developer", "company": "Web Co", "location": "Work From Home", "skills": "HTML, CSS"},
+    ]
+    built = catalog_module.load_catalog(internships, snapshot=True)
+    (path,) = tmp_path.iterdir()
+    restored = catalog_module.load_catalog(internships, snapshot=True)
+    assert restored.version == built.version and restored.records == built.records
+    assert restored.token_index.postings == built.token_index.postings
+    assert restored.features.rows == built.features.rows and restored.locations == built.locations
+    student = {"name": "A", "skills": ["Python"], "preferred_state": "Bangalore", "resume_text": ""}
+    assert process_matching({"student": dict(student)}, catalog=restored) == \
+        process_matching({"student": dict(student)}, catalog=built)
+
+    import os
+    import similarity
+    os.chmod(path, 0o666)
+    assert snapshot.read_snapshot(str(path)) is None  # writable by others: never unpickled
+    os.chmod(path, 0o600)
+    catalog_module.load_catalog(internships[:2])  # inline catalogs are not snapshotted by default
+    assert len(list(tmp_path.iterdir())) == 1
+
+    key = snapshot.code_key()
+    monkeypatch.setattr(similarity, "LSH_BANDS", similarity.LSH_BANDS + 1)
+    snapshot.code_key.cache_clear()
+    assert snapshot.code_key() != key
+    snapshot.code_key.cache_clear()
+    monkeypatch.setattr(snapshot, "code_key", lambda: "other-code")
+    assert snapshot.read_snapshot(str(path)) is None
+    assert client.get("/startup").json()["modules_imported"] > 0
+
+def test_match_body_codecs_and_negotiation():
+    import codec
+    import numpy as np
+    internships = [{"id": 1, "role": "Python Intern", "company": "Tech Corp", "location": "Pune", "skills_required": "Python"}]
+    student = {"name": "Jane", "skills": ["Python"], "preferred_state": "Pune", "resume_text": ""}
+    plain = client.post("/match", json={"student": student, "internships": internships})
+    assert plain.status_code == 200 and plain.headers["content-type"] == "application/json"
+    assert plain.json()["data"]["results"][0]["id"] == 1
+
+    headers = {"content-type": codec.MSGPACK, "accept": codec.MSGPACK}
+    if codec.msgpack_available():
+        body = codec.encode({"student": student, "internships": internships}, codec.MSGPACK)
+        packed = client.post("/match", content=body, headers=headers)
+        assert packed.headers["content-type"] == codec.MSGPACK
+        assert codec.msgpack.unpackb(packed.content) == plain.json()
+    else:
+        assert client.post("/match", content=b"\x80", headers=headers).status_code == 415
+        assert codec.negotiate(codec.MSGPACK) == codec.JSON
+    assert client.post("/match", json={"internships": internships}).json()["detail"][0]["loc"] == ["body", "student"]
+    assert codec.dumps_json({"score": np.int64(3), "tags": {"a"}}) == b'{"score":3,"tags":["a"]}'
+
+    # Routes answering through respond() still document their body model
+    schema = app.openapi()["paths"]["/match"]["post"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert schema == {"$ref": "#/components/schemas/MatchResponse"}
+    # /catalog/delete decodes its body like the other catalog routes
+    assert client.post("/catalog/delete", content=b"ids", headers={"content-type": "text/plain"}).status_code == 415
+
+def test_clean_data_job_runs_in_chunks_and_persists(tmp_path, monkeypatch):
+    from jobs import JOBS, JobRunner, JobStore
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(JOBS, "_store", store)
+    monkeypatch.setattr(JOBS, "chunk_size", 20)
+    items = [{"id": i, "location": "blr", "description": f"<p>Job <b>{i}</b></p>"} for i in range(55)]
+    response = client.post("/clean-data", json={"items": items})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    JOBS.wait(job_id, timeout=10)
+
+    job = client.get(f"/jobs/{job_id}").json()["data"]
+    assert (job["status"], job["processed"], job["chunks"], job["progress"]) == ("done", 55, 3, 1.0)
+    result = client.get(f"/jobs/{job_id}/result").json()["data"]
+    assert [r["id"] for r in result] == list(range(55))
+    assert result[7] == {"id": 7, "location": "Bangalore", "description": "Job 7"}
+    assert client.get("/jobs/missing").status_code == 404
+
+    # A job left unfinished by a previous process resumes from the store
+    pending = store.create("clean-data", items[:3], chunk_size=2)
+    assert client.get(f"/jobs/{pending}/result").status_code == 409
+    runner = JobRunner(store=JobStore(store.path))
+    assert runner.resume() == [pending]
+    runner.wait(pending, timeout=10)
+    assert [r["location"] for r in runner.result(pending)] == ["Bangalore"] * 3
+
+    # A job's chunks run side by side, one per pool worker
+    import time
+    import jobs
+    from workers import WorkerPool
+    def slow_clean(items):
+        time.sleep(0.2)
+        return items
+    monkeypatch.setitem(jobs.TASKS, "clean-data", slow_clean)
+    pool = WorkerPool("thread", size=3)
+    runner = JobRunner(store=JobStore(store.path), pool=pool, chunk_size=2)
+    start = time.monotonic()
+    job_id = runner.submit("clean-data", items[:12])
+    runner.wait(job_id, timeout=10)
+    assert time.monotonic() - start < 0.8 and runner.result(job_id) == items[:12]
+    pool.shutdown()
+
+def test_bulk_html_cleaning_matches_full_parser():
+    import htmlclean
+    texts = [
+        "  plain\n text ", "Tom &amp; Jerry&nbsp;Co", "<ul><li>Python</li><li>SQL</li></ul>",
+        '<a href="/x?a=1&b=2" title="1 > 0">Apply</a> <b>now</b>', "<script>if (a<b) {}</script>Hi<!-- <p> -->!",
+        "x<y and <div class='open", None,
+    ]
+    cleaned = [htmlclean.clean_html(t) for t in texts]
+    assert cleaned == ["plain text", "Tom & Jerry Co", "Python SQL", "Apply now", "Hi!", "x<y and <div class='open", ""]
+    assert cleaned[:-1] == [htmlclean.parse_text(t) for t in texts[:-1]]
+    # Unlike BeautifulSoup's get_text(), block tags separate words; inline tags do not
+    mixed = "<p>Build <b>REST</b> APIs</p><p>with <i>Py</i>thon</p><ul><li>SQL</li><li>Git</li></ul>"
+    assert htmlclean.clean_html(mixed) == htmlclean.parse_text(mixed) == "Build REST APIs with Python SQL Git"
@@ -0,0 +1,134 @@
+"""
+Execution layer for CPU-bound pipeline stages.
+
+FastAPI handlers are `async def`; running `process_matching` or resume
+analysis inline blocks every other request on the worker. `POOL` runs such
+calls on a bounded thread (or process) pool and hands the result back to
+the awaiting handler. Calls beyond `size + queue_limit` in flight are
+rejected with PoolSaturated instead of piling up behind a slow one.
+
+Sized with WORKER_POOL_SIZE and WORKER_QUEUE_LIMIT. Matching reads the
+in-memory catalog, so `POOL` is always a thread pool. Stateless stages with
+picklable arguments (resume analysis, data cleaning) go to `STATELESS_POOL`,
+which WORKER_POOL_KIND=process moves to worker processes. Background job
+chunks (jobs.py) run on `JOB_POOL`, JOB_WORKERS processes started on first
+use, so one large job is spread over every core.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+logger = logging.getLogger("Workers")
+
+WORKER_POOL_KIND = os.getenv('WORKER_POOL_KIND', 'thread')
+WORKER_POOL_SIZE = int(os.getenv('WORKER_POOL_SIZE', str(min(8, os.cpu_count() or 2))))
+WORKER_QUEUE_LIMIT = int(os.getenv('WORKER_QUEUE_LIMIT', '64'))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', str(os.cpu_count() or 1)))
+
+
+class PoolSaturated(Exception):
+    """Too many calls are already queued; the caller should retry later."""
+
+
+def _timed_call(fn, args, kwargs):
+    """Runs in the worker; returns (result, started_at, finished_at) in wall-clock time."""
+    started = time.time()
+    result = fn(*args, **kwargs)
+    return result, started, time.time()
+
+
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class WorkerPool:
+    def __init__(self, kind: str = WORKER_POOL_KIND, size: int = WORKER_POOL_SIZE,
+                 queue_limit: int = WORKER_QUEUE_LIMIT, window: int = 1024):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown worker pool kind '{kind}'. Use 'thread' or 'process'.")
+        self.kind = kind
+        self.size = size
+        self.queue_limit = queue_limit
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0  # submitted and not finished (queued + running)
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+        self._waits = deque(maxlen=window)  # seconds spent queued, most recent calls
+        self._runs = deque(maxlen=window)   # seconds spent running
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.size)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="engine-worker")
+        return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) on the pool and returns its result."""
+        with self._lock:
+            if self.pending >= self.size + self.queue_limit:
+                self.stats["rejected"] += 1
+                raise PoolSaturated(f"Worker pool busy ({self.pending} calls in flight), retry shortly")
+            self.pending += 1
+            self.stats["submitted"] += 1
+
+        submitted = time.time()
+        try:
+            future = self._get_executor().submit(_timed_call, fn, args, kwargs)
+            result, started, finished = await asyncio.wrap_future(future)
+        except Exception:
+            with self._lock:
+                self.stats["failed"] += 1
+            raise
+        finally:
+            with self._lock:
+                self.pending -= 1
+        with self._lock:
+            self.stats["completed"] += 1
+            self._waits.append(max(0.0, started - submitted))
+            self._runs.append(finished - started)
+        return result
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.pending - self.size)
+
+    def info(self) -> dict:
+        waits, runs = list(self._waits), list(self._runs)
+        return {
+            "kind": self.kind,
+            "size": self.size,
+            "queue_limit": self.queue_limit,
+            "in_flight": self.pending,
+            "queued": self.queued,
+            **self.stats,
+            "wait_ms": {
+                "avg": round(1000 * sum(waits) / len(waits), 3) if waits else 0.0,
+                "p99": round(1000 * _percentile(waits, 0.99), 3),
+                "max": round(1000 * max(waits), 3) if waits else 0.0,
+            },
+            "run_ms": {
+                "avg": round(1000 * sum(runs) / len(runs), 3) if runs else 0.0,
+                "p99": round(1000 * _percentile(runs, 0.99), 3),
+            },
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+POOL = WorkerPool("thread")
+STATELESS_POOL = POOL if WORKER_POOL_KIND == "thread" else WorkerPool(WORKER_POOL_KIND)
+JOB_POOL = WorkerPool("process", size=JOB_WORKERS)
@@ -209,6 +209,14 @@ app.listen(PORT, "0.0.0.0", async () => {
   // 2. Run expiration check AFTER schema is ready
   await checkAndExpireInternships();
 
+  // 3. Hand the internships to the Python engine once; matching then sends only IDs
+  const { syncCatalog } = require('./services/catalogService');
+  try {
+    await syncCatalog();
+  } catch (err) {
+    console.warn('⚠️ Engine catalog not loaded yet, the first match will retry:', err.message);
+  }
+
   // Optional: Run every hour
   // setInterval(checkAndExpireInternships, 60 * 60 * 1000);
 });
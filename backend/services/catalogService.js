@@ -0,0 +1,90 @@
+const pool = require('../config/database');
+const pythonClient = require('../utils/pythonClient');
+
+// The Python engine keeps its own indexed copy of the internships table (its "catalog").
+// Matching then sends job IDs instead of whole postings. Single-row writes are pushed
+// incrementally; bulk writes (and writes from other processes, via the max age) make
+// the next match reload the whole table.
+const CATALOG_MAX_AGE_MS = parseInt(process.env.CATALOG_MAX_AGE_MS || String(5 * 60 * 1000), 10);
+
+let catalogVersion = null;
+let loadedAt = 0;
+let stale = true;
+let loading = null;
+
+const syncCatalog = async () => {
+    // One reload at a time: concurrent callers share it
+    if (!loading) {
+        loading = (async () => {
+            try {
+                const result = await pool.query('SELECT * FROM internships');
+                stale = false; // writes from here on mark it stale again
+                const response = await pythonClient.loadCatalog(result.rows);
+                catalogVersion = response.data.catalog_version;
+                loadedAt = Date.now();
+                console.log(`📚 Engine catalog loaded: ${result.rows.length} internships (${catalogVersion})`);
+                return catalogVersion;
+            } catch (error) {
+                stale = true;
+                throw error;
+            } finally {
+                loading = null;
+            }
+        })();
+    }
+    return loading;
+};
+
+const ensureCatalog = async () => {
+    if (stale || !catalogVersion || Date.now() - loadedAt > CATALOG_MAX_AGE_MS) {
+        return syncCatalog();
+    }
+    return catalogVersion;
+};
+
+const markCatalogStale = () => {
+    stale = true;
+};
+
+// Pushes changed rows (e.g. from RETURNING *); falls back to a reload on the next match
+const upsertToCatalog = async (rows) => {
+    if (!catalogVersion || stale) return markCatalogStale();
+    try {
+        const response = await pythonClient.upsertCatalog(rows, catalogVersion);
+        catalogVersion = response.data.catalog_version;
+    } catch (error) {
+        markCatalogStale();
+    }
+};
+
+const removeFromCatalog = async (ids) => {
+    if (!catalogVersion || stale) return markCatalogStale();
+    try {
+        const response = await pythonClient.deleteFromCatalog(ids, catalogVersion);
+        catalogVersion = response.data.catalog_version;
+    } catch (error) {
+        markCatalogStale();
+    }
+};
+
+// /match against the catalog; jobIds narrows it (omit for every internship)
+const matchCatalog = async (student, jobIds, workPreference) => {
+    const version = await ensureCatalog();
+    try {
+        return await pythonClient.matchCatalog(student, { catalogVersion: version, jobIds }, workPreference);
+    } catch (error) {
+        // 409: the engine restarted or another process reloaded it
+        if (!error.response || error.response.status !== 409) throw error;
+        markCatalogStale();
+        const reloaded = await ensureCatalog();
+        return pythonClient.matchCatalog(student, { catalogVersion: reloaded, jobIds }, workPreference);
+    }
+};
+
+module.exports = {
+    syncCatalog,
+    markCatalogStale,
+    upsertToCatalog,
+    removeFromCatalog,
+    matchCatalog
+};
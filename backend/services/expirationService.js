@@ -1,4 +1,5 @@
 const pool = require('../config/database');
+const { markCatalogStale } = require('./catalogService');
 
 /**
  * Checks for internships that have passed their deadline and marks them as 'expired'.
@@ -16,6 +17,7 @@ const checkAndExpireInternships = async () => {
         );
 
         if (result.rows.length > 0) {
+            markCatalogStale();
             console.log(`✅ Expired ${result.rows.length} internships.`);
             result.rows.forEach(row => {
                 console.log(`   - [Expired] ${row.company} (${row.role})`);
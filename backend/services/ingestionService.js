@@ -1,4 +1,5 @@
 const pool = require('../config/database');
+const { markCatalogStale } = require('./catalogService');
 
 // --- Normalization Logic ---
 const normalizeInternship = (rawData, sourceName) => {
@@ -67,6 +68,7 @@ const upsertInternship = async (data) => {
                 data.last_fetched_at, data.raw_data,
                 id
             ]);
+            markCatalogStale();
             return { status: 'updated', id };
         } else {
             // INSERT new
@@ -82,6 +84,7 @@ const upsertInternship = async (data) => {
                 data.stipend, data.deadline, data.description, data.skills, data.duration, data.external_link,
                 data.last_fetched_at, data.raw_data, data.verification_status, data.source_type
             ]);
+            markCatalogStale();
             return { status: 'inserted', id: res.rows[0].id };
         }
     } finally {
@@ -118,6 +121,7 @@ const processSoftDeletes = async (sourceName, activeSourceIds) => {
         const res = await client.query(query, [sourceName, activeSourceIds]);
 
         if (res.rowCount > 0) {
+            markCatalogStale();
             console.log(`🗑️ Soft-deleted ${res.rowCount} records from ${sourceName} that are no longer remote.`);
         }
 
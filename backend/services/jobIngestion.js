@@ -1,5 +1,6 @@
 const axios = require('axios');
 const pool = require('../config/database');
+const { markCatalogStale } = require('./catalogService');
 
 // ADZUNA API CONFIG (Free Tier Available)
 const ADZUNA_APP_ID = process.env.ADZUNA_APP_ID || '';
@@ -48,6 +49,7 @@ const fetchAndIngestJobs = async (query = 'internship', location = 'India') => {
                 job.redirect_url
             ]);
         }
+        if (jobs.length > 0) markCatalogStale();
         console.log('✅ Ingestion Complete');
 
     } catch (error) {
@@ -23,6 +23,110 @@ const pythonClient = {
         }
     },
 
+    async loadCatalog(internships) {
+        try {
+            const response = await axios.post(`${PYTHON_SERVICE_URL}/catalog/load`, {
+                internships
+            }, { timeout: 30000 });
+            return response.data; // data.catalog_version identifies this catalog in matchCatalog()
+        } catch (error) {
+            console.error('Python Service Catalog Load Error:', error.message);
+            throw error;
+        }
+    },
+
+    // Incremental changes: only the given postings are re-indexed. Returns data.catalog_version.
+    async upsertCatalog(internships, catalogVersion) {
+        try {
+            const response = await axios.post(`${PYTHON_SERVICE_URL}/catalog/upsert`, {
+                internships,
+                catalog_version: catalogVersion
+            }, { timeout: 10000 });
+            return response.data;
+        } catch (error) {
+            console.error('Python Service Catalog Upsert Error:', error.message);
+            throw error;
+        }
+    },
+
+    async deleteFromCatalog(jobIds, catalogVersion) {
+        try {
+            const response = await axios.post(`${PYTHON_SERVICE_URL}/catalog/delete`, {
+                job_ids: jobIds,
+                catalog_version: catalogVersion
+            }, { timeout: 10000 });
+            return response.data;
+        } catch (error) {
+            console.error('Python Service Catalog Delete Error:', error.message);
+            throw error;
+        }
+    },
+
+    async matchCatalog(student, { catalogVersion, jobIds, filters } = {}, workPreference) {
+        try {
+            const response = await axios.post(`${PYTHON_SERVICE_URL}/match`, {
+                student,
+                catalog_version: catalogVersion,
+                job_ids: jobIds,
+                filters,
+                workPreference
+            }, { timeout: 10000 });
+            return response.data;
+        } catch (error) {
+            // 409 means the engine restarted or was reloaded: call loadCatalog() and retry
+            console.error('Python Service Catalog Match Error:', error.message);
+            throw error;
+        }
+    },
+
+    // NDJSON stream: onEvent({ event: 'results' | 'explanation' | 'done' | 'error', ... })
+    async matchStream(student, { catalogVersion, jobIds, filters, internships } = {}, workPreference, onEvent) {
+        try {
+            const response = await axios.post(`${PYTHON_SERVICE_URL}/match/stream`, {
+                student,
+                internships,
+                catalog_version: catalogVersion,
+                job_ids: jobIds,
+                filters,
+                workPreference
+            }, { timeout: 30000, responseType: 'stream' });
+
+            // Decode as a stream: a multi-byte character (e.g. ₹) can be split across chunks
+            response.data.setEncoding('utf8');
+            let buffered = '';
+            for await (const chunk of response.data) {
+                buffered += chunk;
+                const lines = buffered.split('\n');
+                buffered = lines.pop();
+                for (const line of lines) {
+                    if (line.trim()) onEvent(JSON.parse(line));
+                }
+            }
+            if (buffered.trim()) onEvent(JSON.parse(buffered));
+        } catch (error) {
+            console.error('Python Service Stream Match Error:', error.message);
+            throw error;
+        }
+    },
+
+    async matchBatch(students, { catalogVersion, jobIds, filters, topK, explain } = {}, workPreference) {
+        try {
+            const response = await axios.post(`${PYTHON_SERVICE_URL}/match/batch`, {
+                students,
+                catalog_version: catalogVersion,
+                job_ids: jobIds,
+                filters,
+                top_k: topK,
+                explain,
+                workPreference
+            }, { timeout: 600000 }); // digest batches can take minutes
+            return response.data; // data[i].results for students[i]
+        } catch (error) {
+            console.error('Python Service Batch Match Error:', error.message);
+            throw error;
+        }
+    },
+
     async analyzeResume(resumeText) {
         try {
             const response = await axios.post(`${PYTHON_SERVICE_URL}/analyze-resume`, {
@@ -47,6 +151,27 @@ const pythonClient = {
         }
     },
 
+    // Large /clean-data calls answer 202 with a job_id: poll getJob() until it is 'done'
+    async getJob(jobId) {
+        try {
+            const response = await axios.get(`${PYTHON_SERVICE_URL}/jobs/${jobId}`);
+            return response.data;
+        } catch (error) {
+            console.error('Python Service Job Status Error:', error.message);
+            throw error;
+        }
+    },
+
+    async getJobResult(jobId) {
+        try {
+            const response = await axios.get(`${PYTHON_SERVICE_URL}/jobs/${jobId}/result`);
+            return response.data;
+        } catch (error) {
+            console.error('Python Service Job Result Error:', error.message);
+            throw error;
+        }
+    },
+
     async generateProjectIdeas(skill, company) {
         try {
             const response = await axios.post(`${PYTHON_SERVICE_URL}/generate-project-ideas`, {